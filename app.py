@@ -1,313 +1,721 @@
 import os
-import random
-import subprocess
-import threading
+import atexit
+import importlib.util
+import json
 import queue
-from flask import Flask, render_template, jsonify, request
+import tempfile
+import threading
+import time
+from flask import Flask, Response, g, render_template, jsonify, request, stream_with_context
 from flask_cors import CORS
-from k8s_executor import KubernetesCodeExecutor
-try:
-    import speech_recognition as sr
-    AUDIO_ENABLED = True
-except ImportError:
+from code_executor import SubprocessCodeExecutor
+from compile_cache import CompileCache
+from execution_queue import ExecutionQueue, ExecutionQueueFull
+import judge
+import warm_pool
+from company_index import CompanyIndex
+from problem_cache import ProblemCache
+from interview_sessions import SessionManager, SessionLimitError
+from audio_ingest import AudioStream, AudioBackpressure, AudioFormatError, SAMPLE_RATE, SAMPLE_WIDTH
+import metrics
+import startup_report
+from llm_client import LLMClient, LLMError, GeminiBackend, FakeBackend, seeded_choice
+
+
+def _module_available(name):
+    """True if name can be imported, without paying for the import"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# Heavy optional SDKs are only located here; they are imported where first used
+AUDIO_ENABLED = _module_available('speech_recognition')
+if not AUDIO_ENABLED:
     print("Speech recognition not available - audio features disabled")
-    AUDIO_ENABLED = False
-    sr = None
 
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError:
+GENAI_AVAILABLE = _module_available('google.generativeai')
+if not GENAI_AVAILABLE:
     print("Google Generative AI not available")
-    GENAI_AVAILABLE = False
-    genai = None
 
 app = Flask(__name__)
 CORS(app)
 
-# Global Variables
-transcription_queue = queue.Queue()
-response_queue = queue.Queue()
-stop_threads = False
-feedback_result = None
-
-# Initialize Kubernetes executor (falls back to subprocess if K8s not available)
+# Reverse proxies in front of the app (nginx in docker-compose); their
+# X-Forwarded-For entries are trusted for the client address executions are
+# shared out and rate-limited by. Leave 0 when clients connect directly,
+# or they could claim any address
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# Per-interview pipelines; each worker process hosts at most MAX_SESSIONS
+session_manager = SessionManager(
+    max_sessions=int(os.getenv('MAX_SESSIONS', '20')),
+    idle_timeout=int(os.getenv('SESSION_IDLE_TIMEOUT', '300')),
+    queue_size=int(os.getenv('SESSION_QUEUE_SIZE', '32'))
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Company -> problem index, parsed once and reloaded when the file changes
+with startup_report.stage('company index'):
+    company_index = CompanyIndex(os.path.join(BASE_DIR, 'templates', 'companies.txt'))
+
+# Transcriptions arriving within the window are merged into one Gemini request
+FEEDBACK_BATCH_WINDOW = float(os.getenv('FEEDBACK_BATCH_WINDOW_MS', '750')) / 1000
+FEEDBACK_BATCH_MAX = int(os.getenv('FEEDBACK_BATCH_MAX', '8'))
+
+# Where interview audio comes from: 'browser' uploads or the server's own microphone
+AUDIO_SOURCE = os.getenv('AUDIO_SOURCE', 'browser').lower()
+AUDIO_MAX_BUFFERED_BYTES = int(os.getenv('AUDIO_MAX_BUFFERED_KB', '512')) * 1024
+AUDIO_MAX_CHUNK_BYTES = 256 * 1024
+AUDIO_CALIBRATION_SECONDS = 0.5
+AUDIO_RECALIBRATE_SECONDS = float(os.getenv('AUDIO_RECALIBRATE_SECONDS', '30'))
+
+# Server-Sent Events feedback stream tuning
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_MAX_STREAM_SECONDS = float(os.getenv('SSE_MAX_STREAM_SECONDS', '300'))
+SSE_RETRY_MS = 3000
+# Open streams per worker. Each holds a request thread, so keep this well
+# below gunicorn's --threads; the page polls /get-feedback when refused
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '8'))
+_sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+# Output kept per execution (stdout + stderr); programs printing more are stopped early. 0 disables the cap
+EXECUTION_OUTPUT_LIMIT_BYTES = int(os.getenv('EXECUTION_OUTPUT_LIMIT_KB', '1024')) * 1024 or None
+
+# Kubernetes executor (falls back to subprocess if K8s not available). Its API
+# clients hold connections that must not be shared across fork, so each
+# process builds its own in init_worker()
 USE_KUBERNETES = os.getenv('USE_KUBERNETES', 'false').lower() == 'true'
-if USE_KUBERNETES:
+k8s_executor = None
+if not USE_KUBERNETES:
+    print("Using subprocess for code execution (set USE_KUBERNETES=true to enable K8s)")
+
+def _create_k8s_executor():
+    """Build and start this process's Kubernetes executor; None if the cluster is unusable"""
     try:
-        k8s_executor = KubernetesCodeExecutor()
+        # kubernetes and yaml are only imported when the executor is wanted
+        from k8s_executor import KubernetesCodeExecutor
+
+        # K8S_POOL_SIZE > 0 keeps warm runner pods per language instead of a Job per run
+        executor = KubernetesCodeExecutor(
+            pool_size=int(os.getenv('K8S_POOL_SIZE', '0')),
+            pool_max_size=int(os.getenv('K8S_POOL_MAX_SIZE', '0')) or None,
+            pool_acquire_timeout=float(os.getenv('K8S_POOL_ACQUIRE_TIMEOUT', '5')),
+            reaper_interval=float(os.getenv('K8S_REAPER_INTERVAL', '30')),
+            reaper_max_age=float(os.getenv('K8S_REAPER_MAX_AGE', '300')),
+            max_output_bytes=EXECUTION_OUTPUT_LIMIT_BYTES
+        )
+        executor.start()
+        atexit.register(executor.shutdown)
         print("Kubernetes executor initialized successfully")
+        return executor
     except Exception as e:
         print(f"Failed to initialize Kubernetes executor: {e}")
-        print("Falling back to subprocess execution")
-        USE_KUBERNETES = False
-        k8s_executor = None
-else:
-    k8s_executor = None
-    print("Using subprocess for code execution (set USE_KUBERNETES=true to enable K8s)")
+        return None
+
+# Compiled C++/Java artifacts keyed by source hash; COMPILE_CACHE_DIR='' disables it
+COMPILE_CACHE_DIR = os.getenv('COMPILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'leinterview-compile-cache'))
+compile_cache = CompileCache(
+    COMPILE_CACHE_DIR,
+    max_bytes=int(os.getenv('COMPILE_CACHE_MAX_MB', '256')) * 1024 * 1024
+) if COMPILE_CACHE_DIR else None
+
+# Local executor: each run gets its own temp directory, concurrency is bounded.
+# Warm pools are only defined here (building the JVM launcher); their
+# processes are started per worker by init_worker()
+WARM_POOL_SIZE = int(os.getenv('WARM_POOL_SIZE', '2'))
+with startup_report.stage('subprocess executor'):
+    subprocess_executor = SubprocessCodeExecutor(
+        max_concurrent=int(os.getenv('EXECUTOR_MAX_CONCURRENT', '0')) or None,
+        max_queue=int(os.getenv('EXECUTOR_MAX_QUEUE', '16')),
+        queue_timeout=float(os.getenv('EXECUTOR_QUEUE_TIMEOUT', '10')),
+        compile_cache=compile_cache,
+        max_output_bytes=EXECUTION_OUTPUT_LIMIT_BYTES,
+        # Pre-started Python/JVM processes; unused when jobs run on Kubernetes
+        warm_pools={} if USE_KUBERNETES else warm_pool.create_pools(WARM_POOL_SIZE)
+    )
+
+
+def run_execution(code, language, cases=None, time_limit=2.0, stop_on_failure=False, on_output=None):
+    """Run one submission, or judge it against test cases, on whichever backend is configured"""
+    executor = k8s_executor if USE_KUBERNETES and k8s_executor else subprocess_executor
+    if cases is not None:
+        # Verdicts are per case; there is no single output to stream
+        return executor.judge(code, language, cases, time_limit, stop_on_failure)
+    if executor is k8s_executor:
+        return k8s_executor.execute_code(code, language, timeout=30, on_output=on_output)
+    return subprocess_executor.execute_code(code, language, timeout=10, on_output=on_output)
+
+
+# Executions run on worker threads so request threads are never held by a
+# compile/run. Clients take turns on the workers and are rate-limited, so
+# one client cannot fill the queue for everyone else
+EXECUTION_WORKERS = int(os.getenv('EXECUTION_WORKERS', '0'))
+# Code execution Jobs allowed at once across all workers and replicas; 0 for no cap
+K8S_MAX_ACTIVE_JOBS = int(os.getenv('K8S_MAX_ACTIVE_JOBS', '0'))
+execution_queue = ExecutionQueue(
+    run_execution,
+    workers=EXECUTION_WORKERS or (8 if USE_KUBERNETES else subprocess_executor.max_concurrent),
+    max_pending=int(os.getenv('EXECUTION_MAX_PENDING', '64')),
+    result_ttl=float(os.getenv('EXECUTION_RESULT_TTL', '300')),
+    # Off by default: clients are told apart by address, which is only the
+    # user's own where the proxy or Service preserves it (see TRUSTED_PROXIES)
+    client_rate=float(os.getenv('EXECUTION_CLIENT_RATE', '0')),
+    client_burst=int(os.getenv('EXECUTION_CLIENT_BURST', '5')),
+    max_pending_per_client=int(os.getenv('EXECUTION_CLIENT_MAX_PENDING', '4'))
+)
+EXECUTION_MAX_WAIT_SECONDS = 25
 
 # API Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-DEMO_MODE = not GEMINI_API_KEY or GEMINI_API_KEY == 'demo' or not GENAI_AVAILABLE
+GEMINI_CONFIGURED = bool(GEMINI_API_KEY) and GEMINI_API_KEY != 'demo' and GENAI_AVAILABLE
 
-if GEMINI_API_KEY and GEMINI_API_KEY != 'demo' and GENAI_AVAILABLE:
-    genai.configure(api_key=GEMINI_API_KEY)
-    print("Gemini AI configured successfully")
-else:
-    print("Running in DEMO mode - using mock responses")
+FEEDBACK_CONTEXT = """
+        You are helping a friend with a mock interview. The following text is part of a mock interview. 
+        Your task is to provide really short friendly feedback on how your friend can improve their speaking.
+        Start feedback with a score between 0-9. E.g. "8; <feedback>" 
+        Please calibrate your score so that the 'average' person interview will score 5.
+        """
+PROBLEM_PROMPT = "Very briefly display the problem {problem_name} from leetcode and one sample output"
 
-def get_gemini_response(prompt):
-    """Generate feedback response using Gemini AI"""
-    if DEMO_MODE:
-        # Return demo response
-        import random
-        scores = [6, 7, 8, 5, 9]
-        feedbacks = [
+def _demo_response(prompt):
+    """Canned responses served by the fake LLM backend in demo mode"""
+    if prompt.startswith(FEEDBACK_CONTEXT):
+        score = seeded_choice(prompt, [6, 7, 8, 5, 9])
+        feedback = seeded_choice(prompt[::-1], [
             "Great enthusiasm! Try to speak a bit slower for clarity.",
             "Good technical knowledge. Work on providing more specific examples.",
             "Excellent structure in your answer. Could use more confident delivery.",
             "Nice problem-solving approach. Remember to explain your thought process.",
             "Strong communication skills. Try to be more concise in your explanations."
-        ]
-        score = random.choice(scores)
-        feedback = random.choice(feedbacks)
+        ])
         return f"{score}; {feedback} (Demo Mode - Get real AI feedback by setting GEMINI_API_KEY)"
-    
-    try:
-        feedback_context = """
-        You are helping a friend with a mock interview. The following text is part of a mock interview. 
-        Your task is to provide really short friendly feedback on how your friend can improve their speaking.
-        Start feedback with a score between 0-9. E.g. "8; <feedback>" 
-        Please calibrate your score so that the 'average' person interview will score 5.
-        """
-        feedback_prompt = feedback_context + "\n" + prompt
 
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        feedback_response = model.generate_content(feedback_prompt, stream=True)
+    problem_name = prompt.split("display the problem ", 1)[-1].split(" from leetcode", 1)[0]
+    return f"""**{problem_name}** (Demo Mode)
 
-        feedback_content = ""
-        for chunk in feedback_response:
-            feedback_content += chunk.text
+Given an array of integers, return indices of two numbers that add up to a target.
 
-        return feedback_content
+**Example:**
+- Input: nums = [2,7,11,15], target = 9
+- Output: [0,1] (because nums[0] + nums[1] = 2 + 7 = 9)
 
-    except Exception as e:
-        return f"Error communicating with Gemini API: {e}"
+*This is a demo response. Set GEMINI_API_KEY for real questions.*"""
 
-def audio_transcription():
-    """Handle audio transcription in background thread"""
-    global stop_threads
-    
+def _create_llm_backend():
+    """Build the LLM backend selected by LLM_BACKEND (gemini or fake)"""
+    backend = os.getenv('LLM_BACKEND', 'gemini' if GEMINI_CONFIGURED else 'fake').lower()
+    if backend == 'gemini':
+        if GEMINI_CONFIGURED:
+            print("Gemini AI configured successfully")
+            return GeminiBackend(GEMINI_API_KEY)
+        print("LLM_BACKEND=gemini but no usable GEMINI_API_KEY; falling back to fake backend")
+
+    print("Running in DEMO mode - using mock responses")
+    return FakeBackend(
+        responder=_demo_response,
+        latency=float(os.getenv('FAKE_LLM_LATENCY_MS', '0')) / 1000,
+        jitter=float(os.getenv('FAKE_LLM_JITTER_MS', '0')) / 1000,
+        sigma=float(os.getenv('FAKE_LLM_LATENCY_SIGMA', '0')),
+        chunk_delay=float(os.getenv('FAKE_LLM_CHUNK_DELAY_MS', '0')) / 1000
+    )
+
+# One LLM client per process, shared by every request and session; the
+# Gemini SDK and its channels are only set up once a worker first uses them
+with startup_report.stage('llm client'):
+    llm = LLMClient(
+        _create_llm_backend(),
+        max_concurrency=int(os.getenv('LLM_MAX_CONCURRENCY', '8')),
+        timeout=float(os.getenv('LLM_TIMEOUT', '20')),
+        retries=int(os.getenv('LLM_RETRIES', '2'))
+    )
+DEMO_MODE = llm.backend_name == 'fake'
+
+# Problem descriptions never change, so cache them per problem name.
+# Set PROBLEM_CACHE_DIR to share a persistent tier across workers/restarts;
+# entries are namespaced by backend so demo text never outlives demo mode.
+PROBLEM_CACHE_DIR = os.getenv('PROBLEM_CACHE_DIR')
+problem_cache = ProblemCache(
+    max_entries=int(os.getenv('PROBLEM_CACHE_SIZE', '512')),
+    disk_dir=os.path.join(PROBLEM_CACHE_DIR, llm.backend_name) if PROBLEM_CACHE_DIR else None
+)
+
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+def init_worker():
+    """
+    Build this process's API clients, warm runtimes and worker threads
+
+    Everything created at import time is safe to inherit across fork, so
+    gunicorn can preload the app once in its master; what is not is built
+    here, once per process. gunicorn's post_fork hook calls this, and the
+    first request does otherwise. Each step is timed in startup_report.
+    """
+    global USE_KUBERNETES, k8s_executor, _worker_pid
+    if _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        if _worker_pid == os.getpid():
+            return
+        if USE_KUBERNETES and k8s_executor is None:
+            with startup_report.stage('worker: kubernetes executor'):
+                k8s_executor = _create_k8s_executor()
+            if k8s_executor is None:
+                print("Falling back to subprocess execution")
+                USE_KUBERNETES = False
+                with startup_report.stage('worker: warm pool build'):
+                    subprocess_executor.warm_pools = warm_pool.create_pools(WARM_POOL_SIZE)
+                execution_queue.workers = EXECUTION_WORKERS or subprocess_executor.max_concurrent
+        if USE_KUBERNETES and K8S_MAX_ACTIVE_JOBS:
+            # The informer's Job count covers every replica, not just this worker
+            execution_queue.in_flight = k8s_executor.get_active_jobs
+            execution_queue.max_in_flight = K8S_MAX_ACTIVE_JOBS
+        with startup_report.stage('worker: warm pools'):
+            for pool in subprocess_executor.warm_pools.values():
+                pool.start()
+        with startup_report.stage('worker: llm client'):
+            llm.start()
+        with startup_report.stage('worker: execution queue'):
+            execution_queue.start()
+        _worker_pid = os.getpid()
+
+def stream_gemini_response(prompt):
+    """Generate feedback from Gemini AI, yielding text chunks as they arrive"""
+    try:
+        for chunk in llm.stream(FEEDBACK_CONTEXT + "\n" + prompt):
+            yield chunk
+    except LLMError as e:
+        yield f"Error communicating with Gemini API: {e}"
+
+def get_gemini_response(prompt):
+    """Generate feedback response using Gemini AI"""
+    return "".join(stream_gemini_response(prompt))
+
+def audio_ingest(session):
+    """Feed browser-uploaded audio for a session through its decoder"""
+    session.audio_stream.pump(session.stop_event)
+
+def transcribe_segments(session):
+    """Transcribe utterances as they are segmented, overlapping with capture of the next one"""
     if not AUDIO_ENABLED:
         print("Audio not available in this environment")
         return
-        
+
+    import speech_recognition as sr
+
     recognizer = sr.Recognizer()
-    
-    try:
-        microphone = sr.Microphone()
-    except Exception as e:
-        print(f"Microphone not available: {e}")
-        return
+    segments = session.audio_stream.segments
 
-    while not stop_threads:
+    while not session.stopped:
         try:
-            with microphone as source:
-                print("Listening for speech...")
-                recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio = recognizer.listen(source, timeout=5, phrase_time_limit=5)
+            try:
+                pcm, info = segments.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            dequeued = time.monotonic()
+            metrics.distribution('audio_segment_seconds').observe(info['duration_ms'] / 1000)
+            metrics.latency('audio_segment_queue_wait').observe(dequeued - info['ended_at'])
+
+            audio = sr.AudioData(pcm, SAMPLE_RATE, SAMPLE_WIDTH)
+            try:
                 transcription = recognizer.recognize_google(audio)
-                print(f"Transcription: {transcription}")
-                transcription_queue.put(transcription)
+            finally:
+                finished = time.monotonic()
+                metrics.latency('speech_recognition').observe(finished - dequeued)
+                metrics.latency('speech_end_to_transcript').observe(finished - info['ended_at'])
+
+            print(f"Transcription: {transcription}")
+            session.put_transcription(transcription)
 
-        except sr.WaitTimeoutError:
-            print("Silence detected for 5 seconds.")
         except sr.UnknownValueError:
             print("Could not understand audio.")
         except Exception as e:
             print(f"Error during audio transcription: {e}")
 
-def process_gemini_responses():
-    """Process Gemini responses in background thread"""
-    global stop_threads, feedback_result
-    while not stop_threads:
+def audio_transcription(session):
+    """Capture the server microphone continuously and segment it on voice activity"""
+    if not AUDIO_ENABLED:
+        print("Audio not available in this environment")
+        return
+
+    import speech_recognition as sr
+
+    try:
+        microphone = sr.Microphone(sample_rate=SAMPLE_RATE)
+    except Exception as e:
+        print(f"Microphone not available: {e}")
+        return
+
+    segmenter = session.audio_stream.segmenter
+    try:
+        # The microphone stays open for the whole interview so no speech is
+        # lost between phrases; segments go to transcribe_segments
+        with microphone as source:
+            print("Calibrating for ambient noise...")
+            calibration_reads = int(SAMPLE_RATE * AUDIO_CALIBRATION_SECONDS / source.CHUNK) + 1
+            calibration = b"".join(source.stream.read(source.CHUNK) for _ in range(calibration_reads))
+            segmenter.calibrate(calibration)
+            next_recalibration = time.monotonic() + AUDIO_RECALIBRATE_SECONDS
+
+            print("Listening for speech...")
+            while not session.stopped:
+                segmenter.feed(source.stream.read(source.CHUNK))
+                if time.monotonic() >= next_recalibration:
+                    segmenter.recalibrate()
+                    next_recalibration = time.monotonic() + AUDIO_RECALIBRATE_SECONDS
+            segmenter.flush()
+
+    except Exception as e:
+        print(f"Error during audio capture: {e}")
+
+def process_gemini_responses(session):
+    """Process Gemini responses for a session in a background thread"""
+    while not session.stopped:
         try:
-            transcription = None
-            try:
-                transcription = transcription_queue.get(timeout=1)
-            except queue.Empty:
-                pass
+            fragments, dropped, depth = session.next_batch(
+                window=FEEDBACK_BATCH_WINDOW, max_items=FEEDBACK_BATCH_MAX
+            )
+            if not fragments:
+                continue
 
+            metrics.distribution('transcription_queue_depth').observe(depth)
+            metrics.distribution('feedback_batch_size').observe(len(fragments))
+            if dropped:
+                metrics.distribution('feedback_fragments_dropped').observe(dropped)
+
+            transcription = " ".join(fragments)
             if transcription:
                 print(f"Sending to Gemini: {transcription}")
-                feedback_result = get_gemini_response(transcription)
-                response_queue.put(feedback_result)
-                print(f"Gemini Response: {feedback_result}")
+                feedback = _stream_feedback_to_session(session, transcription)
+                print(f"Gemini Response: {feedback}")
 
         except Exception as e:
             print(f"Error processing Gemini response: {e}")
 
-def start_threads():
-    """Start background threads for audio processing"""
-    global stop_threads
-    stop_threads = False
-
-    audio_thread = threading.Thread(target=audio_transcription)
-    gemini_thread = threading.Thread(target=process_gemini_responses)
-
-    audio_thread.start()
-    gemini_thread.start()
-
-    return audio_thread, gemini_thread
+def _stream_feedback_to_session(session, transcription):
+    """Relay Gemini chunks to the session as they arrive and publish the full text"""
+    started = time.monotonic()
+    first_token_at = None
+    parts = []
+
+    for chunk in stream_gemini_response(transcription):
+        if first_token_at is None:
+            first_token_at = time.monotonic()
+            metrics.latency('gemini_feedback_ttft').observe(first_token_at - started)
+        parts.append(chunk)
+        session.feedback_events.publish('feedback_delta', {'text': chunk})
+
+    total = time.monotonic() - started
+    metrics.latency('gemini_feedback_total').observe(total)
+    if session.batch_queued_at is not None:
+        # Age of the oldest speech this feedback covers when it reaches the candidate
+        metrics.latency('feedback_staleness').observe(time.monotonic() - session.batch_queued_at)
+    feedback = "".join(parts)
+    session.publish_feedback(feedback, timings={
+        'ttft_ms': round(((first_token_at or started) - started) * 1000, 1),
+        'total_ms': round(total * 1000, 1)
+    })
+    return feedback
+
+def _session_id_from_request():
+    """Read the interview session id from the query string or JSON body"""
+    session_id = request.args.get('session_id')
+    if not session_id and request.is_json:
+        session_id = (request.get_json(silent=True) or {}).get('session_id')
+    return session_id
 
 def find_problem(company_name):
     """Find a problem for the given company"""
-    try:
-        with open("templates/companies.txt", 'r') as file:
-            problems = []
-            for line in file.readlines():
-                if line.startswith(company_name):
-                    problems.append(line[len(company_name) + 1: -1])
-            return random.choice(problems) if problems else "Two Sum"
-    except FileNotFoundError:
-        return "Two Sum"
+    return company_index.random_problem(company_name)
 
 def get_response_from_gemini(problem_name):
     """Get problem description from Gemini"""
-    if DEMO_MODE:
-        return f"""**{problem_name}** (Demo Mode)
-
-Given an array of integers, return indices of two numbers that add up to a target.
-
-**Example:**
-- Input: nums = [2,7,11,15], target = 9
-- Output: [0,1] (because nums[0] + nums[1] = 2 + 7 = 9)
-
-*This is a demo response. Set GEMINI_API_KEY for real questions.*"""
-    
-    model = genai.GenerativeModel("gemini-1.5-flash")   
     try:
-        response = model.generate_content(
-            f"Very briefly display the problem {problem_name} from leetcode and one sample output"
-        )
-        return response.text
+        return problem_cache.get_or_load(problem_name, _fetch_problem_description)
     except Exception as e:
         return f"Error: {str(e)}"
 
+def _fetch_problem_description(problem_name):
+    """Ask Gemini for a problem description (uncached)"""
+    return llm.generate(PROBLEM_PROMPT.format(problem_name=problem_name))
+
 # API Routes
 @app.route('/get-feedback', methods=['GET'])
 def get_feedback():
     """Get the latest feedback from AI"""
-    global feedback_result
-    return jsonify({"feedback": feedback_result})
+    session = session_manager.get(_session_id_from_request())
+    if session is None:
+        return jsonify({"feedback": None, "error": "Unknown interview session"}), 404
+    return jsonify({"feedback": session.feedback_result})
+
+def _sse_response(events):
+    """Stream events as Server-Sent Events on one of this worker's stream slots; 503 when none is free"""
+    if not _sse_slots.acquire(blocking=False):
+        metrics.counter('sse_rejected', route=request.url_rule.rule).inc()
+        response = jsonify({"error": "Too many open streams, poll instead"})
+        response.headers['Retry-After'] = str(SSE_RETRY_MS // 1000)
+        return response, 503
+    response = Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Runs when the server closes the response, even if the generator never started
+    response.call_on_close(_sse_slots.release)
+    return response
+
+def _format_sse(event):
+    """Serialize a FeedbackEvent as a Server-Sent Events frame"""
+    return f"id: {event.event_id}\nevent: {event.event}\ndata: {json.dumps(event.data)}\n\n"
+
+@app.route('/feedback/stream', methods=['GET'])
+def feedback_stream():
+    """Push feedback to the browser as Server-Sent Events"""
+    session = session_manager.get(_session_id_from_request())
+    if session is None:
+        return jsonify({"error": "Unknown interview session"}), 404
+
+    # EventSource sends Last-Event-ID on reconnect; resume after it
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id or 0)
+    except ValueError:
+        last_event_id = 0
+
+    def generate():
+        last_id = last_event_id
+        # Streams end periodically so one dropped without a FIN is noticed; the
+        # browser reconnects and resumes from the last id it saw. Open streams
+        # are bounded by SSE_MAX_STREAMS, not by this
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+
+        while time.monotonic() < deadline:
+            events = session.feedback_events.wait(last_id, SSE_HEARTBEAT_SECONDS)
+            session.touch()
+            if events:
+                for event in events:
+                    yield _format_sse(event)
+                    last_id = event.event_id
+            elif session.stopped:
+                yield "event: end\ndata: {}\n\n"
+                return
+            else:
+                yield ": keepalive\n\n"
+
+    return _sse_response(generate())
 
 @app.route('/start-interview', methods=['POST'])
 def start_interview():
     """Start the interview process"""
-    global stop_threads
-    stop_threads = False
-    print("Starting interview...")
-    start_threads()
-    return jsonify({"message": "Interview started"})
+    # Restarting from the same page replaces its previous pipeline
+    previous = _session_id_from_request()
+    if previous:
+        session_manager.stop(previous)
+
+    data = request.get_json(silent=True) or {}
+    audio_source = (data.get('audio_source') or AUDIO_SOURCE).lower()
+    if audio_source == 'server':
+        targets = [audio_transcription, transcribe_segments, process_gemini_responses]
+        audio_stream = AudioStream(uploads_enabled=False)
+    else:
+        targets = [audio_ingest, transcribe_segments, process_gemini_responses]
+        audio_stream = AudioStream(max_buffered_bytes=AUDIO_MAX_BUFFERED_BYTES)
+
+    try:
+        session = session_manager.create(targets, audio_stream=audio_stream)
+    except SessionLimitError as e:
+        return jsonify({"error": str(e)}), 429
+
+    print(f"Starting interview {session.session_id} ({audio_source} audio)...")
+    return jsonify({
+        "message": "Interview started",
+        "session_id": session.session_id,
+        "audio_source": audio_source
+    })
+
+@app.route('/audio/chunk', methods=['POST'])
+def upload_audio_chunk():
+    """Accept a chunk of browser-recorded audio for a session"""
+    session = session_manager.get(_session_id_from_request())
+    if session is None:
+        return jsonify({"error": "Unknown interview session"}), 404
+    if session.audio_stream is None or not session.audio_stream.uploads_enabled:
+        return jsonify({"error": "Interview is not using browser audio"}), 409
+    if request.content_length and request.content_length > AUDIO_MAX_CHUNK_BYTES:
+        return jsonify({"error": "Audio chunk too large"}), 413
+
+    try:
+        session.audio_stream.feed(request.get_data(cache=False), request.content_type)
+    except AudioBackpressure as e:
+        response = jsonify({"error": str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    except AudioFormatError as e:
+        return jsonify({"error": str(e)}), 415
+
+    return jsonify({"accepted": True}), 202
 
 @app.route('/stop-interview', methods=['POST'])
 def stop_interview():
     """Stop the interview process"""
-    global stop_threads
-    stop_threads = True
+    if not session_manager.stop(_session_id_from_request()):
+        return jsonify({"error": "Unknown interview session"}), 404
     return jsonify({"message": "Interview stopped"})
 
-@app.route('/execute', methods=['POST'])
-def execute_code():
-    """Execute code in different programming languages"""
-    data = request.json
+def _submit_execution(judging=False):
+    """
+    Queue the execution described by the JSON body; returns (execution, error_response)
+
+    Bodies with "cases" (always, when judging) are graded against those test cases.
+    """
+    data = request.json or {}
     code = data.get('code')
+    if not code:
+        return None, (jsonify({'error': 'No code provided'}), 400)
     language = data.get('language', 'python').lower()
 
-    # Use Kubernetes if enabled, otherwise fall back to subprocess
+    options = {}
+    if judging or 'cases' in data:
+        cases = data.get('cases')
+        try:
+            judge.validate_cases(cases)
+            time_limit = float(data.get('time_limit', 2))
+        except (TypeError, ValueError) as e:
+            return None, (jsonify({'error': str(e)}), 400)
+        options = {
+            'cases': cases,
+            'time_limit': min(max(time_limit, 0.1), judge.MAX_TIME_LIMIT),
+            'stop_on_failure': bool(data.get('stop_on_failure', False)),
+        }
+    try:
+        stream = bool(data.get('stream', False)) and not options
+        execution = execution_queue.submit(
+            code, language, client_id=request.remote_addr, stream=stream, **options
+        )
+        return execution, None
+    except ExecutionQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return None, (response, 429)
+
+def _execution_response(result):
+    """Shape a finished result the way /execute always has for its backend"""
     if USE_KUBERNETES and k8s_executor:
-        result = k8s_executor.execute_code(code, language, timeout=30)
-        output = result['output'] if result['status'] == 'succeeded' else result['error']
+        # Truncated output still ends with its own marker, so it beats the bare error
+        shown = ('succeeded', 'output_limit_exceeded')
+        output = result['output'] if result['status'] in shown else result['error']
         return jsonify({'output': output})
 
-    # Fallback to subprocess execution (original implementation)
-    if language == 'python':
-        try:
-            result = subprocess.run(
-                ['python3', '-c', code],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            output = result.stdout if result.returncode == 0 else result.stderr
-        except subprocess.TimeoutExpired:
-            output = "Code execution timed out"
-        except Exception as e:
-            output = str(e)
-
-    elif language == 'java':
-        try:
-            with open('Main.java', 'w') as f:
-                f.write(code)
-            compile_result = subprocess.run(
-                ['javac', 'Main.java'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if compile_result.returncode != 0:
-                output = compile_result.stderr
-            else:
-                run_result = subprocess.run(
-                    ['java', 'Main'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                output = run_result.stdout if run_result.returncode == 0 else run_result.stderr
-
-            # Cleanup
-            for file in ['Main.java', 'Main.class']:
-                if os.path.exists(file):
-                    os.remove(file)
-        except subprocess.TimeoutExpired:
-            output = "Code execution timed out"
-        except Exception as e:
-            output = str(e)
+    response = jsonify(dict(result))
+    if result['status'] == 'rejected':
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return response
 
-    elif language == 'c++':
-        try:
-            with open('main.cpp', 'w') as f:
-                f.write(code)
-            compile_result = subprocess.run(
-                ['g++', 'main.cpp', '-o', 'main'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if compile_result.returncode != 0:
-                output = compile_result.stderr
+@app.route('/execute', methods=['POST'])
+def execute_code():
+    """Execute code in different programming languages and wait for the result"""
+    execution, error = _submit_execution()
+    if error:
+        return error
+    # Compile + run limits bound this; the margin covers time spent queued
+    execution.done.wait(timeout=90)
+    if execution.result is None:
+        return jsonify({
+            'output': 'Code execution timed out',
+            'execution_id': execution.execution_id
+        }), 504
+    return _execution_response(execution.result)
+
+@app.route('/judge', methods=['POST'])
+def judge_submission():
+    """Run a submission against test cases and wait for per-case verdicts"""
+    execution, error = _submit_execution(judging=True)
+    if error:
+        return error
+    # Compile plus every case at the longest limit, with the margin /execute allows for queueing
+    execution.done.wait(timeout=90 + judge.MAX_TIME_LIMIT * len(request.json['cases']))
+    if execution.result is None:
+        return jsonify({
+            'error': 'Judging timed out',
+            'execution_id': execution.execution_id
+        }), 504
+    result = execution.result
+    if result['status'] == 'rejected':
+        response = jsonify(result)
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    return jsonify(result)
+
+@app.route('/executions', methods=['POST'])
+def submit_execution():
+    """Queue code for execution and return its id right away"""
+    execution, error = _submit_execution()
+    if error:
+        return error
+    response = jsonify(execution.to_dict())
+    response.headers['Location'] = f"/executions/{execution.execution_id}"
+    return response, 202
+
+@app.route('/executions/<execution_id>', methods=['GET'])
+def get_execution(execution_id):
+    """Status and, once finished, result of an execution; ?wait=N long-polls up to N seconds"""
+    try:
+        wait = min(float(request.args.get('wait', 0) or 0), EXECUTION_MAX_WAIT_SECONDS)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    execution = execution_queue.wait(execution_id, wait) if wait > 0 else execution_queue.get(execution_id)
+    if execution is None:
+        return jsonify({'error': 'Unknown or expired execution'}), 404
+    return jsonify(execution.to_dict())
+
+@app.route('/executions/<execution_id>/stream', methods=['GET'])
+def stream_execution(execution_id):
+    """Push status changes, output (for executions submitted with stream) and the final result as Server-Sent Events"""
+    execution = execution_queue.get(execution_id)
+    if execution is None:
+        return jsonify({'error': 'Unknown or expired execution'}), 404
+
+    def generate():
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        status = None
+        last_output_id = 0
+        last_sent = time.monotonic()
+        while True:
+            # Checked first: the worker sets the result and status before done,
+            # so once done is seen everything below is final
+            finished = execution.done.is_set()
+            if execution.output_events is not None:
+                # All output is published before the result, so it is sent first
+                for event in execution.output_events.since(last_output_id):
+                    yield _format_sse(event)
+                    last_output_id = event.event_id
+                    last_sent = time.monotonic()
+            if finished:
+                yield f"event: result\ndata: {json.dumps(execution.to_dict())}\n\n"
+                return
+            # 'finished' is only ever announced by the result event, once done is set
+            if execution.status != status and execution.status != 'finished':
+                status = execution.status
+                yield f"event: status\ndata: {json.dumps(execution.to_dict())}\n\n"
+                last_sent = time.monotonic()
+            # Short waits so 'running' is reported promptly
+            if execution.output_events is not None:
+                execution.output_events.wait(last_output_id, timeout=0.5)
             else:
-                run_result = subprocess.run(
-                    ['./main'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                output = run_result.stdout if run_result.returncode == 0 else run_result.stderr
-
-            # Cleanup
-            for file in ['main.cpp', 'main']:
-                if os.path.exists(file):
-                    os.remove(file)
-        except subprocess.TimeoutExpired:
-            output = "Code execution timed out"
-        except Exception as e:
-            output = str(e)
-    else:
-        output = 'Unsupported language'
+                execution.done.wait(timeout=0.5)
+            if time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
 
-    return jsonify({'output': output})
+    return _sse_response(generate())
 
 @app.route('/random-quest/<company_name>', methods=['GET'])
 def random_quest(company_name):
@@ -316,6 +724,22 @@ def random_quest(company_name):
     return_question = get_response_from_gemini(problem)
     return jsonify({"return_question": return_question})
 
+@app.route('/companies', methods=['GET'])
+def list_companies():
+    """List known companies with their problem counts"""
+    companies = company_index.companies()
+    return jsonify({"companies": companies, "count": len(companies)})
+
+@app.route('/companies/suggest', methods=['GET'])
+def suggest_companies():
+    """Companies matching a partly typed name, for autocomplete; answered from memory"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    return jsonify({"query": query, "suggestions": company_index.suggest(query, limit)})
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for K8s liveness/readiness probes"""
@@ -335,17 +759,51 @@ def health_check():
 
     return jsonify(status)
 
+@app.before_request
+def ensure_worker_initialized():
+    """Workers gunicorn's post_fork hook did not initialize (e.g. the dev server) do it here"""
+    init_worker()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.monotonic()
+
+@app.after_request
+def record_request_latency(response):
+    """Latency per route; for streamed responses this is the time until streaming starts"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.latency(
+            'http_request', route=route, method=request.method, status=str(response.status_code)
+        ).observe(time.monotonic() - started)
+    return response
+
 @app.route('/metrics', methods=['GET'])
-def metrics():
-    """Metrics endpoint for monitoring"""
+def metrics_endpoint():
+    """Prometheus metrics for every worker; ?format=json for detailed stats of this worker"""
+    if request.args.get('format') != 'json':
+        body, content_type = metrics.render_prometheus()
+        return Response(body, content_type=content_type)
+
     metrics_data = {
         'use_kubernetes': USE_KUBERNETES,
-        'demo_mode': DEMO_MODE
+        'demo_mode': DEMO_MODE,
+        'problem_cache': problem_cache.stats(),
+        'sessions': session_manager.stats(),
+        'executor': subprocess_executor.stats(),
+        'execution_queue': execution_queue.stats(),
+        'llm': llm.stats(),
+        'latency': metrics.latency_summaries(),
+        'distributions': metrics.distribution_summaries(),
+        'counters': metrics.counter_values(),
+        'startup': startup_report.summary()
     }
 
     if USE_KUBERNETES and k8s_executor:
         try:
             metrics_data['active_jobs'] = k8s_executor.get_active_jobs()
+            metrics_data['kubernetes'] = k8s_executor.stats()
         except Exception as e:
             metrics_data['error'] = str(e)
 
@@ -0,0 +1,351 @@
+"""
+Audio Ingestion
+Decodes audio chunks uploaded by the interview page (or captured from the
+server microphone) and segments them into utterances for transcription,
+with bounded buffering and backpressure
+"""
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from array import array
+from collections import deque
+
+try:
+    import audioop
+except ImportError:  # Removed in Python 3.13
+    audioop = None
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit little-endian mono PCM
+
+PCM_CONTENT_TYPES = ('audio/l16', 'audio/pcm')
+COMPRESSED_CONTENT_TYPES = ('audio/webm', 'audio/ogg', 'audio/mp4', 'audio/mpeg', 'audio/wav')
+
+
+class AudioBackpressure(Exception):
+    """Raised when a chunk arrives while too much audio is still waiting to be decoded"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AudioFormatError(Exception):
+    """Raised for audio the server cannot decode"""
+
+
+def frame_rms(frame):
+    """Root-mean-square energy of a 16-bit PCM frame"""
+    if audioop is not None:
+        return audioop.rms(frame, SAMPLE_WIDTH)
+    samples = array('h', bytes(frame))
+    if not samples:
+        return 0
+    return int((sum(s * s for s in samples) / len(samples)) ** 0.5)
+
+
+class VoiceActivitySegmenter:
+    """
+    Energy-based voice activity detector that cuts PCM into utterances
+
+    Segments end after a stretch of silence rather than at a fixed length.
+    While no one is speaking the noise floor is tracked so the threshold
+    follows the room.
+    """
+
+    def __init__(self, on_segment, sample_rate=SAMPLE_RATE, frame_ms=30,
+                 energy_threshold=300, dynamic=True, dynamic_ratio=1.5,
+                 silence_ms=600, min_speech_ms=250, max_segment_s=15.0,
+                 pre_roll_ms=150):
+        """
+        Args:
+            on_segment: Callable(pcm_bytes, info_dict) invoked per utterance;
+                it may block to apply backpressure
+            energy_threshold: Initial RMS level treated as speech
+            dynamic: Track the noise floor between utterances
+            dynamic_ratio: Speech must exceed noise floor by this factor
+            silence_ms: Trailing silence that ends an utterance
+            min_speech_ms: Shorter bursts are discarded as noise
+            max_segment_s: Force a cut for very long monologues
+            pre_roll_ms: Audio kept from before speech onset
+        """
+        self.on_segment = on_segment
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.energy_threshold = energy_threshold
+        self.min_threshold = energy_threshold / 3
+        self.dynamic = dynamic
+        self.dynamic_ratio = dynamic_ratio
+        self.silence_ms = silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.max_segment_ms = max_segment_s * 1000
+
+        self._pending = bytearray()
+        self._pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        # Most recent background audio, used for periodic recalibration
+        self._quiet = deque(maxlen=max(1, 500 // frame_ms))
+        self._frames = []
+        self._in_speech = False
+        self._speech_ms = 0
+        self._silence_ms = 0
+        self._segment_started = None
+        self._noise_floor = None
+
+    def calibrate(self, pcm):
+        """Set the noise floor and threshold from a sample of background audio"""
+        rms = frame_rms(pcm)
+        self._noise_floor = rms
+        self.energy_threshold = max(self.min_threshold, rms * self.dynamic_ratio)
+        return self.energy_threshold
+
+    def recalibrate(self):
+        """Re-derive the threshold from recent background audio; skipped mid-utterance"""
+        if self._in_speech or len(self._quiet) < self._quiet.maxlen:
+            return None
+        return self.calibrate(b''.join(self._quiet))
+
+    def feed(self, pcm):
+        """Consume PCM bytes of any length; whole frames are processed immediately"""
+        self._pending += pcm
+        view = memoryview(self._pending)
+        offset = 0
+        try:
+            while len(view) - offset >= self.frame_bytes:
+                self._process_frame(bytes(view[offset:offset + self.frame_bytes]))
+                offset += self.frame_bytes
+        finally:
+            view.release()
+        del self._pending[:offset]
+
+    def _process_frame(self, frame):
+        rms = frame_rms(frame)
+        is_speech = rms > self.energy_threshold
+
+        if not self._in_speech:
+            if not is_speech:
+                self._pre_roll.append(frame)
+                self._quiet.append(frame)
+                if self.dynamic:
+                    self._track_noise(rms)
+                return
+            self._in_speech = True
+            self._segment_started = time.monotonic()
+            self._frames = list(self._pre_roll)
+            self._pre_roll.clear()
+            self._speech_ms = 0
+            self._silence_ms = 0
+
+        self._frames.append(frame)
+        if is_speech:
+            self._speech_ms += self.frame_ms
+            self._silence_ms = 0
+        else:
+            self._silence_ms += self.frame_ms
+
+        length_ms = len(self._frames) * self.frame_ms
+        if self._silence_ms >= self.silence_ms or length_ms >= self.max_segment_ms:
+            self._emit(reason='silence' if self._silence_ms >= self.silence_ms else 'max_length')
+
+    def _track_noise(self, rms):
+        """Exponential moving average of background energy"""
+        if self._noise_floor is None:
+            self._noise_floor = rms
+        else:
+            self._noise_floor = 0.95 * self._noise_floor + 0.05 * rms
+        self.energy_threshold = max(self.min_threshold, self._noise_floor * self.dynamic_ratio)
+
+    def _emit(self, reason):
+        frames, speech_ms = self._frames, self._speech_ms
+        started = self._segment_started
+        self._frames = []
+        self._in_speech = False
+        self._speech_ms = 0
+        self._silence_ms = 0
+
+        if speech_ms < self.min_speech_ms:
+            return
+        self.on_segment(b''.join(frames), {
+            'duration_ms': len(frames) * self.frame_ms,
+            'speech_ms': speech_ms,
+            'reason': reason,
+            'started_at': started,
+            'ended_at': time.monotonic(),
+        })
+
+    def flush(self):
+        """Emit any utterance still in progress"""
+        if self._in_speech:
+            self._emit(reason='flush')
+
+
+class _PcmDecoder:
+    """Passes raw 16 kHz 16-bit mono PCM straight to the segmenter"""
+
+    def __init__(self, sink):
+        self._sink = sink
+
+    def write(self, chunk):
+        self._sink(chunk)
+
+    def close(self):
+        pass
+
+
+class _FfmpegDecoder:
+    """Streams compressed audio through a long-lived ffmpeg process"""
+
+    def __init__(self, sink):
+        self._sink = sink
+        self._process = subprocess.Popen(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+             '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self._reader = threading.Thread(target=self._read_loop, name='ffmpeg-reader', daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        try:
+            while True:
+                pcm = self._process.stdout.read1(4096)
+                if not pcm:
+                    return
+                self._sink(pcm)
+        except Exception as e:
+            print(f"Error reading decoded audio: {e}")
+
+    def write(self, chunk):
+        # Blocks when ffmpeg is backed up, which in turn backs up AudioStream
+        self._process.stdin.write(chunk)
+        self._process.stdin.flush()
+
+    def close(self):
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        self._reader.join(timeout=1)
+
+
+class AudioStream:
+    """
+    Per-session audio pipeline: upload buffer -> decoder -> segmenter -> segment queue
+
+    Server-side capture skips the upload stages and feeds the segmenter directly.
+    """
+
+    def __init__(self, max_buffered_bytes=512 * 1024, segment_queue_size=4,
+                 uploads_enabled=True, **segmenter_options):
+        """
+        Args:
+            max_buffered_bytes: Undecoded bytes accepted before chunks are rejected
+            uploads_enabled: False when audio is captured on the server
+            segment_queue_size: Utterances waiting for transcription before
+                decoding stalls
+            segmenter_options: Passed through to VoiceActivitySegmenter
+        """
+        self.max_buffered_bytes = max_buffered_bytes
+        self.uploads_enabled = uploads_enabled
+        self.segments = queue.Queue(maxsize=segment_queue_size)
+        self.segmenter = VoiceActivitySegmenter(self._on_segment, **segmenter_options)
+        self.closed = False
+        self._chunks = queue.Queue()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._decoder = None
+        self._stats = {
+            'chunks': 0,
+            'bytes': 0,
+            'rejected_chunks': 0,
+            'segments': 0,
+        }
+
+    @staticmethod
+    def _media_type(content_type):
+        return (content_type or '').split(';', 1)[0].strip().lower()
+
+    def _create_decoder(self, content_type):
+        media_type = self._media_type(content_type)
+        if media_type in PCM_CONTENT_TYPES:
+            rate = SAMPLE_RATE
+            for param in (content_type or '').split(';')[1:]:
+                key, _, value = param.strip().partition('=')
+                if key == 'rate' and value.isdigit():
+                    rate = int(value)
+            if rate != SAMPLE_RATE:
+                raise AudioFormatError(f"PCM audio must be {SAMPLE_RATE} Hz, got {rate}")
+            return _PcmDecoder(self.segmenter.feed)
+        if media_type in COMPRESSED_CONTENT_TYPES:
+            if shutil.which('ffmpeg') is None:
+                raise AudioFormatError("ffmpeg is required to decode compressed audio")
+            return _FfmpegDecoder(self.segmenter.feed)
+        raise AudioFormatError(f"Unsupported audio type: {content_type}")
+
+    def feed(self, chunk, content_type):
+        """
+        Accept an uploaded chunk without blocking the request thread
+
+        Raises:
+            AudioBackpressure: Too much audio is still waiting to be decoded
+            AudioFormatError: The first chunk's content type cannot be decoded
+        """
+        if self.closed or not self.uploads_enabled:
+            raise AudioFormatError("Audio stream is not accepting uploads")
+
+        with self._lock:
+            if self._buffered + len(chunk) > self.max_buffered_bytes:
+                self._stats['rejected_chunks'] += 1
+                raise AudioBackpressure("Transcription is falling behind")
+            if self._decoder is None:
+                self._decoder = self._create_decoder(content_type)
+            self._buffered += len(chunk)
+            self._stats['chunks'] += 1
+            self._stats['bytes'] += len(chunk)
+        self._chunks.put(chunk)
+
+    def pump(self, stop_event):
+        """Move uploaded chunks into the decoder until stop_event is set"""
+        while not stop_event.is_set() and not self.closed:
+            try:
+                chunk = self._chunks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._buffered -= len(chunk)
+            try:
+                self._decoder.write(chunk)
+            except (BrokenPipeError, ValueError) as e:
+                print(f"Audio decoder stopped: {e}")
+                return
+
+    def _on_segment(self, pcm, info):
+        """Hand an utterance to transcription, waiting while its queue is full"""
+        while not self.closed:
+            try:
+                self.segments.put((pcm, info), timeout=0.5)
+                with self._lock:
+                    self._stats['segments'] += 1
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        self.closed = True
+        if self._decoder is not None:
+            self._decoder.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['buffered_bytes'] = self._buffered
+        stats['pending_segments'] = self.segments.qsize()
+        return stats
@@ -0,0 +1,353 @@
+"""
+Subprocess Code Executor
+Runs submissions locally, each in its own temporary directory, with a
+bounded pool of concurrent executions and admission control
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import judge
+import metrics
+import resource_usage
+from output_capture import OutputCapture, communicate
+from resource_usage import AccountedPopen
+from warm_pool import python_payload, java_payload
+
+
+class SubprocessCodeExecutor:
+    """Manages code execution via local subprocesses"""
+
+    def __init__(self, max_concurrent=None, max_queue=16, queue_timeout=10.0,
+                 compile_timeout=10, work_root=None, compile_cache=None, warm_pools=None,
+                 max_output_bytes=1024 * 1024):
+        """
+        Args:
+            max_concurrent: Executions allowed to run at once (default: CPU count)
+            max_queue: Executions allowed to wait for a slot before new ones are rejected
+            queue_timeout: Seconds a queued execution waits before it is rejected
+            compile_timeout: Seconds allowed for javac/g++
+            work_root: Parent directory for per-run sandboxes (default: system temp)
+            compile_cache: Optional CompileCache reused across runs of identical source
+            warm_pools: Optional dict of language -> WarmWorkerPool of pre-started runtimes
+            max_output_bytes: Output kept per phase before the program is killed (None for no cap)
+        """
+        self.max_concurrent = max_concurrent or os.cpu_count() or 2
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.compile_timeout = compile_timeout
+        self.work_root = work_root
+        self.compile_cache = compile_cache
+        self.warm_pools = warm_pools or {}
+        self.max_output_bytes = max_output_bytes
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._stats = {
+            'executions': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'compile_errors': 0,
+            'output_truncated': 0,
+        }
+
+    @staticmethod
+    def _result(status, phase, stdout='', stderr='', exit_code=None, error='', truncated=False):
+        """Build the structured result shared by every execution path"""
+        if status == 'succeeded':
+            output = stdout
+        elif status == 'output_limit_exceeded':
+            output = stdout or stderr
+        elif status == 'timeout':
+            output = "Code execution timed out"
+        else:
+            output = stderr or error
+        return {
+            'status': status,
+            'phase': phase,
+            'stdout': stdout,
+            'stderr': stderr,
+            'exit_code': exit_code,
+            'output': output,
+            'error': error if status != 'succeeded' else '',
+            'truncated': truncated,
+        }
+
+    def _admit(self):
+        """Wait for a free slot; returns False if the queue is full or the wait times out"""
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._stats['rejected'] += 1
+                return False
+            self._waiting += 1
+        started = time.monotonic()
+        try:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            metrics.latency('executor_admission_wait').observe(time.monotonic() - started)
+            with self._lock:
+                self._waiting -= 1
+                if acquired:
+                    self._running += 1
+                else:
+                    self._stats['rejected'] += 1
+        return acquired
+
+    def _release(self):
+        with self._lock:
+            self._running -= 1
+        self._slots.release()
+
+    def execute_code(self, code, language='python', timeout=10, on_output=None):
+        """
+        Execute code in an isolated temporary directory
+
+        Args:
+            code: The code to execute
+            language: Programming language (python, java, c++)
+            timeout: Maximum run time in seconds (compilation is limited separately)
+            on_output: Optional callable(stream, text) receiving run output as it is produced
+
+        Returns:
+            dict: {'status', 'phase', 'stdout', 'stderr', 'exit_code', 'output', 'error',
+                'truncated'} plus resource figures: 'compile_ms', 'run_ms', 'cpu_ms',
+                'peak_rss_kb', 'exit_signal', 'output_bytes'
+        """
+        if language not in ('python', 'java', 'c++'):
+            return self._result('failed', 'admission', error='Unsupported language')
+
+        if not self._admit():
+            return self._result(
+                'rejected', 'admission',
+                error='Too many executions in progress, please retry shortly'
+            )
+
+        workdir = tempfile.mkdtemp(prefix='exec-', dir=self.work_root)
+        try:
+            with self._lock:
+                self._stats['executions'] += 1
+            result = self._execute_in(workdir, code, language, timeout, on_output)
+            resource_usage.record(language, result)
+            return result
+        except Exception as e:
+            return self._result('failed', 'run', error=str(e))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            self._release()
+
+    def _execute_in(self, workdir, code, language, timeout, on_output=None):
+        failure, build = self._build(workdir, code, language)
+        if failure is not None:
+            return failure
+        result = self._run_program(workdir, code, language, timeout, on_output=on_output)
+        result.update(build)
+        return result
+
+    def _build(self, workdir, code, language):
+        """
+        Write and compile the source in workdir
+
+        Returns:
+            tuple: (failed compile result or None, {'compile_cached', 'compile_ms'}
+                to merge into the run result; empty for Python)
+        """
+        if language == 'python':
+            return None, {}
+
+        if language == 'java':
+            source, compile_cmd, artifacts = 'Main.java', ['javac', 'Main.java'], ['*.class']
+        else:
+            source, compile_cmd, artifacts = 'main.cpp', ['g++', 'main.cpp', '-o', 'main'], ['main']
+
+        with open(os.path.join(workdir, source), 'w') as f:
+            f.write(code)
+
+        started = time.monotonic()
+        compiled = self._compile(workdir, language, code, compile_cmd, artifacts)
+        build = {
+            'compile_cached': compiled.get('compile_cached', False),
+            'compile_ms': round((time.monotonic() - started) * 1000, 1),
+        }
+        if compiled['status'] != 'succeeded':
+            if compiled['status'] == 'failed':
+                compiled['status'] = 'compile_error'
+                with self._lock:
+                    self._stats['compile_errors'] += 1
+            compiled.update(build)
+            return compiled, build
+        return None, build
+
+    def _run_program(self, workdir, code, language, timeout, stdin='', on_output=None):
+        """Run an already built submission once, feeding it stdin"""
+        pool = self.warm_pools.get(language)
+        data = stdin.encode('utf-8')
+        capture = OutputCapture(self.max_output_bytes, on_output)
+
+        if language == 'python':
+            if pool is not None:
+                return self._run_warm(
+                    pool, language, python_payload(workdir, code, data), timeout, capture
+                )
+            return self._run('run', ['python3', '-c', code], workdir, timeout, language, data, capture)
+
+        if pool is not None:
+            return self._run_warm(pool, language, java_payload(workdir, data), timeout, capture)
+        if language == 'java':
+            run_cmd = ['java', '-cp', workdir, 'Main']
+        else:
+            run_cmd = [os.path.join(workdir, 'main')]
+        return self._run('run', run_cmd, workdir, timeout, language, data, capture)
+
+    def judge(self, code, language, cases, time_limit=2.0, stop_on_failure=False):
+        """
+        Compile once and run the submission against every test case in one sandbox
+
+        Args:
+            cases: List of {'stdin', 'expected'} dicts (see judge.validate_cases)
+            time_limit: Seconds allowed per case
+            stop_on_failure: Skip remaining cases after the first failure
+
+        Returns:
+            dict: {'status', 'verdict', 'passed', 'total', 'cases', ...}
+        """
+        if language not in ('python', 'java', 'c++'):
+            return judge.not_run('failed', cases, error='Unsupported language')
+
+        if not self._admit():
+            return judge.not_run(
+                'rejected', cases, error='Too many executions in progress, please retry shortly'
+            )
+
+        workdir = tempfile.mkdtemp(prefix='judge-', dir=self.work_root)
+        try:
+            with self._lock:
+                self._stats['executions'] += 1
+            failure, build = self._build(workdir, code, language)
+            if failure is not None:
+                if failure['status'] == 'compile_error':
+                    return judge.not_run('compile_error', cases, compile_output=failure['stderr'])
+                return judge.not_run(failure['status'], cases, error=failure['error'])
+
+            def run_case(stdin):
+                case = self._run_program(workdir, code, language, time_limit, stdin)
+                resource_usage.record(language, case)
+                return case
+
+            result = judge.run_cases(cases, run_case, stop_on_failure)
+            result.update(build)
+            return result
+        except Exception as e:
+            return judge.not_run('failed', cases, error=str(e))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+            self._release()
+
+    def _compile(self, workdir, language, code, compile_cmd, artifacts):
+        """Compile in workdir, reusing a cached result for identical source"""
+        if self.compile_cache is None:
+            return self._run('compile', compile_cmd, workdir, self.compile_timeout)
+
+        key = self.compile_cache.key(language, code, compile_cmd)
+        cached = self.compile_cache.restore(key, workdir)
+        if cached is not None:
+            status = 'succeeded' if cached['returncode'] == 0 else 'failed'
+            result = self._result(
+                status, 'compile', stderr=cached['stderr'], exit_code=cached['returncode']
+            )
+            result['compile_cached'] = True
+            return result
+
+        result = self._run('compile', compile_cmd, workdir, self.compile_timeout)
+        # Timeouts say more about load than about the source, and a compile killed
+        # for flooding its output has no exit code and cut-off errors; never cache either
+        if result['status'] != 'timeout' and not result.get('truncated') and result['exit_code'] is not None:
+            self.compile_cache.store(key, workdir, artifacts, result['exit_code'], result['stderr'])
+        return result
+
+    def _run_warm(self, pool, language, payload, timeout, capture):
+        """Hand a job to a pre-started worker; startup and run time are reported separately"""
+        process, warm, startup = pool.acquire()
+        process.sample_memory()
+        started = time.monotonic()
+        timed_out = communicate(process, payload, timeout, capture)
+        result = self._outcome('run', process, timeout, timed_out, capture)
+        # CPU and peak RSS include the runtime's own startup, done before the job arrived
+        result.update(resource_usage.process_usage(process))
+        return self._timed(result, language, startup, time.monotonic() - started, warm)
+
+    def _timed(self, result, language, startup, run, warm):
+        """Attach startup/run timings to a run-phase result; run_ms is recorded with the other resource figures"""
+        if startup is not None:
+            metrics.latency('execute_startup', language=language.replace('+', 'p')).observe(startup)
+        result['output_bytes'] = resource_usage.output_bytes(result['stdout'], result['stderr'])
+        result['warm'] = warm
+        result['startup_ms'] = round(startup * 1000, 1) if startup is not None else None
+        result['run_ms'] = round(run * 1000, 1)
+        return result
+
+    def _run(self, phase, cmd, workdir, timeout, language=None, stdin=b'', capture=None):
+        """Run one phase and convert the outcome into a structured result"""
+        started = time.monotonic()
+        result = self._run_process(phase, cmd, workdir, timeout, stdin, capture)
+        if language is not None:
+            # Cold runs cannot separate runtime startup from the submission itself:
+            # startup is unknown and run_ms includes it
+            self._timed(result, language, None, time.monotonic() - started, False)
+        return result
+
+    def _run_process(self, phase, cmd, workdir, timeout, stdin=b'', capture=None):
+        process = AccountedPopen(
+            cmd,
+            cwd=workdir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        if phase == 'run':
+            process.sample_memory()
+        capture = capture or OutputCapture(self.max_output_bytes)
+        timed_out = communicate(process, stdin, timeout, capture)
+        result = self._outcome(phase, process, timeout, timed_out, capture)
+        if phase == 'run':
+            result.update(resource_usage.process_usage(process))
+        return result
+
+    def _outcome(self, phase, process, timeout, timed_out, capture):
+        """Structured result for a process that communicate() has finished with"""
+        if capture.truncated:
+            with self._lock:
+                self._stats['output_truncated'] += 1
+            return self._result(
+                'output_limit_exceeded', phase, stdout=capture.stdout, stderr=capture.stderr,
+                error=f"Output exceeded {capture.limit} bytes", truncated=True
+            )
+        if timed_out:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            return self._result(
+                'timeout', phase, stdout=capture.stdout, stderr=capture.stderr,
+                error=f"{phase.capitalize()} timed out after {timeout}s"
+            )
+        status = 'succeeded' if process.returncode == 0 else 'failed'
+        return self._result(
+            status, phase, stdout=capture.stdout, stderr=capture.stderr,
+            exit_code=process.returncode
+        )
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self._running
+            stats['waiting'] = self._waiting
+        stats['max_concurrent'] = self.max_concurrent
+        stats['max_queue'] = self.max_queue
+        if self.compile_cache is not None:
+            stats['compile_cache'] = self.compile_cache.stats()
+        if self.warm_pools:
+            stats['warm_pools'] = {name: pool.stats() for name, pool in self.warm_pools.items()}
+        return stats
+
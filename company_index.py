@@ -0,0 +1,261 @@
+"""
+Company Problem Index
+Parses templates/companies.txt once into an in-memory index keyed by company,
+with a prefix index for suggesting company names as they are typed
+"""
+import bisect
+import os
+import random
+import threading
+import time
+
+DEFAULT_PROBLEM = "Two Sum"
+
+# Companies whose names span more than one word in companies.txt. Every other
+# line is treated as "<company> <problem name>" split on the first space, so a
+# new multi-word company must either be added here or written with a tab
+# between company and problem ("<company>\t<problem name>"); the file alone
+# cannot tell "jane street" from a company "jane" with a problem "street ...".
+MULTI_WORD_COMPANIES = (
+    'akuna capital',
+    'american express',
+    'apt portfolio',
+    'arista networks',
+    'c3 iot',
+    'capital one',
+    'cruise automation',
+    'de shaw',
+    'deutsche bank',
+    'epic systems',
+    'gilt groupe',
+    'goldman sachs',
+    'iit bombay',
+    'info edge',
+    'jane street',
+    'jp morgan',
+    'leap motion',
+    'maq software',
+    'morgan stanley',
+    'national instruments',
+    'palantir technologies',
+    'persistent systems',
+    'pocket gems',
+    'pure storage',
+    'riot games',
+    't system',
+    'tiger analytics',
+    'two sigma',
+    'united health group',
+    'virtu financial',
+    'walmart global tech',
+    'works applications',
+    'zeta suite',
+)
+
+
+# Typed prefixes longer than this only match exactly; company names are far shorter
+SUGGEST_MAX_PREFIX = 20
+# Shorter queries only match exactly; one typo in three letters matches too much
+FUZZY_MIN_LENGTH = 4
+MATCH_KINDS = ('prefix', 'word', 'fuzzy')
+
+
+def normalize_company(name):
+    """Lower-case a company name and collapse internal whitespace"""
+    return ' '.join((name or '').lower().split())
+
+
+def _split_line(line):
+    """Split a companies.txt line into (company, problem), or None if malformed"""
+    line = line.strip()
+    # A handful of rows are CSV leftovers with embedded quotes; skip them
+    if not line or '"' in line:
+        return None
+
+    if '\t' in line:
+        company, _, problem = line.partition('\t')
+        problem = problem.strip()
+        return (normalize_company(company), problem) if company.strip() and problem else None
+
+    lowered = line.lower()
+    for company in MULTI_WORD_COMPANIES:
+        if lowered.startswith(company + ' '):
+            problem = line[len(company) + 1:].strip()
+            return (company, problem) if problem else None
+
+    company, _, problem = line.partition(' ')
+    problem = problem.strip()
+    if not problem:
+        return None
+    return normalize_company(company), problem
+
+
+def _deletes(text):
+    """text and every string made by deleting one character from it"""
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def _within_one_edit(a, b):
+    """Whether a and b differ by at most one insertion, deletion, substitution or adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < len(a) and i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) > len(b):
+        return a[i + 1:] == b[i:]
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+
+class CompanySuggester:
+    """
+    Company names matching a typed prefix, built once per load of the index
+
+    Names match on their start or the start of any later word ("sachs"
+    finds "goldman sachs") through a sorted list of those terms. A prefix
+    with one typo finds its company through a symmetric delete index: every
+    term prefix is stored under itself and each one-character deletion of
+    it, so the query's own deletions find the candidates with a few dict
+    lookups instead of an edit distance against every name.
+    """
+
+    def __init__(self, counts):
+        """
+        Args:
+            counts: Dict of normalized company name -> number of problems
+        """
+        self.counts = dict(counts)
+        terms = []
+        fuzzy = {}
+        for company in self.counts:
+            words = company.split(' ')
+            for i in range(len(words)):
+                term = ' '.join(words[i:])
+                terms.append((term, company))
+                for end in range(FUZZY_MIN_LENGTH - 1, min(len(term), SUGGEST_MAX_PREFIX) + 1):
+                    for key in _deletes(term[:end]):
+                        if len(key) >= FUZZY_MIN_LENGTH - 1:
+                            fuzzy.setdefault(key, set()).add((term, company))
+        self._terms = sorted(terms)
+        self._fuzzy = {key: tuple(entries) for key, entries in fuzzy.items()}
+
+    def suggest(self, query, limit=10):
+        """
+        Companies whose name or a word in it starts with query
+
+        Typo matches are only looked for when exact prefixes give fewer than
+        limit. Results are ordered by match kind, then by problem count.
+
+        Returns:
+            list: Dicts with company, problems and match ('prefix', 'word' or 'fuzzy')
+        """
+        query = normalize_company(query)
+        if not query or limit <= 0:
+            return []
+        found = {}
+        i = bisect.bisect_left(self._terms, (query,))
+        while i < len(self._terms) and self._terms[i][0].startswith(query):
+            term, company = self._terms[i]
+            found[company] = min(found.get(company, 2), 0 if term == company else 1)
+            i += 1
+
+        if len(found) < limit and FUZZY_MIN_LENGTH <= len(query) <= SUGGEST_MAX_PREFIX:
+            lengths = (len(query) - 1, len(query), len(query) + 1)
+            for key in _deletes(query):
+                for term, company in self._fuzzy.get(key, ()):
+                    if company not in found and any(_within_one_edit(query, term[:n]) for n in lengths):
+                        found[company] = 2
+
+        ranked = sorted(found.items(), key=lambda item: (item[1], -self.counts[item[0]], item[0]))
+        return [
+            {'company': company, 'problems': self.counts[company], 'match': MATCH_KINDS[kind]}
+            for company, kind in ranked[:limit]
+        ]
+
+
+class CompanyIndex:
+    """In-memory company -> problems index, reloaded when the file changes"""
+
+    def __init__(self, path='templates/companies.txt', check_interval=2.0):
+        """
+        Args:
+            path: Location of the companies file
+            check_interval: Minimum seconds between mtime checks
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._problems = {}
+        self._suggester = CompanySuggester({})
+        self._mtime = None
+        self._last_check = 0.0
+        self.reload()
+
+    def _parse(self):
+        """Read the companies file into a dict of company -> tuple of problems"""
+        problems = {}
+        with open(self.path, 'r') as f:
+            for line in f:
+                entry = _split_line(line)
+                if entry is None:
+                    continue
+                company, problem = entry
+                # dict keys keep file order while dropping duplicates
+                problems.setdefault(company, {})[problem] = None
+        return {company: tuple(items) for company, items in problems.items()}
+
+    def reload(self):
+        """Re-parse the companies file; keeps the previous index if it is missing"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            problems = self._parse()
+        except FileNotFoundError:
+            print(f"Company file not found: {self.path}")
+            return False
+        suggester = CompanySuggester({company: len(items) for company, items in problems.items()})
+
+        with self._lock:
+            self._problems = problems
+            self._suggester = suggester
+            self._mtime = mtime
+        print(f"Loaded {sum(len(p) for p in problems.values())} problems "
+              f"for {len(problems)} companies")
+        return True
+
+    def _maybe_reload(self, now):
+        """Reload the index if the file's mtime changed since the last load"""
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def problems_for(self, company_name):
+        """Return the tuple of problems for a company (empty if unknown)"""
+        self._maybe_reload(time.monotonic())
+        return self._problems.get(normalize_company(company_name), ())
+
+    def random_problem(self, company_name, default=DEFAULT_PROBLEM):
+        """Pick a random problem for the company, falling back to a default"""
+        problems = self.problems_for(company_name)
+        return random.choice(problems) if problems else default
+
+    def companies(self):
+        """Return a dict of company name -> number of distinct problems"""
+        self._maybe_reload(time.monotonic())
+        return {company: len(items) for company, items in sorted(self._problems.items())}
+
+    def suggest(self, query, limit=10):
+        """Companies matching a partly typed name; see CompanySuggester.suggest"""
+        self._maybe_reload(time.monotonic())
+        return self._suggester.suggest(query, limit)
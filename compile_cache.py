@@ -0,0 +1,171 @@
+"""
+Compile Cache
+Content-addressed on-disk cache of compiled C++/Java artifacts and compiler
+diagnostics, with size-bounded LRU eviction
+"""
+import functools
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import metrics
+
+# Version probes for each compiled language's toolchain
+TOOLCHAIN_PROBES = {
+    'java': ['javac', '-version'],
+    'c++': ['g++', '--version'],
+}
+
+META_FILE = 'meta.json'
+
+
+@functools.lru_cache(maxsize=None)
+def toolchain_version(language):
+    """First line of the compiler's version banner, probed once per process"""
+    try:
+        result = subprocess.run(
+            TOOLCHAIN_PROBES[language], capture_output=True, text=True, timeout=10
+        )
+        banner = (result.stdout or result.stderr).strip()
+        return banner.splitlines()[0] if banner else 'unknown'
+    except (KeyError, OSError, subprocess.SubprocessError):
+        return 'unknown'
+
+
+class CompileCache:
+    """Maps hash(language, source, flags, toolchain) to compiler output on disk"""
+
+    def __init__(self, root, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            root: Cache directory; may be shared by every worker on the host
+            max_bytes: Total artifact size kept before least recently used
+                entries are evicted
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+        }
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, language, source, flags):
+        """Content address for a compilation"""
+        digest = hashlib.sha256()
+        for part in (language, toolchain_version(language), ' '.join(flags), source):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def restore(self, key, workdir):
+        """
+        Copy a cached compilation into workdir
+
+        Returns:
+            dict: {'returncode', 'stderr'} from the original compile, or None on a miss
+        """
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, META_FILE), 'r') as f:
+                meta = json.load(f)
+            for name in meta['artifacts']:
+                shutil.copy2(os.path.join(entry, name), os.path.join(workdir, name))
+            # Directory mtime doubles as the LRU timestamp
+            os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._stats['misses'] += 1
+            metrics.counter('compile_cache_lookups', result='miss').inc()
+            return None
+
+        with self._lock:
+            self._stats['hits'] += 1
+        metrics.counter('compile_cache_lookups', result='hit').inc()
+        return {'returncode': meta['returncode'], 'stderr': meta['stderr']}
+
+    def store(self, key, workdir, artifact_patterns, returncode, stderr):
+        """Publish a compilation's artifacts and diagnostics under key"""
+        staging = tempfile.mkdtemp(prefix='.staging-', dir=self.root)
+        try:
+            artifacts = []
+            size = 0
+            if returncode == 0:
+                for pattern in artifact_patterns:
+                    for path in glob.glob(os.path.join(workdir, pattern)):
+                        name = os.path.basename(path)
+                        shutil.copy2(path, os.path.join(staging, name))
+                        artifacts.append(name)
+                        size += os.path.getsize(path)
+
+            with open(os.path.join(staging, META_FILE), 'w') as f:
+                json.dump({
+                    'returncode': returncode,
+                    'stderr': stderr,
+                    'artifacts': artifacts,
+                    'size': size + len(stderr),
+                    'created_at': time.time(),
+                }, f)
+
+            # Rename is atomic; if another worker got there first keep theirs
+            os.rename(staging, self._entry_dir(key))
+            staging = None
+            with self._lock:
+                self._stats['stores'] += 1
+            metrics.counter('compile_cache_stores').inc()
+        except OSError:
+            pass
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        self._evict()
+
+    def _entries(self):
+        """List (mtime, size, path) for every complete entry"""
+        entries = []
+        for name in os.listdir(self.root):
+            if name.startswith('.'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                with open(os.path.join(path, META_FILE), 'r') as f:
+                    size = json.load(f).get('size', 0)
+                entries.append((os.path.getmtime(path), size, path))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self._stats['evictions'] += 1
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_bytes'] = self.max_bytes
+        return stats
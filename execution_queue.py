@@ -0,0 +1,368 @@
+"""
+Execution Queue
+Accepts code executions without holding a request thread, shares a fixed
+pool of worker threads fairly between clients, and keeps results around for
+polling
+"""
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+import metrics
+from interview_sessions import EventLog
+
+
+class ExecutionQueueFull(Exception):
+    """Raised when an execution is not admitted; reason says which limit refused it"""
+
+    def __init__(self, message, retry_after=1, reason='queue_full'):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    """Allows rate submissions per second on average, in bursts of up to burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now=None):
+        """
+        Take a token if one is available
+
+        Returns:
+            float: 0 if a token was taken, else seconds until one will be
+        """
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class Execution:
+    """One submitted execution and, once finished, its result"""
+
+    def __init__(self, code, language, options=None, stream=False):
+        self.execution_id = uuid.uuid4().hex
+        self.code = code
+        self.language = language
+        self.options = options or {}
+        self.status = 'queued'
+        self.result = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        # Output chunks as the program produces them, for executions submitted with stream=True
+        self.output_events = EventLog(maxlen=1024) if stream else None
+
+    def publish_output(self, stream, text):
+        self.output_events.publish('output', {'stream': stream, 'text': text})
+
+    def to_dict(self):
+        data = {
+            'execution_id': self.execution_id,
+            'language': self.language,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class ExecutionQueue:
+    """
+    Bounded queue of executions served by a pool of worker threads
+
+    Each client gets its own FIFO, and workers take from the clients in
+    turn, so one client submitting a burst delays the others by at most one
+    execution per turn instead of by the whole burst. Submissions are
+    rate-limited per client, and with max_in_flight workers wait rather
+    than start more executions than the backend should run at once.
+    """
+
+    # Seconds an in_flight() count (which may hit an API server) is reused; completions re-count sooner
+    IN_FLIGHT_REFRESH = 1.0
+    # Seconds between sweeps for idle clients' rate-limit state
+    BUCKET_PRUNE_INTERVAL = 10.0
+
+    def __init__(self, run, workers=4, max_pending=64, result_ttl=300, client_rate=0,
+                 client_burst=5, max_pending_per_client=0, max_in_flight=0, in_flight=None):
+        """
+        Args:
+            run: Callable(code, language, **options) -> result dict; may
+                block for the whole compile + run. Streamed executions also
+                get on_output=callable(stream, text)
+            workers: Executions processed at once
+            max_pending: Queued executions accepted before submit() raises
+            result_ttl: Seconds a finished execution stays available
+            client_rate: Submissions per second allowed per client (0 for no limit)
+            client_burst: Submissions a client may make at once before client_rate applies
+            max_pending_per_client: Queued executions per client (0 for no limit)
+            max_in_flight: Executions allowed to run at once across everything
+                in_flight() counts (0 for no limit beyond workers)
+            in_flight: Optional callable returning how many executions are
+                running right now, including other processes' (e.g. active
+                Kubernetes Jobs); without it only this queue's are counted
+        """
+        self.run = run
+        self.workers = workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_pending_per_client = max_pending_per_client
+        self.max_in_flight = max_in_flight
+        self.in_flight = in_flight
+        self._queues = OrderedDict()  # client id -> deque of Executions, in serving order
+        self._queued = 0
+        self._buckets = {}  # client id -> TokenBucket
+        self._buckets_pruned = time.monotonic()
+        self._executions = OrderedDict()  # id -> Execution, in submission order
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pid = None
+        self._threads = []
+        self._running = 0
+        # Last in_flight() value, and executions started since it was taken
+        self._in_flight_seen = 0
+        self._in_flight_checked = 0
+        self._started_since_check = 0
+        self._refresh_lock = threading.Lock()
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'rejected': 0,
+            'rate_limited': 0,
+            'client_queue_full': 0,
+            'expired': 0,
+        }
+
+    def _ensure_started(self):
+        """(Re)start workers, e.g. in a process freshly forked by gunicorn"""
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            if self._pid != os.getpid():
+                self._queues.clear()
+                self._queued = 0
+                self._buckets.clear()
+                self._executions.clear()
+                self._running = 0
+                self._in_flight_checked = 0
+                self._started_since_check = 0
+                # Waiters recorded by the parent's threads do not exist here
+                self._cond = threading.Condition(self._lock)
+                self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._worker, name=f"execution-worker-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def start(self):
+        self._ensure_started()
+        return self
+
+    def submit(self, code, language, client_id=None, stream=False, **options):
+        """
+        Queue an execution and return immediately
+
+        Args:
+            client_id: Who is submitting (e.g. their address); executions
+                are shared out and rate-limited per client
+            stream: Pass run() an on_output callback that publishes output to
+                execution.output_events as it is produced
+            options: Passed through to run(), e.g. test cases for judging
+
+        Raises:
+            ExecutionQueueFull: The client is over its rate or queue limit,
+                or max_pending executions are already waiting
+        """
+        self._ensure_started()
+        execution = Execution(code, language, options, stream)
+        with self._lock:
+            self._expire()
+            try:
+                self._admit(client_id)
+            except ExecutionQueueFull as e:
+                self._stats['rejected'] += 1
+                if e.reason != 'queue_full':
+                    self._stats[e.reason] += 1
+                metrics.counter('execution_admission', decision=e.reason).inc()
+                raise
+            self._executions[execution.execution_id] = execution
+            self._stats['submitted'] += 1
+            self._queues.setdefault(client_id, deque()).append(execution)
+            self._queued += 1
+            queued = self._queued
+            self._cond.notify()
+        metrics.counter('execution_admission', decision='admitted').inc()
+        metrics.distribution('execution_queue_depth').observe(queued)
+        return execution
+
+    def _admit(self, client_id):
+        """Raise ExecutionQueueFull unless client_id may queue another execution; caller holds the lock"""
+        if self._queued >= self.max_pending:
+            raise ExecutionQueueFull("Too many executions queued, please retry shortly")
+        if client_id is None:
+            return
+        pending = len(self._queues.get(client_id, ()))
+        if self.max_pending_per_client and pending >= self.max_pending_per_client:
+            raise ExecutionQueueFull(
+                "You already have too many executions queued, please wait for them to finish",
+                reason='client_queue_full'
+            )
+        if not self.client_rate:
+            return
+        now = time.monotonic()
+        if now - self._buckets_pruned >= self.BUCKET_PRUNE_INTERVAL:
+            # A refilled bucket is the same as no bucket, so idle clients cost nothing
+            for idle in [c for c, b in self._buckets.items() if b.full(now)]:
+                del self._buckets[idle]
+            self._buckets_pruned = now
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+        wait = bucket.take(now)
+        if wait:
+            raise ExecutionQueueFull(
+                "Too many executions submitted, please slow down",
+                retry_after=math.ceil(wait),
+                reason='rate_limited'
+            )
+
+    def get(self, execution_id):
+        with self._lock:
+            self._expire()
+            return self._executions.get(execution_id)
+
+    def wait(self, execution_id, timeout):
+        """Block until the execution finishes or timeout elapses; None for unknown ids"""
+        execution = self.get(execution_id)
+        if execution is not None:
+            execution.done.wait(timeout)
+        return execution
+
+    def _expire(self):
+        """Drop finished executions older than result_ttl; caller holds the lock"""
+        cutoff = time.time() - self.result_ttl
+        for execution_id, execution in list(self._executions.items()):
+            if execution.finished_at is not None and execution.finished_at < cutoff:
+                del self._executions[execution_id]
+                self._stats['expired'] += 1
+            elif execution.submitted_at >= cutoff:
+                break
+
+    def _refresh_in_flight(self):
+        """Re-read in_flight() when the cached value is stale; one worker at a time, outside the lock"""
+        if self.in_flight is None or time.monotonic() - self._in_flight_checked < self.IN_FLIGHT_REFRESH:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            try:
+                seen = self.in_flight()
+            except Exception as e:
+                print(f"Could not count executions in flight: {e}")
+                seen = None
+            with self._lock:
+                if seen is not None:
+                    self._in_flight_seen = seen
+                    self._started_since_check = 0
+                self._in_flight_checked = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _has_capacity(self):
+        """Whether another execution may start under max_in_flight; caller holds the lock"""
+        if not self.max_in_flight:
+            return True
+        if self.in_flight is None:
+            return self._running < self.max_in_flight
+        # Executions started since the last count may not be visible in it yet
+        return self._in_flight_seen + self._started_since_check < self.max_in_flight
+
+    def _take(self):
+        """Block until an execution may start, then take the next client's oldest one"""
+        while True:
+            self._refresh_in_flight()
+            with self._lock:
+                if self._queued and self._has_capacity():
+                    client_id, pending = next(iter(self._queues.items()))
+                    execution = pending.popleft()
+                    if pending:
+                        self._queues.move_to_end(client_id)
+                    else:
+                        del self._queues[client_id]
+                    self._queued -= 1
+                    self._running += 1
+                    self._started_since_check += 1
+                    return execution
+                # Without capacity, poll so a stale in-flight count is re-read
+                self._cond.wait(self.IN_FLIGHT_REFRESH if self._queued else None)
+
+    def _worker(self):
+        while True:
+            execution = self._take()
+            execution.status = 'running'
+            execution.started_at = time.time()
+            metrics.latency('execution_queue_wait').observe(execution.started_at - execution.submitted_at)
+            options = dict(execution.options)
+            if execution.output_events is not None:
+                options['on_output'] = execution.publish_output
+            try:
+                result = self.run(execution.code, execution.language, **options)
+            except Exception as e:
+                result = {'status': 'failed', 'output': '', 'error': str(e)}
+            # Source and test cases are not needed once the run is over
+            execution.code = None
+            execution.options = None
+            execution.result = result
+            execution.finished_at = time.time()
+            execution.status = 'finished'
+            with self._lock:
+                self._running -= 1
+                self._stats['completed'] += 1
+                # A slot may have freed up; the next worker re-counts before taking it
+                self._in_flight_checked = 0
+                self._cond.notify()
+            execution.done.set()
+            if execution.output_events is not None:
+                execution.output_events.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self._running
+            stats['retained'] = len(self._executions)
+            stats['queued'] = self._queued
+            stats['clients_queued'] = len(self._queues)
+            stats['in_flight'] = self._in_flight_seen + self._started_since_check \
+                if self.in_flight is not None else self._running
+        stats['workers'] = self.workers
+        stats['max_pending'] = self.max_pending
+        stats['max_pending_per_client'] = self.max_pending_per_client
+        stats['max_in_flight'] = self.max_in_flight
+        return stats
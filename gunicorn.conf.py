@@ -0,0 +1,34 @@
+"""
+Gunicorn Configuration
+Loaded automatically from the working directory; preloads the app in the
+master, builds per-worker clients after fork and gives workers a shared
+directory for Prometheus samples so /metrics covers every worker
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+# Import the app once in the master and fork workers from it: shared pages
+# and no per-worker import cost. GUNICORN_PRELOAD=false imports it per worker
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Set before workers are forked so each one writes its samples here
+METRICS_DIR = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'leinterview-metrics')
+)
+# A preloaded app is imported before on_starting runs
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def on_starting(server):
+    """Drop samples left behind by a previous run of the server"""
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def post_fork(server, worker):
+    """Build the worker's own API clients and threads before it accepts requests"""
+    app_module = sys.modules.get('app')
+    if app_module is not None:
+        app_module.init_worker()
@@ -0,0 +1,305 @@
+"""
+Interview Session Manager
+Gives every interview its own transcription/feedback pipeline with bounded
+queues, a single set of worker threads and explicit shutdown
+"""
+import queue
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+
+class SessionLimitError(Exception):
+    """Raised when a worker is already hosting its maximum number of sessions"""
+
+
+def _put_latest(q, item):
+    """Put without blocking, discarding the oldest item when the queue is full"""
+    while True:
+        try:
+            q.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
+
+FeedbackEvent = namedtuple('FeedbackEvent', ['event_id', 'event', 'data'])
+
+
+class EventLog:
+    """Bounded, numbered event log that stream readers can block on and resume from"""
+
+    def __init__(self, maxlen=64):
+        self._events = deque(maxlen=maxlen)
+        self._next_id = 1
+        self._cond = threading.Condition()
+        self.closed = False
+
+    @property
+    def last_id(self):
+        return self._next_id - 1
+
+    def publish(self, event, data):
+        """Append an event and wake any waiting readers; returns its id"""
+        with self._cond:
+            entry = FeedbackEvent(self._next_id, event, data)
+            self._next_id += 1
+            self._events.append(entry)
+            self._cond.notify_all()
+        return entry.event_id
+
+    def since(self, last_id):
+        """Return retained events with an id greater than last_id"""
+        with self._cond:
+            return [e for e in self._events if e.event_id > last_id]
+
+    def wait(self, last_id, timeout):
+        """Block until events newer than last_id exist, the log closes, or timeout"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.closed or self._next_id - 1 > last_id, timeout
+            )
+            return [e for e in self._events if e.event_id > last_id]
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class InterviewSession:
+    """State and worker threads for a single candidate's interview"""
+
+    def __init__(self, session_id, queue_size=32, audio_stream=None):
+        self.session_id = session_id
+        # Browser-uploaded audio pipeline; None when audio is captured on the server
+        self.audio_stream = audio_stream
+        # (text, monotonic time it was queued)
+        self.transcription_queue = queue.Queue(maxsize=queue_size)
+        # When the oldest fragment of the last batch was queued; feedback staleness starts here
+        self.batch_queued_at = None
+        # Replaces a plain response queue so several readers can consume and resume
+        self.feedback_events = EventLog(maxlen=queue_size)
+        self.stop_event = threading.Event()
+        self.feedback_result = None
+        self.created_at = time.time()
+        self.last_active = time.monotonic()
+        self._threads = []
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def touch(self):
+        """Mark the session as recently used so the reaper leaves it alone"""
+        self.last_active = time.monotonic()
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_active
+
+    def start(self, targets):
+        """
+        Start one daemon thread per target
+
+        Args:
+            targets: Callables taking the session as their only argument;
+                each should return once stop_event is set
+        """
+        for target in targets:
+            thread = threading.Thread(
+                target=target,
+                args=(self,),
+                name=f"{target.__name__}-{self.session_id}",
+                daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self, join_timeout=5.0):
+        """Signal the workers to exit and wait up to join_timeout for them"""
+        self.stop_event.set()
+        self.feedback_events.close()
+        if self.audio_stream is not None:
+            self.audio_stream.close()
+        deadline = time.monotonic() + join_timeout
+        for thread in self._threads:
+            if thread is threading.current_thread():
+                continue
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return not any(t.is_alive() for t in self._threads)
+
+    def alive_threads(self):
+        return sum(1 for t in self._threads if t.is_alive())
+
+    def put_transcription(self, text):
+        """Queue a transcription, dropping the oldest one if the queue is full"""
+        self.touch()
+        _put_latest(self.transcription_queue, (text, time.monotonic()))
+
+    def next_batch(self, window=0.0, max_items=8, timeout=1.0):
+        """
+        Collect pending transcriptions into one batch
+
+        Blocks up to timeout for the first fragment, then keeps draining for
+        up to window seconds. When more than max_items are pending only the
+        newest are kept, since feedback on older speech is already stale.
+
+        Returns:
+            tuple: (fragments, dropped, depth) where depth is the queue
+            length seen when the batch started
+        """
+        try:
+            first = self.transcription_queue.get(timeout=timeout)
+        except queue.Empty:
+            return [], 0, 0
+
+        depth = self.transcription_queue.qsize() + 1
+        fragments = [first]
+        deadline = time.monotonic() + window
+        while True:
+            try:
+                fragments.append(self.transcription_queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.stopped:
+                break
+            try:
+                fragments.append(self.transcription_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        dropped = max(0, len(fragments) - max_items)
+        kept = fragments[dropped:]
+        self.batch_queued_at = kept[0][1]
+        return [text for text, _ in kept], dropped, depth
+
+    def publish_feedback(self, feedback, timings=None):
+        """Record the latest feedback and push it to stream readers"""
+        self.feedback_result = feedback
+        data = {'feedback': feedback}
+        if timings:
+            data.update(timings)
+        return self.feedback_events.publish('feedback', data)
+
+
+class SessionManager:
+    """Registry of live interview sessions for this worker process"""
+
+    def __init__(self, max_sessions=20, idle_timeout=300, reap_interval=30,
+                 queue_size=32):
+        """
+        Args:
+            max_sessions: Cap on concurrent sessions hosted by this process
+            idle_timeout: Seconds without activity before a session is reaped
+            reap_interval: Seconds between idle sweeps
+            queue_size: Bound for each session's transcription/response queues
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.queue_size = queue_size
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._reaped_total = 0
+
+    def _ensure_reaper(self):
+        """Start the idle reaper on first use (after any gunicorn fork)"""
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(
+            target=self._reap_loop, name='session-reaper', daemon=True
+        )
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap_idle()
+            except Exception as e:
+                print(f"Error reaping interview sessions: {e}")
+
+    def reap_idle(self):
+        """Stop and drop sessions idle for longer than idle_timeout"""
+        with self._lock:
+            expired = [
+                s for s in self._sessions.values()
+                if s.stopped or s.idle_seconds() > self.idle_timeout
+            ]
+            for session in expired:
+                del self._sessions[session.session_id]
+
+        for session in expired:
+            print(f"Reaping idle interview session {session.session_id}")
+            session.stop()
+        self._reaped_total += len(expired)
+        return len(expired)
+
+    def create(self, targets, audio_stream=None):
+        """
+        Create and start a new session
+
+        Raises:
+            SessionLimitError: If max_sessions are already running
+        """
+        self._ensure_reaper()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(
+                    f"Maximum of {self.max_sessions} concurrent interviews reached"
+                )
+            session = InterviewSession(
+                uuid.uuid4().hex, queue_size=self.queue_size, audio_stream=audio_stream
+            )
+            self._sessions[session.session_id] = session
+
+        session.start(targets)
+        return session
+
+    def get(self, session_id):
+        """Look up a live session and mark it active; None if unknown"""
+        if not session_id:
+            return None
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    def stop(self, session_id, join_timeout=1.0):
+        """Stop and remove a session; returns False if it did not exist"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.stop(join_timeout)
+        return True
+
+    def stop_all(self, join_timeout=5.0):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.stop(join_timeout)
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        audio = [s.audio_stream.stats() for s in sessions if s.audio_stream is not None]
+        return {
+            'active_sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'worker_threads': sum(s.alive_threads() for s in sessions),
+            'reaped_total': self._reaped_total,
+            'transcription_queue_depth': sum(s.transcription_queue.qsize() for s in sessions),
+            'audio_buffered_bytes': sum(a['buffered_bytes'] for a in audio),
+            'audio_pending_segments': sum(a['pending_segments'] for a in audio),
+            'audio_rejected_chunks': sum(a['rejected_chunks'] for a in audio),
+        }
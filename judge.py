@@ -0,0 +1,128 @@
+"""
+Judge
+Runs one compiled submission against a list of test cases and turns each run
+into a verdict, shared by the subprocess and Kubernetes executors
+"""
+import difflib
+import time
+
+MAX_CASES = 100
+MAX_CASE_BYTES = 256 * 1024
+MAX_TIME_LIMIT = 10.0
+MAX_DIFF_LINES = 40
+MAX_OUTPUT_CHARS = 4096
+
+
+def validate_cases(cases):
+    """
+    Check a request's test cases
+
+    Raises:
+        ValueError: With a message suitable for a 400 response
+    """
+    if not isinstance(cases, list) or not cases:
+        raise ValueError("cases must be a non-empty list")
+    if len(cases) > MAX_CASES:
+        raise ValueError(f"At most {MAX_CASES} cases per submission")
+    for i, case in enumerate(cases):
+        if not isinstance(case, dict):
+            raise ValueError(f"Case {i} must be an object with stdin and expected")
+        for field in ('stdin', 'expected'):
+            value = case.get(field, '')
+            if not isinstance(value, str):
+                raise ValueError(f"Case {i}: {field} must be a string")
+            if len(value.encode('utf-8')) > MAX_CASE_BYTES:
+                raise ValueError(f"Case {i}: {field} exceeds {MAX_CASE_BYTES} bytes")
+
+
+def _lines(text):
+    """Lines with trailing whitespace and trailing blank lines ignored"""
+    return [line.rstrip() for line in text.rstrip().splitlines()]
+
+
+def compare(expected, actual):
+    """
+    Returns:
+        tuple: (matches, unified diff of expected vs actual, '' when they match)
+    """
+    expected_lines, actual_lines = _lines(expected), _lines(actual)
+    if expected_lines == actual_lines:
+        return True, ''
+    diff = difflib.unified_diff(
+        expected_lines, actual_lines, 'expected', 'actual', lineterm='', n=1
+    )
+    return False, '\n'.join(list(diff)[:MAX_DIFF_LINES])
+
+
+def _truncate(text):
+    if len(text) <= MAX_OUTPUT_CHARS:
+        return text
+    return text[:MAX_OUTPUT_CHARS] + '\n... [truncated]'
+
+
+def verdict(result, expected):
+    """Verdict and diff for one run-phase result (status 'succeeded', 'failed', 'timeout', ...)"""
+    if result['status'] == 'timeout':
+        return 'time_limit_exceeded', ''
+    if result['status'] == 'output_limit_exceeded':
+        return 'output_limit_exceeded', ''
+    if result['status'] != 'succeeded':
+        return 'runtime_error', ''
+    matches, diff = compare(expected, result['stdout'])
+    return ('accepted' if matches else 'wrong_answer'), diff
+
+
+def run_cases(cases, run_case, stop_on_failure=False):
+    """
+    Run every case through run_case(stdin) -> run result and grade it
+
+    Args:
+        run_case: Executes the already compiled submission once with stdin
+        stop_on_failure: Skip the remaining cases after the first non-accepted one
+
+    Returns:
+        dict: {'status', 'verdict', 'passed', 'total', 'cases'}
+    """
+    graded = []
+    stopped = False
+    for index, case in enumerate(cases):
+        if stopped:
+            graded.append({'index': index, 'verdict': 'skipped'})
+            continue
+        started = time.monotonic()
+        result = run_case(case.get('stdin', ''))
+        wall = time.monotonic() - started
+        case_verdict, diff = verdict(result, case.get('expected', ''))
+        graded.append({
+            'index': index,
+            'verdict': case_verdict,
+            'wall_ms': round(wall * 1000, 1),
+            'exit_code': result.get('exit_code'),
+            'stdout': _truncate(result.get('stdout', '')),
+            'stderr': _truncate(result.get('stderr', '')),
+            'diff': diff,
+        })
+        if case_verdict != 'accepted' and stop_on_failure:
+            stopped = True
+
+    failed = [c['verdict'] for c in graded if c['verdict'] not in ('accepted', 'skipped')]
+    return {
+        'status': 'completed',
+        'verdict': failed[0] if failed else 'accepted',
+        'passed': sum(1 for c in graded if c['verdict'] == 'accepted'),
+        'total': len(cases),
+        'cases': graded,
+    }
+
+
+def not_run(status, cases, error='', compile_output=''):
+    """Result for a submission that never reached its cases (compile error, rejection, ...)"""
+    return {
+        'status': status,
+        'verdict': status,
+        'passed': 0,
+        'total': len(cases),
+        'cases': [],
+        'compile_output': compile_output,
+        'error': error,
+    }
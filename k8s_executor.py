@@ -2,66 +2,228 @@
 Kubernetes Job Executor for Code Execution
 Handles creating and managing Kubernetes Jobs for secure code execution
 """
+import copy
+import os
+import shlex
 import time
 import uuid
 import yaml
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
 
+import judge
+import metrics
+import resource_usage
+from k8s_informer import ExecutorInformer
+from k8s_pod_pool import (
+    PodPool, pod_manifest_from_job, build_script, exec_in_pod, KILLED_EXIT_CODE
+)
+from k8s_reaper import JobReaper
+from output_capture import OutputCapture, READ_SIZE
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'k8s', 'code-runners')
+TEMPLATE_FILES = {
+    'python': 'python-runner.yaml',
+    'java': 'java-runner.yaml',
+    'c++': 'cpp-runner.yaml'
+}
+# File name each runner expects under its /src source mount
+SOURCE_FILES = {
+    'python': 'main.py',
+    'java': 'Main.java',
+    'c++': 'main.cpp'
+}
+
+
+def _pod_settled(pod):
+    """Whether a runner pod is ready for execs or has already stopped"""
+    if pod is None or pod.status is None:
+        return False
+    if pod.status.phase in ('Succeeded', 'Failed'):
+        return True
+    return pod.status.phase == 'Running' and all(
+        s.ready for s in (pod.status.container_statuses or [])
+    )
+
+
+class InstrumentedApiClient(client.ApiClient):
+    """ApiClient that counts and times every request by method and resource path"""
+
+    def call_api(self, resource_path, method, *args, **kwargs):
+        # resource_path is the route template (/api/v1/namespaces/{namespace}/pods),
+        # so the labels stay low-cardinality
+        started = time.monotonic()
+        try:
+            return super().call_api(resource_path, method, *args, **kwargs)
+        except ApiException as e:
+            metrics.counter(
+                'k8s_api_errors', method=method, resource=resource_path, status=str(e.status)
+            ).inc()
+            raise
+        finally:
+            # For watches and execs this is the time until the stream opened
+            metrics.latency('k8s_api', method=method, resource=resource_path).observe(
+                time.monotonic() - started
+            )
+
 
 class KubernetesCodeExecutor:
     """Manages code execution via Kubernetes Jobs"""
 
-    def __init__(self, namespace='interview-platform'):
-        """Initialize Kubernetes client"""
+    def __init__(self, namespace='interview-platform', pool_size=0, pool_max_size=None,
+                 pool_acquire_timeout=5.0, pool_pod_lifetime=900,
+                 reaper_interval=30, reaper_max_age=300, max_output_bytes=1024 * 1024, apis=None):
+        """
+        Initialize Kubernetes client
+
+        Args:
+            namespace: Namespace that runner Jobs and pods are created in
+            pool_size: Idle runner pods kept per language (0 creates a Job per execution)
+            pool_max_size: Upper bound each pool grows to while callers are waiting
+            pool_acquire_timeout: Seconds to wait for an idle pod before falling back to a Job
+            pool_pod_lifetime: Seconds before Kubernetes kills a pool pod nobody claimed
+            reaper_interval: Seconds between namespace-wide sweeps for leftover Jobs
+            reaper_max_age: Jobs older than this are reaped whatever their state
+            max_output_bytes: Output kept per execution before it is stopped (None for no cap)
+            apis: Optional (batch_v1, core_v1, coordination_v1) used instead of
+                clients built from the kube config, e.g. k8s_fake.FakeCluster.apis()
+        """
         self.namespace = namespace
-        try:
-            # Try in-cluster config first (when running in K8s)
-            config.load_incluster_config()
-        except config.ConfigException:
-            # Fall back to kubeconfig (for local development)
-            config.load_kube_config()
+        self.pool_acquire_timeout = pool_acquire_timeout
+        self.max_output_bytes = max_output_bytes
+        # Parsed once; every Job starts from a deep copy
+        self._templates = {}
+        for language, filename in TEMPLATE_FILES.items():
+            with open(os.path.join(TEMPLATE_DIR, filename), 'r') as f:
+                self._templates[language] = yaml.safe_load(f)
+        if apis is None:
+            try:
+                # Try in-cluster config first (when running in K8s)
+                config.load_incluster_config()
+            except config.ConfigException:
+                # Fall back to kubeconfig (for local development)
+                config.load_kube_config()
+            apis = (
+                client.BatchV1Api(InstrumentedApiClient()),
+                client.CoreV1Api(InstrumentedApiClient()),
+                client.CoordinationV1Api(InstrumentedApiClient()),
+            )
 
-        self.batch_v1 = client.BatchV1Api()
-        self.core_v1 = client.CoreV1Api()
+        self.batch_v1, self.core_v1, coordination_v1 = apis
+        # Shared watch on runner Jobs/pods; polling remains the fallback while it is not synced
+        self.informer = ExecutorInformer(self.batch_v1, self.core_v1, namespace)
+        self.reaper = JobReaper(
+            self.batch_v1, self.core_v1, coordination_v1, namespace,
+            informer=self.informer, interval=reaper_interval, max_age=reaper_max_age
+        )
+
+        self.pod_pools = {}
+        if pool_size > 0:
+            for language in ('python', 'java', 'c++'):
+                manifest = pod_manifest_from_job(
+                    self._load_job_template(language), language, pool_pod_lifetime
+                )
+                self.pod_pools[language] = PodPool(
+                    self.core_v1, namespace, language, manifest,
+                    min_size=pool_size, max_size=pool_max_size, informer=self.informer
+                )
 
     def _load_job_template(self, language):
-        """Load the appropriate job template for the language"""
-        template_map = {
-            'python': 'k8s/code-runners/python-runner.yaml',
-            'java': 'k8s/code-runners/java-runner.yaml',
-            'c++': 'k8s/code-runners/cpp-runner.yaml'
-        }
-
-        template_path = template_map.get(language)
-        if not template_path:
+        """Return a private copy of the parsed job template for the language"""
+        template = self._templates.get(language)
+        if template is None:
             raise ValueError(f"Unsupported language: {language}")
+        return copy.deepcopy(template)
 
-        with open(template_path, 'r') as f:
-            return yaml.safe_load(f)
-
-    def _create_job_from_template(self, language, code, job_id):
-        """Create a Job object from template with code injected"""
+    def _create_job_from_template(self, language, job_id):
+        """Create a Job object from template, pointing its source volume at the job's ConfigMap"""
         job_template = self._load_job_template(language)
 
         # Replace placeholders
-        job_name = f"{language}-executor-{job_id}"
+        job_name = job_template['metadata']['name'].replace('JOBID', job_id)
         job_template['metadata']['name'] = job_name
+        # Lets the reaper delete many jobs with one label-selected call
+        job_template['metadata']['labels']['execution-id'] = job_id
+
+        for volume in job_template['spec']['template']['spec']['volumes']:
+            if volume['name'] == 'source':
+                volume['configMap']['name'] = self._source_name(job_name)
 
-        # Inject code into the job spec
-        container = job_template['spec']['template']['spec']['containers'][0]
+        self._wrap_runner(job_template['spec']['template']['spec']['containers'][0])
+        return job_template, job_name
 
-        if language == 'python':
-            # For Python, replace the args with the actual code
-            container['args'] = [code]
+    @staticmethod
+    def _wrap_runner(container):
+        """
+        Run the template's command under the resource-reporting wrapper
+
+        Shell templates compile on every line but the last, which runs the
+        program; other templates are a single run command.
+        """
+        command = container.get('command', []) + container.get('args', [])
+        if command[:2] == ['/bin/sh', '-c']:
+            lines = [line.strip() for line in command[2].strip().splitlines() if line.strip()]
+            build, run = ' && '.join(lines[:-1]), lines[-1]
         else:
-            # For Java and C++, replace CODE_PLACEHOLDER in the command
-            command_str = container['args'][0]
-            container['args'][0] = command_str.replace('CODE_PLACEHOLDER', code)
+            build, run = '', shlex.join(command)
+        container['command'] = ['/bin/sh', '-c']
+        container['args'] = [resource_usage.wrap_k8s_script(build, run)]
 
-        return job_template, job_name
+    @staticmethod
+    def _source_name(job_name):
+        return f"{job_name}-src"
+
+    def _create_source(self, job_name, files):
+        """
+        Store submitted files in a ConfigMap mounted read-only at /src
+
+        Keeping source out of the Job spec avoids quoting problems and
+        argument-length limits, and keeps the Job object small.
+        """
+        self.core_v1.create_namespaced_config_map(
+            namespace=self.namespace,
+            body={
+                'apiVersion': 'v1',
+                'kind': 'ConfigMap',
+                'metadata': {
+                    'name': self._source_name(job_name),
+                    'labels': {'role': 'code-executor', 'job-name': job_name},
+                },
+                'data': files,
+            }
+        )
+
+    def _adopt_source(self, job_name, job):
+        """Make the Job own its ConfigMap so deleting the Job (or its TTL) removes both"""
+        try:
+            self.core_v1.patch_namespaced_config_map(
+                name=self._source_name(job_name),
+                namespace=self.namespace,
+                body={'metadata': {'ownerReferences': [{
+                    'apiVersion': 'batch/v1',
+                    'kind': 'Job',
+                    'name': job_name,
+                    'uid': job.metadata.uid,
+                }]}}
+            )
+        except ApiException as e:
+            print(f"Could not attach source ConfigMap to {job_name}: {e.reason}")
+
+    def _delete_source(self, job_name):
+        try:
+            self.core_v1.delete_namespaced_config_map(
+                name=self._source_name(job_name), namespace=self.namespace
+            )
+        except ApiException:
+            pass  # Already gone
+
+    def _capture(self, on_output=None):
+        """Bounded capture that keeps the runner's resource report out of the output"""
+        return OutputCapture(
+            self.max_output_bytes, on_output, report_prefix=resource_usage.RESOURCE_MARKER
+        )
 
-    def execute_code(self, code, language='python', timeout=30):
+    def execute_code(self, code, language='python', timeout=30, on_output=None):
         """
         Execute code in a Kubernetes Job
 
@@ -69,38 +231,62 @@ class KubernetesCodeExecutor:
             code: The code to execute
             language: Programming language (python, java, c++)
             timeout: Maximum execution time in seconds
+            on_output: Optional callable(stream, text) receiving output as it is
+                produced; Job runs then follow the pod log instead of reading it at the end
 
         Returns:
-            dict: {'output': str, 'error': str, 'status': str}
+            dict: {'output': str, 'error': str, 'status': str, 'truncated': bool}
         """
+        pool = self.pod_pools.get(language)
+        if pool is not None:
+            result = self._execute_pooled(pool, code, language, timeout, self._capture(on_output))
+            if result is not None:
+                return result
+
         job_id = str(uuid.uuid4())[:8]
 
         try:
             # Create job from template
-            job_manifest, job_name = self._create_job_from_template(
-                language, code, job_id
-            )
-
-            # Create the job
-            self.batch_v1.create_namespaced_job(
-                namespace=self.namespace,
-                body=job_manifest
-            )
-
-            # Wait for job completion
-            result = self._wait_for_job_completion(job_name, timeout)
-
-            # Get pod logs
-            output = self._get_job_logs(job_name)
+            job_manifest, job_name = self._create_job_from_template(language, job_id)
 
-            # Cleanup job
-            self._delete_job(job_name)
-
-            return {
-                'output': output,
-                'error': '' if result == 'succeeded' else 'Job failed',
-                'status': result
+            # Source goes first so the pod can mount it as soon as it is scheduled
+            self._create_source(job_name, {SOURCE_FILES[language]: code})
+            try:
+                job = self.batch_v1.create_namespaced_job(
+                    namespace=self.namespace,
+                    body=job_manifest
+                )
+            except Exception:
+                self._delete_source(job_name)
+                raise
+            self._adopt_source(job_name, job)
+
+            capture = self._capture(on_output)
+            if on_output is not None:
+                result = self._follow_job(job_name, timeout, capture)
+            else:
+                # Wait for job completion
+                result = self._wait_for_job_completion(job_name, timeout)
+                self._get_job_logs(job_name, capture)
+            usage = resource_usage.parse_k8s_report(''.join(capture.reports))[1]
+
+            # Cleanup happens in the background, batched with other finished jobs
+            self.reaper.release(job_id)
+
+            if capture.truncated:
+                result, error = 'output_limit_exceeded', f"Output exceeded {capture.limit} bytes"
+            else:
+                error = '' if result == 'succeeded' else 'Job failed'
+            execution = {
+                'output': capture.stdout,
+                'error': error,
+                'status': result,
+                'truncated': capture.truncated,
+                'output_bytes': capture.size,
             }
+            execution.update(usage or {})
+            resource_usage.record(language, execution)
+            return execution
 
         except ApiException as e:
             return {
@@ -115,8 +301,208 @@ class KubernetesCodeExecutor:
                 'status': 'failed'
             }
 
+    def _execute_pooled(self, pool, code, language, timeout, capture):
+        """
+        Run code in a warm pod, recording acquire/run/collect timings
+
+        Returns:
+            dict or None: None when no pod could be claimed or reached, so the
+                caller falls back to a Job
+        """
+        started = time.monotonic()
+        pod_name = pool.acquire(self.pool_acquire_timeout)
+        acquired = time.monotonic() - started
+        if pod_name is None:
+            return None
+
+        try:
+            run = pool.run(pod_name, code, timeout, capture)
+        except ApiException as e:
+            # Pod vanished between being claimed and the exec (evicted, node drained, ...)
+            print(f"Pool pod {pod_name} unusable, falling back to a Job: {e.reason}")
+            return None
+        except Exception as e:
+            return {'output': '', 'error': str(e), 'status': 'failed'}
+        finally:
+            pool.release(pod_name)
+
+        label = language.replace('+', 'p')
+        metrics.latency('k8s_pool_acquire', language=label).observe(acquired)
+        metrics.latency('k8s_pool_exec', language=label).observe(run['run_s'])
+        metrics.latency('k8s_pool_collect', language=label).observe(run['collect_s'])
+
+        if run['truncated']:
+            status, error = 'output_limit_exceeded', f"Output exceeded {capture.limit} bytes"
+        elif run['timed_out']:
+            status, error = 'timeout', f"Execution timed out after {timeout}s"
+        elif run['exit_code'] == 0:
+            status, error = 'succeeded', ''
+        else:
+            status, error = 'failed', 'Job failed'
+        result = {
+            # Same stream the Job path returns from its pod log
+            'output': run['stdout'] + run['stderr'],
+            'error': error,
+            'status': status,
+            'exit_code': run['exit_code'],
+            'truncated': run['truncated'],
+            'pooled': True,
+            'acquire_ms': round(acquired * 1000, 1),
+            'exec_ms': round(run['run_s'] * 1000, 1),
+            'collect_ms': round(run['collect_s'] * 1000, 1),
+            'output_bytes': capture.size,
+        }
+        result.update(run['usage'] or {})
+        resource_usage.record(language, result)
+        return result
+
+    def judge(self, code, language, cases, time_limit=2.0, stop_on_failure=False):
+        """
+        Compile once and run the submission against every test case in one pod
+
+        Uses a warm pool pod when one is available, otherwise starts a
+        dedicated runner pod for the submission.
+
+        Args:
+            cases: List of {'stdin', 'expected'} dicts (see judge.validate_cases)
+            time_limit: Seconds allowed per case
+            stop_on_failure: Skip remaining cases after the first failure
+
+        Returns:
+            dict: {'status', 'verdict', 'passed', 'total', 'cases', ...}
+        """
+        if language not in self._templates:
+            return judge.not_run('failed', cases, error='Unsupported language')
+
+        pool = self.pod_pools.get(language)
+        pod_name = pool.acquire(self.pool_acquire_timeout) if pool is not None else None
+        pooled = pod_name is not None
+        container = self._templates[language]['spec']['template']['spec']['containers'][0]['name']
+        source = code.encode('utf-8')
+
+        try:
+            if not pooled:
+                pod_name = self._start_judge_pod(language, time_limit * len(cases) + 120)
+
+            compile_script = build_script(language, len(source), run=False)
+            if compile_script:
+                compiled = exec_in_pod(
+                    self.core_v1, self.namespace, pod_name, container, compile_script, source, 60,
+                    self._capture()
+                )
+                if compiled['timed_out']:
+                    return judge.not_run('timeout', cases, error='Compilation timed out')
+                if compiled['exit_code'] != 0:
+                    return judge.not_run(
+                        'compile_error', cases, compile_output=compiled['stderr'] or compiled['stdout']
+                    )
+
+            def run_case(stdin):
+                data = stdin.encode('utf-8')
+                # Interpreted source travels with every case; compiled code is already in /tmp
+                payload = source + data if language == 'python' else data
+                script = build_script(
+                    language, len(source), len(data), limit=time_limit, compile=False
+                )
+                run = exec_in_pod(
+                    self.core_v1, self.namespace, pod_name, container, script, payload, time_limit + 5,
+                    self._capture()
+                )
+                if run['truncated']:
+                    status = 'output_limit_exceeded'
+                elif run['timed_out'] or (
+                    run['exit_code'] == KILLED_EXIT_CODE and run['run_s'] >= time_limit
+                ):
+                    status = 'timeout'
+                else:
+                    status = 'succeeded' if run['exit_code'] == 0 else 'failed'
+                return {
+                    'status': status,
+                    'stdout': run['stdout'],
+                    'stderr': run['stderr'],
+                    'exit_code': run['exit_code'],
+                }
+
+            result = judge.run_cases(cases, run_case, stop_on_failure)
+            result['pooled'] = pooled
+            return result
+        except ApiException as e:
+            return judge.not_run('failed', cases, error=f"Kubernetes API error: {e.reason}")
+        except Exception as e:
+            return judge.not_run('failed', cases, error=str(e))
+        finally:
+            if pooled:
+                pool.release(pod_name)
+            elif pod_name is not None:
+                self._delete_pod(pod_name)
+
+    def _start_judge_pod(self, language, lifetime, startup_timeout=60):
+        """Create a dedicated runner pod and wait until it can accept execs"""
+        manifest = pod_manifest_from_job(self._load_job_template(language), language, int(lifetime))
+        manifest['metadata']['labels']['pool'] = 'judge'
+        pod = self.core_v1.create_namespaced_pod(namespace=self.namespace, body=manifest)
+        pod_name = pod.metadata.name
+
+        if self.informer.synced:
+            pod = self.informer.wait_for_pod(
+                pod_name, _pod_settled, startup_timeout, resync=self._read_pod
+            )
+        else:
+            pod = self._poll_pod_settled(pod_name, startup_timeout)
+        if pod is not None and pod.status.phase == 'Running':
+            return pod_name
+        self._delete_pod(pod_name)
+        raise RuntimeError("Runner pod did not start in time")
+
+    def _read_pod(self, pod_name):
+        """Ask the API server directly, in case the watch missed an event"""
+        try:
+            return self.core_v1.read_namespaced_pod(name=pod_name, namespace=self.namespace)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+
+    def _poll_pod_settled(self, pod_name, timeout):
+        """Fallback for when the informer is not synced; returns None on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            pod = self._read_pod(pod_name)
+            if _pod_settled(pod):
+                return pod
+            time.sleep(0.25)
+        return None
+
+    def _delete_pod(self, pod_name):
+        try:
+            self.core_v1.delete_namespaced_pod(
+                name=pod_name, namespace=self.namespace, grace_period_seconds=0
+            )
+        except ApiException:
+            pass  # Already gone
+
     def _wait_for_job_completion(self, job_name, timeout):
         """Wait for job to complete or timeout"""
+        if self.informer.synced:
+            return self.informer.wait_for_job(job_name, timeout, resync=self._read_job_state)
+        return self._poll_job_completion(job_name, timeout)
+
+    def _read_job_state(self, job_name):
+        """Ask the API server directly, in case the watch missed an event"""
+        try:
+            job = self.batch_v1.read_namespaced_job_status(name=job_name, namespace=self.namespace)
+        except ApiException as e:
+            if e.status == 404:
+                return 'not_found'
+            raise
+        if job.status.succeeded:
+            return 'succeeded'
+        if job.status.failed:
+            return 'failed'
+        return None
+
+    def _poll_job_completion(self, job_name, timeout):
+        """Poll the job's status until it completes or timeout"""
         start_time = time.time()
 
         while time.time() - start_time < timeout:
@@ -145,45 +531,89 @@ class KubernetesCodeExecutor:
         # Timeout reached
         return 'timeout'
 
-    def _get_job_logs(self, job_name):
-        """Get logs from the job's pod"""
-        try:
-            # Find pods for this job
+    def _job_pods(self, job_name):
+        """The job's pods, from the watch cache when it has them"""
+        pods = self.informer.pods({'job-name': job_name}) if self.informer.synced else []
+        if not pods:
             pods = self.core_v1.list_namespaced_pod(
                 namespace=self.namespace,
                 label_selector=f"job-name={job_name}"
-            )
+            ).items
+        return pods
 
-            if not pods.items:
-                return "No pods found for job"
+    def _follow_job(self, job_name, timeout, capture):
+        """
+        Stream the job's log into capture while it runs, deleting the job
+        early if the output cap is hit
 
-            # Get logs from the first pod
-            pod_name = pods.items[0].metadata.name
-            logs = self.core_v1.read_namespaced_pod_log(
-                name=pod_name,
-                namespace=self.namespace,
-                container=pods.items[0].spec.containers[0].name
-            )
+        Returns:
+            str: Final job state, as from _wait_for_job_completion
+        """
+        deadline = time.monotonic() + timeout
+        # Logs can only be followed once the container has started
+        while time.monotonic() < deadline:
+            pods = self._job_pods(job_name)
+            if pods and pods[0].status.phase not in (None, 'Pending'):
+                break
+            time.sleep(0.25)
+        else:
+            return 'timeout'
 
-            return logs
+        self._get_job_logs(job_name, capture, follow=True, timeout=deadline - time.monotonic())
+        if capture.truncated:
+            try:
+                self.batch_v1.delete_namespaced_job(
+                    name=job_name, namespace=self.namespace, propagation_policy='Background'
+                )
+            except ApiException:
+                pass  # Already gone; the reaper covers anything left
+            return 'output_limit_exceeded'
+        return self._wait_for_job_completion(job_name, max(deadline - time.monotonic(), 1))
 
-        except ApiException as e:
-            return f"Error getting logs: {e.reason}"
+    def _get_job_logs(self, job_name, capture, follow=False, timeout=None):
+        """
+        Read the job pod's log into capture chunk by chunk, stopping once it is full
 
-    def _delete_job(self, job_name):
-        """Delete a job and its pods"""
+        Args:
+            follow: Keep reading as the container writes, until it exits or timeout
+        """
         try:
-            # Delete job (propagation policy will delete pods too)
-            self.batch_v1.delete_namespaced_job(
-                name=job_name,
+            pods = self._job_pods(job_name)
+            if not pods:
+                capture.feed('stdout', "No pods found for job")
+                return
+
+            # Get logs from the first pod
+            kwargs = {'_request_timeout': timeout} if timeout else {}
+            resp = self.core_v1.read_namespaced_pod_log(
+                name=pods[0].metadata.name,
                 namespace=self.namespace,
-                propagation_policy='Foreground'
+                container=pods[0].spec.containers[0].name,
+                follow=follow,
+                _preload_content=False,
+                **kwargs
             )
-        except ApiException:
-            pass  # Ignore deletion errors
+            try:
+                for chunk in resp.stream(READ_SIZE):
+                    if not capture.feed('stdout', chunk):
+                        break
+            finally:
+                # Closing drops whatever the server had left to send
+                resp.close()
+                resp.release_conn()
+
+        except ApiException as e:
+            capture.feed('stdout', f"Error getting logs: {e.reason}")
+        except Exception as e:
+            # A followed log outliving its timeout
+            capture.feed('stdout', f"Error getting logs: {e}")
+        finally:
+            capture.finish()
 
     def get_active_jobs(self):
         """Get count of active code execution jobs"""
+        if self.informer.synced:
+            return self.informer.active_jobs()
         try:
             jobs = self.batch_v1.list_namespaced_job(
                 namespace=self.namespace,
@@ -194,18 +624,28 @@ class KubernetesCodeExecutor:
             return 0
 
     def cleanup_old_jobs(self, max_age_seconds=300):
-        """Clean up jobs older than max_age_seconds"""
+        """Clean up finished jobs and jobs older than max_age_seconds right away"""
         try:
-            jobs = self.batch_v1.list_namespaced_job(
-                namespace=self.namespace,
-                label_selector="role=code-executor"
-            )
-
-            current_time = time.time()
-            for job in jobs.items:
-                job_age = current_time - job.metadata.creation_timestamp.timestamp()
-                if job_age > max_age_seconds:
-                    self._delete_job(job.metadata.name)
-
+            self.reaper.sweep(max_age_seconds)
         except ApiException:
             pass  # Ignore errors during cleanup
+
+    def start(self):
+        """Start the Job/pod watch and reaper, and begin filling the warm pod pools, if enabled"""
+        self.informer.start()
+        self.reaper.start()
+        for pool in self.pod_pools.values():
+            pool.start()
+
+    def shutdown(self):
+        """Stop the watch, flush pending job deletions and delete this process's pool pods"""
+        self.informer.stop()
+        self.reaper.stop()
+        for pool in self.pod_pools.values():
+            pool.shutdown()
+
+    def stats(self):
+        stats = {'informer': self.informer.stats(), 'reaper': self.reaper.stats()}
+        if self.pod_pools:
+            stats['pod_pools'] = {language: pool.stats() for language, pool in self.pod_pools.items()}
+        return stats
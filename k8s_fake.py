@@ -0,0 +1,480 @@
+"""
+In-process Kubernetes Fake
+Stand-ins for the BatchV1/CoreV1/CoordinationV1 calls KubernetesCodeExecutor
+makes, simulating Job scheduling and run time for offline load tests
+"""
+import copy
+import datetime
+import json
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+from resource_usage import RESOURCE_MARKER
+
+# Watch events kept so a watch started from a listing's resourceVersion misses nothing
+_HISTORY = 4096
+
+_SELECTOR_IN = re.compile(r'^([\w.\-/]+)\s+in\s+\(([^)]*)\)$')
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def _split_selector(selector):
+    """Split on commas outside the parentheses of `in (...)` terms"""
+    terms, depth, current = [], 0, ''
+    for char in selector:
+        depth += char == '('
+        depth -= char == ')'
+        if char == ',' and depth == 0:
+            terms.append(current)
+            current = ''
+        else:
+            current += char
+    terms.append(current)
+    return [t.strip() for t in terms if t.strip()]
+
+
+def matches(labels, selector):
+    """Equality and `key in (a,b)` label selectors, the forms this app uses"""
+    labels = labels or {}
+    for term in _split_selector(selector or ''):
+        match = _SELECTOR_IN.match(term)
+        if match:
+            values = {v.strip() for v in match.group(2).split(',')}
+            if labels.get(match.group(1)) not in values:
+                return False
+        else:
+            key, _, value = term.partition('=')
+            if labels.get(key.strip()) != value.strip():
+                return False
+    return True
+
+
+class _Payload:
+    """What ApiClient.deserialize expects: an object with a JSON .data"""
+
+    def __init__(self, data):
+        self.data = json.dumps(data)
+
+
+class _WatchResponse:
+    """Urllib3-like streaming response consumed by kubernetes.watch.Watch"""
+
+    def __init__(self, cluster, kind, events, timeout):
+        self._cluster = cluster
+        self._kind = kind
+        self._events = events
+        self._deadline = time.monotonic() + (timeout or 300)
+        self._closed = False
+
+    def stream(self, amt=None, decode_content=False):
+        while not self._closed:
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = self._events.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+            yield (json.dumps(event) + '\n').encode('utf-8')
+
+    def close(self):
+        self._closed = True
+        self._cluster._unwatch(self._kind, self._events)
+
+    def release_conn(self):
+        pass
+
+
+class _LogResponse:
+    """Urllib3-like response for a pod log read with _preload_content=False"""
+
+    def __init__(self, cluster, pod_name, follow, timeout):
+        self._cluster = cluster
+        self._pod_name = pod_name
+        self._follow = follow
+        self._deadline = time.monotonic() + (timeout or 300)
+        self._closed = False
+
+    def stream(self, amt=None, decode_content=False):
+        amt = amt or 64 * 1024
+        # A followed log ends when the pod finishes; the whole log arrives then
+        while True:
+            with self._cluster._lock:
+                text = self._cluster._logs.get(self._pod_name)
+                gone = self._pod_name not in self._cluster._objects['pods']
+            if text is not None or gone or not self._follow or self._closed:
+                break
+            if time.monotonic() >= self._deadline:
+                return
+            time.sleep(0.05)
+        data = (text or '').encode('utf-8')
+        for start in range(0, len(data), amt):
+            if self._closed:
+                return
+            yield data[start:start + amt]
+
+    def close(self):
+        self._closed = True
+
+    def release_conn(self):
+        pass
+
+
+class FakeCluster:
+    """
+    A namespace's worth of Jobs, pods, ConfigMaps and Leases held in memory
+
+    A created Job gets a pod after schedule_latency, and the pod finishes
+    after run_latency with `output` plus a resource report as its log. Watches
+    get the same ADDED/MODIFIED/DELETED events a real API server would send.
+    Warm pod pools and judging need pod exec, which this fake does not serve.
+    """
+
+    def __init__(self, schedule_latency=0.5, run_latency=0.1, jitter=0.0, api_latency=0.0,
+                 failure_rate=0.0, output='ok\n', seed=0):
+        """
+        Args:
+            schedule_latency: Seconds from Job creation until its pod is running
+            run_latency: Seconds the pod runs before it succeeds or fails
+            jitter: Extra uniformly distributed seconds added to both latencies
+            api_latency: Seconds every API call takes (API server round trip)
+            failure_rate: Fraction of Jobs whose pod fails
+            output: Log text of every finished pod
+            seed: RNG seed for jitter and failures
+        """
+        self.schedule_latency = schedule_latency
+        self.run_latency = run_latency
+        self.jitter = jitter
+        self.api_latency = api_latency
+        self.failure_rate = failure_rate
+        self.output = output
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._objects = {'jobs': {}, 'pods': {}, 'configmaps': {}, 'leases': {}}
+        self._history = {'jobs': deque(maxlen=_HISTORY), 'pods': deque(maxlen=_HISTORY)}
+        self._watchers = {'jobs': [], 'pods': []}
+        self._logs = {}  # pod name -> log text
+        self._deserializer = client.ApiClient()
+        self.calls = Counter()
+
+    def apis(self):
+        """(batch_v1, core_v1, coordination_v1) for KubernetesCodeExecutor(apis=...)"""
+        return FakeBatchV1Api(self), FakeCoreV1Api(self), FakeCoordinationV1Api(self)
+
+    # -- plumbing ---------------------------------------------------------
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        if self.api_latency:
+            time.sleep(self.api_latency)
+
+    def _sample(self, base):
+        with self._lock:
+            return base + self._rng.uniform(0, self.jitter)
+
+    def model(self, data, model_type):
+        return self._deserializer.deserialize(_Payload(data), model_type)
+
+    def _store(self, kind, obj, event_type):
+        """Save obj with a new resourceVersion and notify watchers; caller holds the lock"""
+        self._version += 1
+        obj['metadata']['resourceVersion'] = str(self._version)
+        name = obj['metadata']['name']
+        if event_type == 'DELETED':
+            self._objects[kind].pop(name, None)
+        else:
+            self._objects[kind][name] = obj
+        if kind in self._history:
+            event = {'type': event_type, 'object': copy.deepcopy(obj)}
+            self._history[kind].append((self._version, event))
+            for watcher in self._watchers[kind]:
+                watcher.put(event)
+
+    def _get(self, kind, name):
+        """Object or 404; caller holds the lock"""
+        obj = self._objects[kind].get(name)
+        if obj is None:
+            raise ApiException(status=404, reason='Not Found')
+        return obj
+
+    def _create(self, kind, body):
+        if not isinstance(body, dict):
+            body = self._deserializer.sanitize_for_serialization(body)
+        obj = copy.deepcopy(body)
+        metadata = obj.setdefault('metadata', {})
+        if metadata.get('generateName') and not metadata.get('name'):
+            metadata['name'] = metadata['generateName'] + uuid.uuid4().hex[:5]
+        metadata.setdefault('labels', {})
+        metadata['uid'] = str(uuid.uuid4())
+        metadata['creationTimestamp'] = _now()
+        with self._lock:
+            if metadata['name'] in self._objects[kind]:
+                raise ApiException(status=409, reason='AlreadyExists')
+            self._store(kind, obj, 'ADDED')
+            return copy.deepcopy(obj)
+
+    def _list(self, kind, label_selector):
+        with self._lock:
+            items = [
+                copy.deepcopy(obj) for obj in self._objects[kind].values()
+                if matches(obj['metadata'].get('labels'), label_selector)
+            ]
+            version = str(self._version)
+        return {'metadata': {'resourceVersion': version}, 'items': items}
+
+    def _watch(self, kind, label_selector, resource_version, timeout):
+        events = queue.Queue()
+        filtered = _FilteredQueue(events, label_selector)
+        with self._lock:
+            since = int(resource_version or 0)
+            for version, event in self._history[kind]:
+                if version > since:
+                    filtered.put(event)
+            self._watchers[kind].append(filtered)
+        return _WatchResponse(self, kind, events, timeout)
+
+    def _unwatch(self, kind, events):
+        with self._lock:
+            self._watchers[kind] = [w for w in self._watchers[kind] if w.events is not events]
+
+    def _delete(self, kind, names):
+        """Delete objects plus the pods of deleted Jobs and ConfigMaps they own"""
+        with self._lock:
+            uids = set()
+            for name in names:
+                obj = self._objects[kind].get(name)
+                if obj is None:
+                    continue
+                uids.add(obj['metadata']['uid'])
+                self._store(kind, obj, 'DELETED')
+                if kind == 'pods':
+                    self._logs.pop(name, None)
+                if kind == 'jobs':
+                    for pod in list(self._objects['pods'].values()):
+                        if pod['metadata']['labels'].get('job-name') == name:
+                            self._store('pods', pod, 'DELETED')
+                            self._logs.pop(pod['metadata']['name'], None)
+            for configmap in list(self._objects['configmaps'].values()):
+                owners = configmap['metadata'].get('ownerReferences') or []
+                if any(owner.get('uid') in uids for owner in owners):
+                    self._store('configmaps', configmap, 'DELETED')
+
+    def _selected(self, kind, label_selector):
+        with self._lock:
+            return [
+                name for name, obj in self._objects[kind].items()
+                if matches(obj['metadata'].get('labels'), label_selector)
+            ]
+
+    # -- Job lifecycle ----------------------------------------------------
+
+    def _start_job(self, job):
+        job_name = job['metadata']['name']
+        timer = threading.Timer(self._sample(self.schedule_latency), self._schedule, args=(job_name,))
+        timer.daemon = True
+        timer.start()
+
+    def _schedule(self, job_name):
+        with self._lock:
+            job = self._objects['jobs'].get(job_name)
+            if job is None:
+                return
+            template = job['spec']['template']
+            labels = dict(template['metadata'].get('labels', {}))
+            labels['job-name'] = job_name
+            pod = {
+                'metadata': {
+                    'name': f"{job_name}-{uuid.uuid4().hex[:5]}",
+                    'labels': labels,
+                    'uid': str(uuid.uuid4()),
+                    'creationTimestamp': _now(),
+                },
+                'spec': copy.deepcopy(template['spec']),
+                'status': {'phase': 'Running', 'startTime': _now()},
+            }
+            self._store('pods', pod, 'ADDED')
+            job['status'] = {'active': 1, 'startTime': _now()}
+            self._store('jobs', job, 'MODIFIED')
+            run_for = self.run_latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.failure_rate
+        timer = threading.Timer(run_for, self._finish, args=(job_name, pod['metadata']['name'], failed, run_for))
+        timer.daemon = True
+        timer.start()
+
+    def _finish(self, job_name, pod_name, failed, run_for):
+        rc = 1 if failed else 0
+        report = (
+            f"{RESOURCE_MARKER} phase=run rc={rc} compile_ns=0 wall_ns={int(run_for * 1e9)} "
+            f"cpu_us={int(run_for * 1e6)} peak={16 * 1024 * 1024}"
+        )
+        with self._lock:
+            pod = self._objects['pods'].get(pod_name)
+            if pod is not None:
+                pod['status']['phase'] = 'Failed' if failed else 'Succeeded'
+                self._logs[pod_name] = self.output + report + '\n'
+                self._store('pods', pod, 'MODIFIED')
+            job = self._objects['jobs'].get(job_name)
+            if job is not None:
+                job['status'] = {'failed': 1} if failed else {'succeeded': 1, 'completionTime': _now()}
+                job['status']['conditions'] = [{
+                    'type': 'Failed' if failed else 'Complete', 'status': 'True',
+                    'lastTransitionTime': _now(),
+                }]
+                self._store('jobs', job, 'MODIFIED')
+
+    def stats(self):
+        with self._lock:
+            return {
+                'jobs': len(self._objects['jobs']),
+                'pods': len(self._objects['pods']),
+                'configmaps': len(self._objects['configmaps']),
+                'watchers': sum(len(w) for w in self._watchers.values()),
+                'calls': dict(self.calls),
+            }
+
+
+class _FilteredQueue:
+    """Watcher registration that only forwards events matching its selector"""
+
+    def __init__(self, events, label_selector):
+        self.events = events
+        self.label_selector = label_selector
+
+    def put(self, event):
+        if matches(event['object']['metadata'].get('labels'), self.label_selector):
+            self.events.put(event)
+
+
+class FakeBatchV1Api:
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    def create_namespaced_job(self, namespace, body, **kwargs):
+        self.cluster._call('create_namespaced_job')
+        job = self.cluster._create('jobs', body)
+        self.cluster._start_job(job)
+        return self.cluster.model(job, 'V1Job')
+
+    def read_namespaced_job_status(self, name, namespace, **kwargs):
+        self.cluster._call('read_namespaced_job_status')
+        with self.cluster._lock:
+            job = copy.deepcopy(self.cluster._get('jobs', name))
+        return self.cluster.model(job, 'V1Job')
+
+    def list_namespaced_job(self, namespace, label_selector=None, watch=False,
+                            resource_version=None, timeout_seconds=None, **kwargs):
+        """
+        :return: V1JobList
+        """
+        self.cluster._call('watch_namespaced_job' if watch else 'list_namespaced_job')
+        if watch:
+            return self.cluster._watch('jobs', label_selector, resource_version, timeout_seconds)
+        return self.cluster.model(self.cluster._list('jobs', label_selector), 'V1JobList')
+
+    def delete_namespaced_job(self, name, namespace, **kwargs):
+        self.cluster._call('delete_namespaced_job')
+        self.cluster._delete('jobs', [name])
+
+    def delete_collection_namespaced_job(self, namespace, label_selector=None, **kwargs):
+        self.cluster._call('delete_collection_namespaced_job')
+        self.cluster._delete('jobs', self.cluster._selected('jobs', label_selector))
+
+
+class FakeCoreV1Api:
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    def list_namespaced_pod(self, namespace, label_selector=None, watch=False,
+                            resource_version=None, timeout_seconds=None, **kwargs):
+        """
+        :return: V1PodList
+        """
+        self.cluster._call('watch_namespaced_pod' if watch else 'list_namespaced_pod')
+        if watch:
+            return self.cluster._watch('pods', label_selector, resource_version, timeout_seconds)
+        return self.cluster.model(self.cluster._list('pods', label_selector), 'V1PodList')
+
+    def read_namespaced_pod(self, name, namespace, **kwargs):
+        self.cluster._call('read_namespaced_pod')
+        with self.cluster._lock:
+            pod = copy.deepcopy(self.cluster._get('pods', name))
+        return self.cluster.model(pod, 'V1Pod')
+
+    def read_namespaced_pod_log(self, name, namespace, follow=False, _preload_content=True,
+                                _request_timeout=None, **kwargs):
+        self.cluster._call('read_namespaced_pod_log')
+        with self.cluster._lock:
+            self.cluster._get('pods', name)
+            if _preload_content:
+                return self.cluster._logs.get(name, '')
+        return _LogResponse(self.cluster, name, follow, _request_timeout)
+
+    def delete_namespaced_pod(self, name, namespace, **kwargs):
+        self.cluster._call('delete_namespaced_pod')
+        self.cluster._delete('pods', [name])
+
+    def create_namespaced_config_map(self, namespace, body, **kwargs):
+        self.cluster._call('create_namespaced_config_map')
+        return self.cluster.model(self.cluster._create('configmaps', body), 'V1ConfigMap')
+
+    def patch_namespaced_config_map(self, name, namespace, body, **kwargs):
+        self.cluster._call('patch_namespaced_config_map')
+        with self.cluster._lock:
+            configmap = self.cluster._get('configmaps', name)
+            configmap['metadata'].update(copy.deepcopy(body.get('metadata', {})))
+            self.cluster._store('configmaps', configmap, 'MODIFIED')
+            return self.cluster.model(copy.deepcopy(configmap), 'V1ConfigMap')
+
+    def delete_namespaced_config_map(self, name, namespace, **kwargs):
+        self.cluster._call('delete_namespaced_config_map')
+        with self.cluster._lock:
+            self.cluster._get('configmaps', name)
+        self.cluster._delete('configmaps', [name])
+
+    def list_namespaced_config_map(self, namespace, label_selector=None, **kwargs):
+        self.cluster._call('list_namespaced_config_map')
+        return self.cluster.model(self.cluster._list('configmaps', label_selector), 'V1ConfigMapList')
+
+    def delete_collection_namespaced_config_map(self, namespace, label_selector=None, **kwargs):
+        self.cluster._call('delete_collection_namespaced_config_map')
+        self.cluster._delete('configmaps', self.cluster._selected('configmaps', label_selector))
+
+
+class FakeCoordinationV1Api:
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    def read_namespaced_lease(self, name, namespace, **kwargs):
+        self.cluster._call('read_namespaced_lease')
+        with self.cluster._lock:
+            lease = copy.deepcopy(self.cluster._get('leases', name))
+        return self.cluster.model(lease, 'V1Lease')
+
+    def create_namespaced_lease(self, namespace, body, **kwargs):
+        self.cluster._call('create_namespaced_lease')
+        return self.cluster.model(self.cluster._create('leases', body), 'V1Lease')
+
+    def replace_namespaced_lease(self, name, namespace, body, **kwargs):
+        """Compare-and-swap on resourceVersion, like the API server"""
+        self.cluster._call('replace_namespaced_lease')
+        lease = self.cluster._deserializer.sanitize_for_serialization(body)
+        with self.cluster._lock:
+            current = self.cluster._get('leases', name)
+            if lease['metadata'].get('resourceVersion') != current['metadata']['resourceVersion']:
+                raise ApiException(status=409, reason='Conflict')
+            lease['metadata'] = dict(current['metadata'], **lease['metadata'])
+            self.cluster._store('leases', lease, 'MODIFIED')
+            return self.cluster.model(copy.deepcopy(lease), 'V1Lease')
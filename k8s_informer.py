@@ -0,0 +1,291 @@
+"""
+Kubernetes Job/Pod Informer
+One watch per process on code-executor Jobs and pods, kept in a local cache so
+waiters are woken by events and counts are served without list calls
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+# Deleted job names remembered so a late waiter still learns the job is gone
+_GONE_MEMORY = 1024
+
+
+class ExecutorInformer:
+    """List-then-watch cache of Jobs and pods matching a label selector"""
+
+    def __init__(self, batch_v1, core_v1, namespace, label_selector='role=code-executor',
+                 watch_timeout=300):
+        """
+        Args:
+            label_selector: Objects outside this selector are never cached
+            watch_timeout: Seconds each watch request stays open before it is renewed
+        """
+        self.batch_v1 = batch_v1
+        self.core_v1 = core_v1
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.watch_timeout = watch_timeout
+
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._pods = {}
+        self._gone = OrderedDict()
+        self._waiters = {}  # job name -> set of Events
+        self._pod_waiters = {}  # pod name -> set of Events
+        self._listeners = []
+        self._synced = {'jobs': False, 'pods': False}
+        self._pid = None
+        self._threads = []
+        self._stopped = False
+        self._stats = {
+            'events': 0,
+            'relists': 0,
+            'watch_errors': 0,
+        }
+
+    def start(self):
+        """Start both watches, e.g. again in a worker freshly forked by gunicorn"""
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return self
+            self._pid = os.getpid()
+            self._synced = {'jobs': False, 'pods': False}
+            self._threads = [
+                threading.Thread(
+                    target=self._run, args=('jobs', self.batch_v1.list_namespaced_job),
+                    name='informer-jobs', daemon=True
+                ),
+                threading.Thread(
+                    target=self._run, args=('pods', self.core_v1.list_namespaced_pod),
+                    name='informer-pods', daemon=True
+                ),
+            ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+
+    @property
+    def synced(self):
+        """True once both caches hold a full listing and their watches are connected"""
+        return self._pid == os.getpid() and all(self._synced.values())
+
+    def _run(self, kind, list_fn):
+        """List, then watch from the listing's resourceVersion; relist when it expires"""
+        backoff = 1
+        resource_version = None
+        while not self._stopped:
+            try:
+                if resource_version is None:
+                    listing = list_fn(namespace=self.namespace, label_selector=self.label_selector)
+                    self._replace(kind, listing.items)
+                    resource_version = listing.metadata.resource_version
+                    with self._lock:
+                        self._stats['relists'] += 1
+                        self._synced[kind] = True
+
+                w = watch.Watch()
+                for event in w.stream(list_fn, namespace=self.namespace,
+                                      label_selector=self.label_selector,
+                                      resource_version=resource_version,
+                                      timeout_seconds=self.watch_timeout):
+                    if event['type'] == 'ERROR':
+                        # Usually 410 Gone: our resourceVersion is too old to resume from
+                        resource_version = None
+                        break
+                    self._apply(kind, event['type'], event['object'])
+                    if self._stopped:
+                        w.stop()
+                else:
+                    # Server closed the watch normally; resume where it left off
+                    resource_version = w.resource_version or resource_version
+                backoff = 1
+            except ApiException as e:
+                resource_version = None
+                self._watch_failed(kind, e, backoff)
+                backoff = min(backoff * 2, 30)
+            except Exception as e:
+                resource_version = None
+                self._watch_failed(kind, e, backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _watch_failed(self, kind, error, backoff):
+        with self._lock:
+            self._synced[kind] = False
+            self._stats['watch_errors'] += 1
+        print(f"Kubernetes {kind} watch failed, relisting in {backoff}s: {error}")
+        time.sleep(backoff)
+
+    def _replace(self, kind, items):
+        with self._lock:
+            cache = {obj.metadata.name: obj for obj in items}
+            if kind == 'jobs':
+                self._jobs = cache
+                names = list(self._waiters)
+            else:
+                self._pods = cache
+                names = list(self._pod_waiters)
+        # A relist may have skipped events; let every waiter re-check the cache
+        for name in names:
+            self._wake(kind, name)
+        self._notify(kind, None)
+
+    def _apply(self, kind, event_type, obj):
+        name = obj.metadata.name
+        with self._lock:
+            self._stats['events'] += 1
+            cache = self._jobs if kind == 'jobs' else self._pods
+            if event_type == 'DELETED':
+                cache.pop(name, None)
+                if kind == 'jobs':
+                    self._gone[name] = True
+                    while len(self._gone) > _GONE_MEMORY:
+                        self._gone.popitem(last=False)
+            else:
+                cache[name] = obj
+        self._wake(kind, name)
+        self._notify(kind, obj)
+
+    def _wake(self, kind, name):
+        with self._lock:
+            waiters = self._waiters if kind == 'jobs' else self._pod_waiters
+            events = list(waiters.get(name, ()))
+        for event in events:
+            event.set()
+
+    def subscribe(self, callback):
+        """Call callback(kind, obj) after each cache change; obj is None after a relist"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, kind, obj):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(kind, obj)
+            except Exception as e:
+                print(f"Informer listener failed: {e}")
+
+    def job_state(self, job_name):
+        """'succeeded', 'failed', 'not_found', or None while the job is pending or running"""
+        with self._lock:
+            job = self._jobs.get(job_name)
+            if job is None:
+                return 'not_found' if job_name in self._gone else None
+        if job.status and job.status.succeeded:
+            return 'succeeded'
+        if job.status and job.status.failed:
+            return 'failed'
+        return None
+
+    def wait_for_job(self, job_name, timeout, resync=None, resync_interval=5.0):
+        """
+        Block until the job finishes, is deleted, or timeout elapses
+
+        Args:
+            resync: Optional callable(job_name) -> state or None, used every
+                resync_interval seconds in case the watch missed an event
+
+        Returns:
+            str: 'succeeded', 'failed', 'not_found' or 'timeout'
+        """
+        event = threading.Event()
+        with self._lock:
+            self._waiters.setdefault(job_name, set()).add(event)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                state = self.job_state(job_name)
+                if state is not None:
+                    return state
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return 'timeout'
+                if not event.wait(min(remaining, resync_interval)) and resync is not None:
+                    state = resync(job_name)
+                    if state is not None:
+                        return state
+                event.clear()
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_name)
+                if waiters is not None:
+                    waiters.discard(event)
+                    if not waiters:
+                        del self._waiters[job_name]
+
+    def wait_for_pod(self, pod_name, done, timeout, resync=None, resync_interval=5.0):
+        """
+        Block until done(pod) is true for the cached pod, or timeout elapses
+
+        Args:
+            done: Callable(pod) -> bool; pod is None while it is not cached
+            resync: Optional callable(pod_name) -> pod or None, used every
+                resync_interval seconds in case the watch missed an event
+
+        Returns:
+            The pod done() accepted, or None on timeout
+        """
+        event = threading.Event()
+        with self._lock:
+            self._pod_waiters.setdefault(pod_name, set()).add(event)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                with self._lock:
+                    pod = self._pods.get(pod_name)
+                if done(pod):
+                    return pod
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                if not event.wait(min(remaining, resync_interval)) and resync is not None:
+                    pod = resync(pod_name)
+                    if done(pod):
+                        return pod
+                event.clear()
+        finally:
+            with self._lock:
+                waiters = self._pod_waiters.get(pod_name)
+                if waiters is not None:
+                    waiters.discard(event)
+                    if not waiters:
+                        del self._pod_waiters[pod_name]
+
+    def active_jobs(self):
+        """Jobs with a running pod, from the cache"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return len([j for j in jobs if j.status and j.status.active])
+
+    def jobs(self):
+        """Every cached Job"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pods(self, labels):
+        """Cached pods whose labels include every key/value in labels"""
+        with self._lock:
+            pods = list(self._pods.values())
+        return [
+            pod for pod in pods
+            if all((pod.metadata.labels or {}).get(k) == v for k, v in labels.items())
+        ]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['jobs'] = len(self._jobs)
+            stats['pods'] = len(self._pods)
+            stats['waiters'] = sum(len(w) for w in self._waiters.values())
+            stats['pod_waiters'] = sum(len(w) for w in self._pod_waiters.values())
+        stats['synced'] = self.synced
+        return stats
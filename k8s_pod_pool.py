@@ -0,0 +1,416 @@
+"""
+Kubernetes Warm Pod Pool
+Keeps pre-started runner pods idle per language so an execution is dispatched
+with a single exec instead of creating a Job and waiting for a pod to schedule
+"""
+import copy
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+from kubernetes.stream import stream
+
+import resource_usage
+from output_capture import OutputCapture
+
+# Idle pods just sleep; activeDeadlineSeconds bounds pods left behind by a dead worker
+IDLE_COMMAND = ['/bin/sh', '-c', 'trap "exit 0" TERM; while true; do sleep 5; done']
+
+# Shell run inside a claimed pod. Everything arrives on stdin: {size} bytes of
+# source (compiled languages: only when compiling) followed by {input_size}
+# bytes handed to the program. The exec protocol cannot half-close stdin, so
+# head -c supplies the EOF the program would otherwise never see.
+COMPILE_SCRIPTS = {
+    'java': 'head -c {size} > /tmp/Main.java && javac -d /tmp /tmp/Main.java',
+    'c++': 'head -c {size} > /tmp/main.cpp && g++ /tmp/main.cpp -o /tmp/main',
+}
+RUN_SCRIPTS = {
+    # From a file, not python3 -c: an argument is bounded by ARG_MAX, a submission is not
+    'python': 'head -c {size} > /tmp/main.py && head -c {input_size} | timeout -s KILL {limit} python3 /tmp/main.py',
+    'java': 'head -c {input_size} | timeout -s KILL {limit} java -cp /tmp Main',
+    'c++': 'head -c {input_size} | timeout -s KILL {limit} /tmp/main',
+}
+
+# Exit status of a program killed by `timeout -s KILL`
+KILLED_EXIT_CODE = 137
+
+
+def build_script(language, source_size, input_size=0, limit=30, compile=True, run=True):
+    """Shell command that compiles and/or runs a submission from stdin"""
+    steps = []
+    if compile and language in COMPILE_SCRIPTS:
+        steps.append(COMPILE_SCRIPTS[language].format(size=source_size))
+    if run:
+        steps.append(RUN_SCRIPTS[language].format(
+            size=source_size, input_size=input_size, limit=limit
+        ))
+    return ' && '.join(steps)
+
+
+def exec_in_pod(core_v1, namespace, pod_name, container, script, data, timeout, capture=None):
+    """
+    Run a shell script in a pod, writing data to its stdin
+
+    Output is read frame by frame into capture (unbounded by default); once
+    it is full the exec is abandoned, leaving the pod to be deleted.
+
+    Returns:
+        dict: {'stdout', 'stderr', 'exit_code', 'timed_out', 'truncated', 'run_s', 'collect_s'}
+    """
+    capture = capture or OutputCapture()
+    started = time.monotonic()
+    # stream() swaps the request method of the ApiClient it is given while it
+    # connects; a private client keeps other threads' calls off the websocket
+    api_client = core_v1.api_client
+    exec_api = client.CoreV1Api(type(api_client)(api_client.configuration))
+    resp = stream(
+        exec_api.connect_get_namespaced_pod_exec,
+        pod_name, namespace,
+        container=container, command=['/bin/sh', '-c', script],
+        stdin=True, stdout=True, stderr=True, tty=False,
+        _preload_content=False
+    )
+    timed_out = False
+
+    def collect():
+        """Move buffered frames into capture; False once it is full"""
+        if resp.peek_stdout() and not capture.feed('stdout', resp.read_stdout()):
+            return False
+        if resp.peek_stderr() and not capture.feed('stderr', resp.read_stderr()):
+            return False
+        return True
+
+    try:
+        if data:
+            resp.write_stdin(data)
+        deadline = started + timeout
+        while resp.is_open():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            resp.update(timeout=min(1.0, remaining))
+            if not collect():
+                break
+        finished = time.monotonic()
+
+        # Drain what arrived with the final frame and read the exit status
+        collect()
+        exit_code = None if timed_out or capture.truncated else resp.returncode
+    finally:
+        resp.close()
+    capture.finish()
+
+    return {
+        'stdout': capture.stdout,
+        'stderr': capture.stderr,
+        'exit_code': exit_code,
+        'timed_out': timed_out,
+        'truncated': capture.truncated,
+        'run_s': finished - started,
+        'collect_s': time.monotonic() - finished,
+    }
+
+# Seconds a freshly created pod may be missing from a listing before it counts as lost
+STARTING_GRACE = 30
+
+
+def pod_manifest_from_job(job_template, language, lifetime):
+    """Turn a runner Job template into a long-lived idle pod for the pool"""
+    template = copy.deepcopy(job_template['spec']['template'])
+    labels = dict(template['metadata'].get('labels', {}))
+    labels['pool'] = 'warm'
+
+    spec = template['spec']
+    # Source arrives over exec stdin, not through the per-job ConfigMap
+    spec['volumes'] = [v for v in spec.get('volumes', []) if v['name'] != 'source']
+    spec['activeDeadlineSeconds'] = lifetime
+    spec['terminationGracePeriodSeconds'] = 0
+    container = spec['containers'][0]
+    container['command'] = IDLE_COMMAND
+    container.pop('args', None)
+    container['volumeMounts'] = [
+        m for m in container.get('volumeMounts', []) if m['name'] != 'source'
+    ]
+    # Exec scripts write the submission and build output to /tmp, which must
+    # stay writable under readOnlyRootFilesystem
+    if not any(m['mountPath'] == '/tmp' for m in container['volumeMounts']):
+        spec['volumes'].append({'name': 'pool-tmp', 'emptyDir': {}})
+        container['volumeMounts'].append({'name': 'pool-tmp', 'mountPath': '/tmp'})
+
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Pod',
+        'metadata': {
+            'generateName': f"{labels.get('language', language)}-pool-",
+            'labels': labels,
+        },
+        'spec': spec,
+    }
+
+
+class PodPool:
+    """Idle runner pods for one language, grown with demand and recycled after each use"""
+
+    def __init__(self, core_v1, namespace, language, pod_manifest, min_size=2, max_size=None,
+                 poll_interval=1.0, idle_ttl=120, informer=None):
+        """
+        Args:
+            core_v1: CoreV1Api used to create, list, exec into and delete pods
+            language: Submission language the pods run
+            pod_manifest: Pod body from pod_manifest_from_job; a per-process
+                pool-owner label is added on start
+            min_size: Idle pods kept ready when nothing is waiting
+            max_size: Upper bound on idle + starting pods (default 4 x min_size)
+            poll_interval: Seconds between pod status checks
+            idle_ttl: Seconds an idle pod above the current target survives
+            informer: Optional ExecutorInformer; its pod cache replaces list
+                calls and its events wake the pool as soon as a pod is ready
+        """
+        self.core_v1 = core_v1
+        self.namespace = namespace
+        self.language = language
+        self.pod_manifest = pod_manifest
+        self.min_size = min_size
+        self.max_size = max_size or min_size * 4
+        self.poll_interval = poll_interval
+        self.idle_ttl = idle_ttl
+        self.informer = informer
+        self.owner = None
+        self.container = pod_manifest['spec']['containers'][0]['name']
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (pod_name, ready_since)
+        self._starting = {}  # pod_name -> created_at
+        self._busy = set()
+        self._waiting = 0
+        self._pid = None
+        self._thread = None
+        self._stopped = False
+        self._stats = {
+            'claimed': 0,
+            'acquire_timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'lost': 0,
+            'scaled_down': 0,
+        }
+        if informer is not None:
+            informer.subscribe(self._on_pod_event)
+
+    def _labels(self):
+        return {
+            'pool-owner': self.owner,
+            'language': self.pod_manifest['metadata']['labels']['language'],
+        }
+
+    def _selector(self):
+        return ','.join(f"{k}={v}" for k, v in self._labels().items())
+
+    def _on_pod_event(self, kind, pod):
+        """Reconcile right away when one of our pods changes"""
+        if kind != 'pods':
+            return
+        if pod is not None and (pod.metadata.labels or {}).get('pool-owner') != self.owner:
+            return
+        with self._cond:
+            self._cond.notify_all()
+
+    def _ensure_started(self):
+        """(Re)start the reconcile thread, e.g. in a worker freshly forked by gunicorn"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                # Pods tracked by the parent stay the parent's; label ours separately
+                self.owner = uuid.uuid4().hex[:12]
+                self.pod_manifest['metadata']['labels']['pool-owner'] = self.owner
+                self._idle.clear()
+                self._starting.clear()
+                self._busy.clear()
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._reconcile_loop, name=f"pod-pool-{self.language}", daemon=True
+                )
+                self._thread.start()
+
+    def start(self):
+        self._ensure_started()
+        return self
+
+    def target_size(self):
+        """Idle pods wanted right now: the floor plus one per blocked caller"""
+        with self._cond:
+            return min(self.max_size, self.min_size + self._waiting)
+
+    def _reconcile_loop(self):
+        while not self._stopped:
+            try:
+                self._reconcile()
+            except Exception as e:
+                print(f"Error reconciling {self.language} pod pool: {e}")
+                time.sleep(5)
+            with self._cond:
+                self._cond.wait(timeout=self.poll_interval)
+
+    def _reconcile(self):
+        """Promote pods that became ready, forget lost ones, and resize towards target"""
+        if self.informer is not None and self.informer.synced:
+            pods = self.informer.pods(self._labels())
+        else:
+            pods = self.core_v1.list_namespaced_pod(
+                namespace=self.namespace, label_selector=self._selector()
+            ).items
+        phases = {pod.metadata.name: pod for pod in pods}
+        now = time.monotonic()
+        expired = []
+
+        with self._cond:
+            for name, created in list(self._starting.items()):
+                pod = phases.get(name)
+                if pod is None and now - created < STARTING_GRACE:
+                    continue  # Not in the watch cache yet
+                if pod is None or pod.status.phase in ('Succeeded', 'Failed'):
+                    del self._starting[name]
+                    self._stats['lost'] += 1
+                    expired.append(name)
+                elif pod.status.phase == 'Running' and all(
+                    s.ready for s in (pod.status.container_statuses or [])
+                ):
+                    del self._starting[name]
+                    self._idle.append((name, now))
+                    self._cond.notify()
+
+            alive = deque()
+            for name, since in self._idle:
+                pod = phases.get(name)
+                if pod is None or pod.status.phase != 'Running':
+                    self._stats['lost'] += 1
+                    expired.append(name)
+                else:
+                    alive.append((name, since))
+            self._idle = alive
+
+            target = min(self.max_size, self.min_size + self._waiting)
+            # Scale down gently: only surplus pods that have sat idle for idle_ttl
+            while len(self._idle) > target and now - self._idle[0][1] > self.idle_ttl:
+                expired.append(self._idle.popleft()[0])
+                self._stats['scaled_down'] += 1
+            missing = target - len(self._idle) - len(self._starting)
+
+        for name in expired:
+            self._delete(name)
+        for _ in range(max(0, missing)):
+            self._create()
+
+    def _create(self):
+        pod = self.core_v1.create_namespaced_pod(namespace=self.namespace, body=self.pod_manifest)
+        with self._cond:
+            self._starting[pod.metadata.name] = time.monotonic()
+            self._stats['created'] += 1
+
+    def _delete(self, name):
+        try:
+            self.core_v1.delete_namespaced_pod(
+                name=name, namespace=self.namespace, grace_period_seconds=0
+            )
+        except ApiException:
+            pass  # Already gone
+
+    def acquire(self, timeout):
+        """
+        Claim an idle pod
+
+        Returns:
+            str or None: Pod name, or None if none became ready within timeout
+        """
+        self._ensure_started()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._waiting += 1
+            self._cond.notify_all()  # Let the reconciler grow the pool right away
+            try:
+                while not self._idle:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stopped:
+                        self._stats['acquire_timeouts'] += 1
+                        return None
+                    self._cond.wait(timeout=remaining)
+                # Newest first: it is the least likely to have been evicted meanwhile
+                name = self._idle.pop()[0]
+                self._busy.add(name)
+                self._stats['claimed'] += 1
+                return name
+            finally:
+                self._waiting -= 1
+
+    def run(self, pod_name, code, timeout, capture=None):
+        """
+        Compile (if needed) and run a submission in a claimed pod
+
+        Args:
+            capture: OutputCapture to read output into; it must divert
+                resource_usage.RESOURCE_MARKER lines for usage to be reported
+
+        Returns:
+            dict: {'stdout', 'stderr', 'exit_code', 'timed_out', 'truncated', 'run_s',
+                'collect_s', 'usage'}; usage holds the in-pod resource report, or
+                None if the script never printed one (or output was truncated first)
+        """
+        capture = capture or OutputCapture(report_prefix=resource_usage.RESOURCE_MARKER)
+        source = code.encode('utf-8')
+        script = resource_usage.wrap_k8s_script(
+            build_script(self.language, len(source), run=False),
+            build_script(self.language, len(source), limit=timeout, compile=False)
+        )
+        # The in-pod limit kills the program; the exec deadline is only a backstop
+        result = exec_in_pod(
+            self.core_v1, self.namespace, pod_name, self.container, script, source, timeout + 5,
+            capture
+        )
+        result['usage'] = resource_usage.parse_k8s_report(''.join(capture.reports))[1]
+        usage = result['usage'] or {}
+        ran_s = usage['run_ms'] / 1000 if usage.get('run_ms') is not None else result['run_s']
+        if result['exit_code'] == KILLED_EXIT_CODE and ran_s >= timeout:
+            result['timed_out'] = True
+        return result
+
+    def release(self, pod_name):
+        """Retire a used pod; the submission may have left state behind, so it is never reused"""
+        with self._cond:
+            self._busy.discard(pod_name)
+            self._stats['recycled'] += 1
+            self._cond.notify_all()
+        threading.Thread(
+            target=self._delete, args=(pod_name,), name='pod-pool-recycle', daemon=True
+        ).start()
+
+    def shutdown(self):
+        """Stop reconciling and delete every pod this pool created"""
+        self._stopped = True
+        with self._cond:
+            self._cond.notify_all()
+        try:
+            self.core_v1.delete_collection_namespaced_pod(
+                namespace=self.namespace, label_selector=self._selector(),
+                grace_period_seconds=0
+            )
+        except ApiException as e:
+            print(f"Error deleting {self.language} pool pods: {e.reason}")
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['starting'] = len(self._starting)
+            stats['busy'] = len(self._busy)
+            stats['waiting'] = self._waiting
+        stats['target'] = self.target_size()
+        stats['min_size'] = self.min_size
+        stats['max_size'] = self.max_size
+        return stats
@@ -0,0 +1,329 @@
+"""
+Kubernetes Job Reaper
+Deletes finished and orphaned code-executor Jobs, runner pods and ConfigMaps
+in the background, in label-selected batches, with a Lease so only one
+replica sweeps at a time
+"""
+import datetime
+import os
+import queue
+import socket
+import threading
+import time
+
+from kubernetes import client
+from kubernetes.client.rest import ApiException
+
+import metrics
+
+# Names per `execution-id in (...)` selector; keeps the request line short
+DELETE_BATCH = 50
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class JobReaper:
+    """
+    Two duties, both off the request path:
+
+    * Jobs this process finished with are queued by release() and deleted
+      in batches by the reaper thread.
+    * Every `interval` seconds, whichever replica holds the Lease sweeps the
+      namespace for finished or old Jobs, warm pool and judge pods that
+      outlived their use, and orphaned source ConfigMaps, e.g. left behind
+      by a replica that died mid-execution.
+    """
+
+    def __init__(self, batch_v1, core_v1, coordination_v1, namespace, informer=None,
+                 interval=30, max_age=300, finished_grace=30,
+                 lease_name='code-executor-reaper', lease_duration=60):
+        """
+        Args:
+            informer: Optional ExecutorInformer whose Job cache replaces list calls
+            interval: Seconds between sweeps (and lease renewals)
+            max_age: Jobs older than this are deleted whatever their state
+            finished_grace: Finished Jobs are left this long for their owner
+                to collect logs
+            lease_duration: Seconds another replica waits before taking over
+                from a leader that stopped renewing
+        """
+        self.batch_v1 = batch_v1
+        self.core_v1 = core_v1
+        self.coordination_v1 = coordination_v1
+        self.namespace = namespace
+        self.informer = informer
+        self.interval = interval
+        self.max_age = max_age
+        self.finished_grace = finished_grace
+        self.lease_name = lease_name
+        self.lease_duration = lease_duration
+        self.identity = None
+        self.is_leader = False
+
+        self._released = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stopped = False
+        self._stats = {
+            'released': 0,
+            'deleted_released': 0,
+            'sweeps': 0,
+            'reaped_jobs': 0,
+            'reaped_pods': 0,
+            'reaped_configmaps': 0,
+            'backlog': 0,
+            'errors': 0,
+        }
+
+    def _ensure_started(self):
+        """(Re)start the reaper thread, e.g. in a worker freshly forked by gunicorn"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._released = queue.Queue()
+                self.identity = f"{socket.gethostname()}-{os.getpid()}"
+                self.is_leader = False
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='job-reaper', daemon=True)
+                self._thread.start()
+
+    def start(self):
+        self._ensure_started()
+        return self
+
+    def stop(self):
+        """Stop sweeping and delete whatever this process still has queued"""
+        self._stopped = True
+        self._delete_released()
+
+    def release(self, execution_id):
+        """Queue a Job whose result has been collected; never blocks on the API"""
+        self._ensure_started()
+        self._released.put(execution_id)
+        with self._lock:
+            self._stats['released'] += 1
+
+    def _loop(self):
+        next_sweep = time.monotonic()
+        while not self._stopped:
+            try:
+                self._delete_released()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.interval
+                    self.is_leader = self._hold_lease()
+                    if self.is_leader:
+                        self.sweep()
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                print(f"Job reaper error: {e}")
+            time.sleep(1)
+
+    def _delete_released(self):
+        ids = []
+        while True:
+            try:
+                ids.append(self._released.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(ids), DELETE_BATCH):
+            batch = ids[start:start + DELETE_BATCH]
+            try:
+                self._delete_jobs(batch)
+            except Exception as e:
+                # Retried on the next pass rather than left for a sweep that may be minutes away
+                for execution_id in ids[start:]:
+                    self._released.put(execution_id)
+                with self._lock:
+                    self._stats['errors'] += 1
+                print(f"Job reaper could not delete released Jobs: {e}")
+                return
+            with self._lock:
+                self._stats['deleted_released'] += len(batch)
+            metrics.counter('k8s_reaper_deleted', kind='job', reason='released').inc(len(batch))
+
+    def _delete_jobs(self, execution_ids):
+        """One collection delete per batch; pods and owned ConfigMaps go with their Job"""
+        self.batch_v1.delete_collection_namespaced_job(
+            namespace=self.namespace,
+            label_selector=f"role=code-executor,execution-id in ({','.join(execution_ids)})",
+            propagation_policy='Background'
+        )
+
+    def _hold_lease(self):
+        """
+        Acquire or renew the Lease
+
+        Returns:
+            bool: True if this process is the leader until the next renewal
+        """
+        now = _now()
+        try:
+            lease = self.coordination_v1.read_namespaced_lease(self.lease_name, self.namespace)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            try:
+                self.coordination_v1.create_namespaced_lease(self.namespace, client.V1Lease(
+                    metadata=client.V1ObjectMeta(name=self.lease_name, namespace=self.namespace),
+                    spec=client.V1LeaseSpec(
+                        holder_identity=self.identity,
+                        lease_duration_seconds=self.lease_duration,
+                        acquire_time=now, renew_time=now, lease_transitions=0
+                    )
+                ))
+                return True
+            except ApiException as e:
+                if e.status == 409:
+                    return False  # Another replica created it first
+                raise
+
+        spec = lease.spec
+        holder = spec.holder_identity
+        renewed = spec.renew_time or spec.acquire_time
+        expired = renewed is None or (
+            now - renewed
+        ).total_seconds() > (spec.lease_duration_seconds or self.lease_duration)
+        if holder != self.identity and not expired:
+            return False
+
+        if holder != self.identity:
+            spec.holder_identity = self.identity
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.renew_time = now
+        spec.lease_duration_seconds = self.lease_duration
+        try:
+            # resourceVersion from the read makes this a compare-and-swap
+            self.coordination_v1.replace_namespaced_lease(self.lease_name, self.namespace, lease)
+        except ApiException as e:
+            if e.status == 409:
+                return False
+            raise
+        return True
+
+    def _list_jobs(self):
+        if self.informer is not None and self.informer.synced:
+            return self.informer.jobs()
+        return self.batch_v1.list_namespaced_job(
+            namespace=self.namespace, label_selector='role=code-executor'
+        ).items
+
+    def sweep(self, max_age=None):
+        """Delete finished or old runner Jobs and orphaned source ConfigMaps in the namespace"""
+        max_age = self.max_age if max_age is None else max_age
+        now = _now()
+        labelled, unlabelled = [], []
+        for job in self._list_jobs():
+            age = (now - job.metadata.creation_timestamp).total_seconds()
+            status = job.status
+            finished = status is not None and (status.succeeded or status.failed)
+            finished_at = status.completion_time if status is not None else None
+            if finished and finished_at is None:
+                # Failed Jobs have no completionTime; go by their last condition
+                conditions = status.conditions or []
+                finished_at = max(
+                    (c.last_transition_time for c in conditions if c.last_transition_time),
+                    default=None
+                )
+            stale = finished and (
+                finished_at is None or (now - finished_at).total_seconds() > self.finished_grace
+            )
+            if not (stale or age > max_age):
+                continue
+            execution_id = (job.metadata.labels or {}).get('execution-id')
+            if execution_id:
+                labelled.append(execution_id)
+            else:
+                unlabelled.append(job.metadata.name)
+
+        with self._lock:
+            self._stats['sweeps'] += 1
+            self._stats['backlog'] = len(labelled) + len(unlabelled)
+        metrics.distribution('k8s_reaper_backlog').observe(len(labelled) + len(unlabelled))
+
+        for start in range(0, len(labelled), DELETE_BATCH):
+            self._delete_jobs(labelled[start:start + DELETE_BATCH])
+        for name in unlabelled:
+            # Jobs created before they carried an execution-id label
+            try:
+                self.batch_v1.delete_namespaced_job(
+                    name=name, namespace=self.namespace, propagation_policy='Background'
+                )
+            except ApiException:
+                pass
+        reaped_pods = self._sweep_pods(now, max_age)
+        reaped_configmaps = self._sweep_configmaps(now, max_age)
+
+        with self._lock:
+            self._stats['reaped_jobs'] += len(labelled) + len(unlabelled)
+            self._stats['reaped_pods'] += reaped_pods
+            self._stats['reaped_configmaps'] += reaped_configmaps
+        metrics.counter('k8s_reaper_deleted', kind='job', reason='swept').inc(len(labelled) + len(unlabelled))
+        metrics.counter('k8s_reaper_deleted', kind='pod', reason='swept').inc(reaped_pods)
+        metrics.counter('k8s_reaper_deleted', kind='configmap', reason='swept').inc(reaped_configmaps)
+
+    def _list_pods(self):
+        """Warm pool and judge pods; Job pods go with their Job"""
+        if self.informer is not None and self.informer.synced:
+            pods = self.informer.pods({})
+        else:
+            pods = self.core_v1.list_namespaced_pod(
+                namespace=self.namespace, label_selector='role=code-executor,pool'
+            ).items
+        return [pod for pod in pods if (pod.metadata.labels or {}).get('pool')]
+
+    def _sweep_pods(self, now, max_age):
+        """
+        Pool and judge pods whose owner will never delete them
+
+        Owners delete these after a single use, so one that has finished
+        was killed at its activeDeadlineSeconds, unclaimed. The deadline
+        never starts for a pod stuck in Pending, so anything older than
+        its deadline plus max_age goes too.
+        """
+        leaked = []
+        for pod in self._list_pods():
+            phase = pod.status.phase if pod.status is not None else None
+            deadline = (pod.spec.active_deadline_seconds if pod.spec is not None else None) or 0
+            age = (now - pod.metadata.creation_timestamp).total_seconds()
+            if phase in ('Succeeded', 'Failed') or age > deadline + max_age:
+                leaked.append(pod.metadata.name)
+        for name in leaked:
+            try:
+                self.core_v1.delete_namespaced_pod(
+                    name=name, namespace=self.namespace, grace_period_seconds=0
+                )
+            except ApiException:
+                pass  # Already gone
+        return len(leaked)
+
+    def _sweep_configmaps(self, now, max_age):
+        """Source ConfigMaps never adopted by a Job (its creation failed or the app died)"""
+        configmaps = self.core_v1.list_namespaced_config_map(
+            namespace=self.namespace, label_selector='role=code-executor'
+        ).items
+        orphans = [
+            cm.metadata.labels['job-name'] for cm in configmaps
+            if not cm.metadata.owner_references
+            and 'job-name' in (cm.metadata.labels or {})
+            and (now - cm.metadata.creation_timestamp).total_seconds() > max_age
+        ]
+        for start in range(0, len(orphans), DELETE_BATCH):
+            self.core_v1.delete_collection_namespaced_config_map(
+                namespace=self.namespace,
+                label_selector=f"role=code-executor,job-name in ({','.join(orphans[start:start + DELETE_BATCH])})"
+            )
+        return len(orphans)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending_release'] = self._released.qsize()
+        stats['is_leader'] = self.is_leader
+        return stats
@@ -0,0 +1,346 @@
+"""
+LLM Client Layer
+A single per-process client in front of a pluggable backend (Gemini or a
+local fake), with bounded concurrency, per-call deadlines, jittered retries
+and a circuit breaker
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import metrics
+
+
+class LLMError(Exception):
+    """Base class for errors raised by the LLM client"""
+
+
+class LLMTimeout(LLMError):
+    """The call did not finish before its deadline"""
+
+
+class LLMUnavailable(LLMError):
+    """The call was rejected: circuit open or concurrency limit saturated"""
+
+
+class GeminiBackend:
+    """
+    Google Gemini backend; the model object is created once per process and reused
+
+    The SDK is imported and configured on start() or the first call rather
+    than here: its gRPC channels cannot be shared with processes forked later.
+    """
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name='gemini-1.5-flash', call_threads=16):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.call_threads = call_threads
+        self._lock = threading.Lock()
+        self._pid = None
+        self._model = None
+        self._pool = None
+
+    def start(self):
+        """Import and configure the SDK in this process, if not done already"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            import google.generativeai as genai
+
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+            # The SDK has no reliable per-call timeout, so the request and every
+            # chunk read run on a small pool and the caller stops waiting at its deadline
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.call_threads, thread_name_prefix='gemini'
+            )
+            self._pid = os.getpid()
+
+    def _call(self, deadline, message, fn, *args, **kwargs):
+        """Run fn on the pool and return its result, or raise LLMTimeout at the deadline"""
+        future = self._pool.submit(fn, *args, **kwargs)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            # The pool thread stays blocked until the SDK gives up; the caller does not
+            future.cancel()
+            raise LLMTimeout(message)
+
+    def stream(self, prompt, deadline):
+        """Yield text chunks, raising LLMTimeout once the deadline passes"""
+        self.start()
+        response = self._call(
+            deadline, "Gemini did not respond before the deadline",
+            self._model.generate_content, prompt, stream=True
+        )
+        chunks = iter(response)
+        while True:
+            # A stalled stream blocks inside next(), so each read is bounded too
+            chunk = self._call(deadline, "Gemini stream exceeded the deadline", next, chunks, None)
+            if chunk is None:
+                return
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Deterministic local backend for demo mode and offline load tests
+
+    The same prompt always produces the same text. Latency is drawn from a
+    seeded RNG so runs are repeatable.
+    """
+
+    name = 'fake'
+
+    def __init__(self, responder=None, latency=0.0, jitter=0.0, chunk_delay=0.0,
+                 chunk_size=16, error_rate=0.0, seed=0, sigma=0.0):
+        """
+        Args:
+            responder: Callable(prompt) -> str; defaults to an echo
+            latency: Base seconds before the first chunk (the median when sigma > 0)
+            jitter: Extra uniformly distributed seconds added to latency
+            chunk_delay: Seconds between streamed chunks
+            chunk_size: Characters per streamed chunk
+            error_rate: Fraction of calls that raise LLMError
+            seed: RNG seed for latency and error sampling
+            sigma: Log-normal shape applied to latency; larger values give a
+                heavier tail, like a real model under load
+        """
+        self.responder = responder or (lambda prompt: f"Echo: {prompt}")
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.chunk_size = max(1, chunk_size)
+        self.error_rate = error_rate
+        self.sigma = sigma
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def start(self):
+        """Nothing to set up per process"""
+
+    def stream(self, prompt, deadline):
+        with self._rng_lock:
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            if self.sigma:
+                delay += self.latency * (self._rng.lognormvariate(0, self.sigma) - 1)
+            fail = self._rng.random() < self.error_rate
+
+        if time.monotonic() + delay > deadline:
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            raise LLMTimeout("Fake backend exceeded the deadline")
+        time.sleep(delay)
+        if fail:
+            raise LLMError("Injected fake backend failure")
+
+        text = self.responder(prompt)
+        for i in range(0, len(text), self.chunk_size):
+            if i and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[i:i + self.chunk_size]
+
+
+def seeded_choice(prompt, options):
+    """Pick an option deterministically from the prompt text"""
+    digest = hashlib.sha256(prompt.encode('utf-8')).digest()
+    return options[digest[0] % len(options)]
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through after a cool-down"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def allow(self):
+        """
+        Returns:
+            True for a call while closed, 'probe' for the single half-open
+            probe, False if the call must be rejected
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return 'probe'
+
+    def cancel(self):
+        """Give back a half-open probe that ended without a success or failure"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LLMClient:
+    """Process-wide entry point for every LLM call"""
+
+    def __init__(self, backend, max_concurrency=8, timeout=20.0, retries=2,
+                 backoff=0.5, breaker=None):
+        """
+        Args:
+            backend: Object with start() and stream(prompt, deadline) yielding text chunks
+            max_concurrency: Calls allowed in flight at once in this process
+            timeout: Default seconds allowed per call, including retries
+            retries: Extra attempts after a failure before any text was produced
+            backoff: Base seconds for exponential full-jitter backoff
+            breaker: CircuitBreaker instance; a default one is created if None
+        """
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            'calls': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'retries': 0,
+            'rejected': 0,
+        }
+
+    @property
+    def backend_name(self):
+        return self.backend.name
+
+    def start(self):
+        """Set up the backend's per-process clients now instead of on the first call"""
+        self.backend.start()
+        return self
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self._stats[key] += delta
+
+    def _failed(self, kind):
+        """Count a failed call in stats and in the per-backend error metric"""
+        self._count(kind)
+        metrics.counter('llm_errors', backend=self.backend.name, kind=kind).inc()
+
+    def stream(self, prompt, timeout=None):
+        """
+        Yield response text chunks for prompt
+
+        Failures before the first chunk are retried with jittered backoff;
+        once text has been yielded an error is raised to the caller.
+
+        Raises:
+            LLMUnavailable: Circuit open or no concurrency slot before the deadline
+            LLMTimeout: The deadline passed
+            LLMError: The backend failed on every attempt
+        """
+        started = time.monotonic()
+        deadline = started + (timeout if timeout is not None else self.timeout)
+        self._count('calls')
+
+        admitted = self.breaker.allow()
+        if not admitted:
+            self._failed('rejected')
+            raise LLMUnavailable("LLM circuit breaker is open")
+        # Set once the breaker has been told how this call went
+        probe_pending = admitted == 'probe'
+
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            self._failed('rejected')
+            if probe_pending:
+                self.breaker.cancel()
+            raise LLMUnavailable("Too many concurrent LLM calls")
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            attempt = 0
+            while True:
+                produced = False
+                try:
+                    for chunk in self.backend.stream(prompt, deadline):
+                        if not produced:
+                            metrics.latency('llm_first_chunk', backend=self.backend.name).observe(
+                                time.monotonic() - started
+                            )
+                        produced = True
+                        yield chunk
+                    probe_pending = False
+                    self.breaker.record_success()
+                    metrics.latency('llm_call', backend=self.backend.name).observe(
+                        time.monotonic() - started
+                    )
+                    return
+                except LLMTimeout:
+                    self._failed('timeouts')
+                    probe_pending = False
+                    self.breaker.record_failure()
+                    raise
+                except Exception as e:
+                    self._failed('errors')
+                    probe_pending = False
+                    self.breaker.record_failure()
+                    sleep_for = random.uniform(0, self.backoff * (2 ** attempt))
+                    if (produced or attempt >= self.retries
+                            or not self.breaker.allow()
+                            or time.monotonic() + sleep_for >= deadline):
+                        if isinstance(e, LLMError):
+                            raise
+                        raise LLMError(str(e)) from e
+                    attempt += 1
+                    self._count('retries')
+                    time.sleep(sleep_for)
+        finally:
+            # A caller that stops reading (closing the generator) must not leave the probe claimed
+            if probe_pending:
+                self.breaker.cancel()
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def generate(self, prompt, timeout=None):
+        """Return the full response text for prompt"""
+        return "".join(self.stream(prompt, timeout=timeout))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+        stats['backend'] = self.backend.name
+        stats['max_concurrency'] = self.max_concurrency
+        stats['circuit'] = self.breaker.state
+        return stats
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Drives the app's hot routes at a fixed concurrency against a fake LLM backend
+and, optionally, a fake Kubernetes cluster, and reports latency percentiles,
+throughput and error rates as JSON that later runs can be compared against
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+
+ROUTES = ('execute', 'random-quest', 'get-feedback', 'start-interview')
+
+PROGRAMS = {
+    'python': 'print(sum(i * i for i in range(10000)))',
+    'java': (
+        'public class Main { public static void main(String[] a) {'
+        ' long s = 0; for (int i = 0; i < 10000; i++) s += (long) i * i;'
+        ' System.out.println(s); } }'
+    ),
+    'c++': (
+        '#include <cstdio>\nint main() { long long s = 0;'
+        ' for (int i = 0; i < 10000; i++) s += 1LL * i * i; printf("%lld\\n", s); }'
+    ),
+}
+
+# Fed to interview sessions so the feedback pipeline calls the LLM while routes are polled
+SPEECH = [
+    "I would start with a hash map from value to index",
+    "then walk the array once and look up the complement",
+    "that gives linear time and linear extra space",
+    "an alternative is sorting and using two pointers",
+]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def summarize(samples, elapsed):
+    """
+    Args:
+        samples: List of (latency seconds, ok, status) tuples
+        elapsed: Seconds over which the samples were collected
+
+    Returns:
+        dict: Request/error counts, throughput and latency percentiles in ms
+    """
+    latencies = sorted(s[0] * 1000 for s in samples)
+    errors = sum(1 for s in samples if not s[1])
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0.0,
+        },
+        'statuses': dict(sorted(Counter(str(s[2]) for s in samples).items())),
+    }
+
+
+class InProcessClient:
+    """Calls the imported Flask app through its test client (one per thread)"""
+
+    def __init__(self, flask_app, address='127.0.0.1'):
+        # Each virtual user gets its own client address, as real users would
+        self._client = flask_app.test_client()
+        self._client.environ_base['REMOTE_ADDR'] = address
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpClient:
+    """Calls a running server, e.g. gunicorn started with the fakes configured by env"""
+
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json'} if data is not None else {}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, payload = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload or b'{}')
+        except ValueError:
+            return status, {}
+
+
+class VirtualUser:
+    """
+    One closed-loop client: sends a request, waits for the answer, sends the next
+
+    Each route method returns (status, ok, seconds) for the measured request
+    only; setup and teardown calls around it are not timed.
+    """
+
+    def __init__(self, index, client, args, companies):
+        self.client = client
+        self.args = args
+        self.companies = companies
+        self.rng = random.Random(args.seed + index)
+        self.session_id = None
+
+    def _timed(self, method, path, body=None):
+        sent = time.monotonic()
+        status, payload = self.client.request(method, path, body)
+        return status, payload, time.monotonic() - sent
+
+    def execute(self):
+        language = self.rng.choice(self.args.languages)
+        status, body, seconds = self._timed(
+            'POST', '/execute', {'code': PROGRAMS[language], 'language': language}
+        )
+        # Every program is valid, so anything but success is an error. The
+        # Kubernetes backend answers with just the output, so only its HTTP status counts
+        return status, status == 200 and body.get('status', 'succeeded') == 'succeeded', seconds
+
+    def random_quest(self):
+        company = self.rng.choice(self.companies)
+        status, body, seconds = self._timed('GET', f'/random-quest/{urllib.request.quote(company)}')
+        return status, status == 200 and bool(body.get('return_question')), seconds
+
+    def get_feedback(self):
+        if self.session_id is None:
+            status, body = self.client.request('POST', '/start-interview', {})
+            if status != 200:
+                return status, False, 0.0
+            self.session_id = body['session_id']
+        status, _, seconds = self._timed('GET', f'/get-feedback?session_id={self.session_id}')
+        return status, status == 200, seconds
+
+    def start_interview(self):
+        status, body, seconds = self._timed('POST', '/start-interview', {})
+        if status == 200:
+            self.client.request('POST', '/stop-interview', {'session_id': body['session_id']})
+        return status, status == 200, seconds
+
+    def close(self):
+        if self.session_id is not None:
+            self.client.request('POST', '/stop-interview', {'session_id': self.session_id})
+
+
+def parse_weights(spec):
+    """'execute=3,random-quest' -> {'execute': 3.0, 'random-quest': 1.0}"""
+    weights = {}
+    for item in spec.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route {name!r}; choose from {', '.join(ROUTES)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def load_app(args):
+    """
+    Import the app configured for offline runs
+
+    Returns:
+        tuple: (app module, FakeCluster or None)
+    """
+    os.environ['LLM_BACKEND'] = 'fake'
+    os.environ['FAKE_LLM_LATENCY_MS'] = str(args.llm_latency_ms)
+    os.environ['FAKE_LLM_JITTER_MS'] = str(args.llm_jitter_ms)
+    os.environ['FAKE_LLM_LATENCY_SIGMA'] = str(args.llm_sigma)
+    # Every virtual user may hold a session, plus the start/stop churn
+    os.environ.setdefault('MAX_SESSIONS', str(args.concurrency * 2 + 4))
+    # The Kubernetes executor is swapped in after import, below
+    os.environ['USE_KUBERNETES'] = 'false'
+    if args.kubernetes:
+        os.environ['WARM_POOL_SIZE'] = '0'
+        os.environ.setdefault('EXECUTION_WORKERS', '8')
+    # Closed-loop users submit far faster than a person would; measure capacity, not the rate limit
+    os.environ.setdefault('EXECUTION_CLIENT_RATE', '0')
+
+    import app as app_module
+
+    app_module.init_worker()
+    cluster = None
+    if args.kubernetes:
+        from k8s_executor import KubernetesCodeExecutor
+        from k8s_fake import FakeCluster
+
+        cluster = FakeCluster(
+            schedule_latency=args.k8s_schedule_ms / 1000,
+            run_latency=args.k8s_run_ms / 1000,
+            jitter=args.k8s_jitter_ms / 1000,
+            api_latency=args.k8s_api_ms / 1000,
+            seed=args.seed,
+        )
+        executor = KubernetesCodeExecutor(
+            max_output_bytes=app_module.EXECUTION_OUTPUT_LIMIT_BYTES, apis=cluster.apis()
+        )
+        executor.start()
+        app_module.k8s_executor = executor
+        app_module.USE_KUBERNETES = True
+        if app_module.K8S_MAX_ACTIVE_JOBS:
+            app_module.execution_queue.in_flight = executor.get_active_jobs
+            app_module.execution_queue.max_in_flight = app_module.K8S_MAX_ACTIVE_JOBS
+    return app_module, cluster
+
+
+def _speak(app_module, users, interval, stop):
+    """Queue a transcription on every polled session each interval (in-process only)"""
+    rng = random.Random(0)
+    while not stop.wait(interval):
+        for user in users:
+            session = app_module.session_manager.get(user.session_id) if user.session_id else None
+            if session is not None:
+                session.put_transcription(rng.choice(SPEECH))
+
+
+def run(args):
+    """Run the load test and return the results document"""
+    app_module, cluster = (None, None) if args.url else load_app(args)
+    if args.url:
+        companies = list(HttpClient(args.url).request('GET', '/companies')[1].get('companies', {}))
+        make_client = lambda i: HttpClient(args.url)
+    else:
+        companies = list(app_module.company_index.companies())
+        make_client = lambda i: InProcessClient(app_module.app, f"10.0.{i // 256}.{i % 256}")
+    if not companies:
+        companies = ['Google']
+
+    routes = list(args.routes)
+    weights = [args.routes[r] for r in routes]
+    users = [VirtualUser(i, make_client(i), args, companies) for i in range(args.concurrency)]
+    samples = defaultdict(list)
+    samples_lock = threading.Lock()
+    stop = threading.Event()
+
+    started = time.monotonic()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+    remaining = [args.requests] if args.requests else None
+
+    def worker(user):
+        actions = {
+            'execute': user.execute,
+            'random-quest': user.random_quest,
+            'get-feedback': user.get_feedback,
+            'start-interview': user.start_interview,
+        }
+        while not stop.is_set() and time.monotonic() < deadline:
+            if remaining is not None:
+                with samples_lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+            route = user.rng.choices(routes, weights)[0]
+            sent = time.monotonic()
+            try:
+                status, ok, latency = actions[route]()
+            except Exception as e:
+                status, ok, latency = type(e).__name__, False, time.monotonic() - sent
+            if sent >= measure_from:
+                with samples_lock:
+                    samples[route].append((latency, ok, status))
+
+    speaker = None
+    if app_module is not None and 'get-feedback' in routes and args.speech_interval > 0:
+        speaker = threading.Thread(
+            target=_speak, args=(app_module, users, args.speech_interval, stop), daemon=True
+        )
+        speaker.start()
+
+    threads = [threading.Thread(target=worker, args=(u,), daemon=True) for u in users]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+    stop.set()
+    elapsed = max(0.001, min(time.monotonic(), deadline) - measure_from)
+    for user in users:
+        user.close()
+
+    results = {
+        'started_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'config': {
+            'target': args.url or 'in-process',
+            'routes': args.routes,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'requests': args.requests,
+            'languages': args.languages,
+            'llm_latency_ms': args.llm_latency_ms,
+            'llm_jitter_ms': args.llm_jitter_ms,
+            'llm_sigma': args.llm_sigma,
+            'kubernetes': args.kubernetes,
+        },
+        'elapsed_s': round(elapsed, 2),
+        'overall': summarize([s for route in samples.values() for s in route], elapsed),
+        'routes': {route: summarize(samples[route], elapsed) for route in routes},
+    }
+    if app_module is not None:
+        import metrics
+        results['app_latency'] = metrics.latency_summaries()
+        results['app_distributions'] = metrics.distribution_summaries()
+    if cluster is not None:
+        results['config'].update({
+            'k8s_schedule_ms': args.k8s_schedule_ms,
+            'k8s_run_ms': args.k8s_run_ms,
+            'k8s_jitter_ms': args.k8s_jitter_ms,
+            'k8s_api_ms': args.k8s_api_ms,
+        })
+        results['kubernetes_fake'] = cluster.stats()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Per-route regressions of results against a baseline run
+
+    Returns:
+        list: Human-readable descriptions; empty when nothing regressed
+    """
+    regressions = []
+    for route, current in results['routes'].items():
+        before = baseline.get('routes', {}).get(route)
+        if not before or not before['requests'] or not current['requests']:
+            continue
+        for key in ('p50', 'p95', 'p99'):
+            old, new = before['latency_ms'][key], current['latency_ms'][key]
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(f"{route} {key}: {old:.1f} ms -> {new:.1f} ms")
+        old, new = before['throughput_rps'], current['throughput_rps']
+        if new < old * (1 - tolerance):
+            regressions.append(f"{route} throughput: {old:.1f} -> {new:.1f} req/s")
+        old, new = before['error_rate'], current['error_rate']
+        if new > old + 0.01:
+            regressions.append(f"{route} error rate: {old:.2%} -> {new:.2%}")
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'route':<16}{'reqs':>8}{'err%':>8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    rows = list(results['routes'].items()) + [('overall', results['overall'])]
+    for route, summary in rows:
+        lat = summary['latency_ms']
+        print(
+            f"{route:<16}{summary['requests']:>8}{summary['error_rate'] * 100:>7.1f}%"
+            f"{summary['throughput_rps']:>9.1f}{lat['p50']:>9.1f}{lat['p95']:>9.1f}"
+            f"{lat['p99']:>9.1f}{lat['max']:>9.1f}"
+        )
+    print("(latencies in ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--routes', type=parse_weights, default=parse_weights(','.join(ROUTES)),
+                        help="Comma-separated routes with optional weights, e.g. execute=3,random-quest")
+    parser.add_argument('--concurrency', type=int, default=8, help="Virtual users sending requests back to back")
+    parser.add_argument('--duration', type=float, default=30, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=5, help="Seconds run before measuring starts")
+    parser.add_argument('--requests', type=int, default=0, help="Stop after this many requests (0: run for --duration)")
+    parser.add_argument('--languages', type=lambda s: s.split(','), default=['python'],
+                        help="Languages submitted to /execute (python, java, c++)")
+    parser.add_argument('--url', help="Base URL of a running server instead of the in-process app")
+    parser.add_argument('--llm-latency-ms', type=float, default=300, help="Fake LLM latency (median with --llm-sigma)")
+    parser.add_argument('--llm-jitter-ms', type=float, default=0, help="Uniform jitter added to the fake LLM latency")
+    parser.add_argument('--llm-sigma', type=float, default=0, help="Log-normal shape of the fake LLM latency")
+    parser.add_argument('--speech-interval', type=float, default=2.0,
+                        help="Seconds between transcriptions fed to each polled session (0 disables)")
+    parser.add_argument('--kubernetes', action='store_true', help="Execute through KubernetesCodeExecutor on a fake cluster")
+    parser.add_argument('--k8s-schedule-ms', type=float, default=800, help="Fake Job creation to running pod")
+    parser.add_argument('--k8s-run-ms', type=float, default=150, help="Fake pod run time")
+    parser.add_argument('--k8s-jitter-ms', type=float, default=200, help="Uniform jitter added to both")
+    parser.add_argument('--k8s-api-ms', type=float, default=5, help="Fake API server round trip")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--compare', help="Baseline results JSON; exit 1 if any route regressed")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Allowed fractional latency increase / throughput drop against the baseline")
+    args = parser.parse_args(argv)
+
+    for language in args.languages:
+        if language not in PROGRAMS:
+            parser.error(f"Unsupported language: {language}")
+
+    results = run(args)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
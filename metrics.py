@@ -0,0 +1,247 @@
+"""
+In-process Metrics
+Lightweight recorders for latencies, distributions and counters, summarized as
+JSON and exported in Prometheus text format on /metrics
+"""
+import os
+import threading
+from collections import deque
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    prometheus_client = None
+    multiprocess = None
+    PROMETHEUS_AVAILABLE = False
+
+NAMESPACE = 'leinterview'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# 1-2-5 steps from 1 to 500M: queue depths through output sizes in bytes
+SIZE_BUCKETS = tuple(m * 10 ** e for e in range(9) for m in (1, 2, 5))
+TEXT_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Distribution:
+    """Keeps a running count/sum/max and a window of recent samples for percentiles"""
+
+    # Summaries multiply samples by scale and append suffix to each key
+    scale = 1
+    suffix = ''
+
+    def __init__(self, window=1024, exported=None):
+        """
+        Args:
+            exported: Optional prometheus_client child every sample is also observed into
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._exported = exported
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+        if self._exported is not None:
+            self._exported.observe(value)
+
+    def quantiles(self, *ps):
+        """Raw (unscaled) sample quantiles over the recent window"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return [0.0 for _ in ps]
+        return [samples[min(len(samples) - 1, int(p * len(samples)))] for p in ps]
+
+    def summary(self):
+        """Return count, mean, p50/p95/p99 and max"""
+        with self._lock:
+            count, total, peak = self.count, self.total, self.max
+
+        def scaled(value):
+            return round(value * self.scale, 2)
+
+        p50, p95, p99 = self.quantiles(0.50, 0.95, 0.99)
+        return {
+            'count': count,
+            f'avg{self.suffix}': scaled(total / count) if count else 0.0,
+            f'p50{self.suffix}': scaled(p50),
+            f'p95{self.suffix}': scaled(p95),
+            f'p99{self.suffix}': scaled(p99),
+            f'max{self.suffix}': scaled(peak),
+        }
+
+
+class LatencyRecorder(Distribution):
+    """Distribution of durations observed in seconds and reported in milliseconds"""
+
+    scale = 1000
+    suffix = '_ms'
+
+
+class Counter:
+    """Monotonic count of events"""
+
+    def __init__(self, exported=None):
+        self._lock = threading.Lock()
+        self._exported = exported
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+        if self._exported is not None:
+            self._exported.inc(amount)
+
+
+_recorders = {}
+_distributions = {}
+_counters = {}
+_families = {}  # Prometheus metric name -> collector
+_recorders_lock = threading.Lock()
+
+
+def _family(kind, name, labelnames):
+    """Prometheus collector for a metric family; caller holds _recorders_lock"""
+    if kind == 'latency':
+        full_name = f'{NAMESPACE}_{name}_seconds'
+    else:
+        full_name = f'{NAMESPACE}_{name}'
+    family = _families.get(full_name)
+    if family is None:
+        documentation = f'{name.replace("_", " ")} ({kind})'
+        if kind == 'counter':
+            family = prometheus_client.Counter(full_name, documentation, labelnames)
+        else:
+            family = prometheus_client.Histogram(
+                full_name, documentation, labelnames,
+                buckets=LATENCY_BUCKETS if kind == 'latency' else SIZE_BUCKETS
+            )
+        _families[full_name] = family
+    return family
+
+
+def _get_or_create(registry, kind, name, labels, factory):
+    key = (name, tuple(sorted(labels.items())))
+    with _recorders_lock:
+        recorder = registry.get(key)
+        if recorder is None:
+            exported = None
+            if PROMETHEUS_AVAILABLE:
+                family = _family(kind, name, tuple(sorted(labels)))
+                exported = family.labels(**labels) if labels else family
+            recorder = registry[key] = factory(exported=exported)
+        return recorder
+
+
+def latency(name, **labels):
+    """
+    Return the process-wide latency recorder for name and labels, creating it on first use
+
+    Labels become Prometheus labels; in JSON summaries their values are
+    appended to the name, e.g. latency('execute_run', language='cpp') is
+    reported as execute_run_cpp.
+    """
+    return _get_or_create(_recorders, 'latency', name, labels, LatencyRecorder)
+
+
+def distribution(name, **labels):
+    """Return the process-wide distribution (sizes, depths, ...) for name and labels"""
+    return _get_or_create(_distributions, 'distribution', name, labels, Distribution)
+
+
+def counter(name, **labels):
+    """Return the process-wide counter for name and labels"""
+    return _get_or_create(_counters, 'counter', name, labels, Counter)
+
+
+def _summary_key(key):
+    name, labels = key
+    return '_'.join([name] + [str(value) for _, value in labels])
+
+
+def latency_summaries():
+    """Summaries for every latency recorder created so far, keyed by name"""
+    with _recorders_lock:
+        items = list(_recorders.items())
+    return {_summary_key(key): recorder.summary() for key, recorder in sorted(items)}
+
+
+def distribution_summaries():
+    """Summaries for every distribution created so far, keyed by name"""
+    with _recorders_lock:
+        items = list(_distributions.items())
+    return {_summary_key(key): recorder.summary() for key, recorder in sorted(items)}
+
+
+def counter_values():
+    """Current value of every counter created so far, keyed by name"""
+    with _recorders_lock:
+        items = list(_counters.items())
+    return {_summary_key(key): c.value for key, c in sorted(items)}
+
+
+def render_prometheus():
+    """
+    Prometheus text exposition of every metric
+
+    With prometheus_client and PROMETHEUS_MULTIPROC_DIR set, samples from
+    all gunicorn workers are merged; otherwise only this process is
+    reported (as summaries of the recent window without prometheus_client).
+
+    Returns:
+        tuple: (body, content type)
+    """
+    if PROMETHEUS_AVAILABLE:
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+    return _render_fallback(), TEXT_CONTENT_TYPE
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        str(v).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') for _, v in pairs
+    )
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _render_fallback():
+    with _recorders_lock:
+        groups = [
+            ('latency', sorted(_recorders.items())),
+            ('distribution', sorted(_distributions.items())),
+            ('counter', sorted(_counters.items())),
+        ]
+    lines = []
+    typed = set()
+    for kind, items in groups:
+        for (name, labels), recorder in items:
+            if kind == 'counter':
+                full_name = f'{NAMESPACE}_{name}_total'
+                if full_name not in typed:
+                    typed.add(full_name)
+                    lines.append(f'# TYPE {full_name} counter')
+                lines.append(f'{full_name}{_label_text(labels)} {recorder.value}')
+                continue
+            full_name = f'{NAMESPACE}_{name}_seconds' if kind == 'latency' else f'{NAMESPACE}_{name}'
+            if full_name not in typed:
+                typed.add(full_name)
+                lines.append(f'# TYPE {full_name} summary')
+            for p, value in zip((0.5, 0.95, 0.99), recorder.quantiles(0.5, 0.95, 0.99)):
+                lines.append(f'{full_name}{_label_text(labels, [("quantile", p)])} {value}')
+            lines.append(f'{full_name}_count{_label_text(labels)} {recorder.count}')
+            lines.append(f'{full_name}_sum{_label_text(labels)} {recorder.total}')
+    return ('\n'.join(lines) + '\n').encode('utf-8')
@@ -0,0 +1,204 @@
+"""
+Output Capture
+Reads program output incrementally under a byte cap, marking truncation and
+optionally forwarding each chunk as it is produced
+"""
+import codecs
+import os
+import select
+import selectors
+import subprocess
+import time
+
+READ_SIZE = 64 * 1024
+# Seconds to keep draining pipes after a kill before giving up on them
+DRAIN_SECONDS = 1.0
+STREAMS = ('stdout', 'stderr')
+# poll() has no descriptor limit; select() is the fallback where it is missing
+_Selector = getattr(selectors, 'PollSelector', selectors.SelectSelector)
+
+
+class OutputCapture:
+    """
+    Collects stdout/stderr up to a shared byte limit
+
+    Once the limit is reached the stream that crossed it ends with a
+    truncation marker and feed() returns False, telling the reader to stop
+    the program. Lines starting with report_prefix (the runner script's
+    resource report) are set aside in reports instead of being counted,
+    streamed or returned as output.
+    """
+
+    def __init__(self, limit=None, on_output=None, report_prefix=None):
+        """
+        Args:
+            limit: Bytes of output kept across both streams (None for no limit)
+            on_output: Optional callable(stream, text) called as output arrives
+            report_prefix: Marker of lines to divert into reports
+        """
+        self.limit = limit
+        self.on_output = on_output
+        self.report_prefix = report_prefix
+        self.size = 0
+        self.truncated = False
+        self.reports = []
+        self._chunks = {name: [] for name in STREAMS}
+        self._partial = {name: '' for name in STREAMS}
+        self._decoders = {
+            name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in STREAMS
+        }
+
+    @property
+    def marker(self):
+        return f"\n[output truncated after {self.limit} bytes]\n"
+
+    def text(self, stream):
+        return ''.join(self._chunks[stream])
+
+    @property
+    def stdout(self):
+        return self.text('stdout')
+
+    @property
+    def stderr(self):
+        return self.text('stderr')
+
+    def feed(self, stream, data):
+        """
+        Add a chunk of bytes or text read from stream
+
+        Returns:
+            bool: False once the limit has been reached
+        """
+        if self.truncated:
+            return False
+        if isinstance(data, bytes):
+            data = self._decoders[stream].decode(data)
+        if self.report_prefix:
+            data = self._divert_reports(stream, data)
+        self._keep(stream, data)
+        return not self.truncated
+
+    def finish(self):
+        """Flush partially decoded characters and held-back lines once the streams are closed"""
+        for stream in STREAMS:
+            if self.truncated:
+                break
+            text = self._partial[stream] + self._decoders[stream].decode(b'', final=True)
+            self._partial[stream] = ''
+            if self.report_prefix and text.startswith(self.report_prefix):
+                self.reports.append(text)
+            else:
+                self._keep(stream, text)
+        return self
+
+    def _keep(self, stream, text):
+        if not text:
+            return
+        if self.limit is not None:
+            encoded = text.encode('utf-8')
+            if self.size + len(encoded) > self.limit:
+                # A character cut in half at the limit is dropped rather than mangled
+                text = encoded[:self.limit - self.size].decode('utf-8', errors='ignore')
+                self.truncated = True
+            self.size += min(len(encoded), self.limit - self.size)
+        self._chunks[stream].append(text)
+        if self.truncated:
+            self._chunks[stream].append(self.marker)
+        if self.on_output is not None:
+            self.on_output(stream, text + self.marker if self.truncated else text)
+
+    def _divert_reports(self, stream, text):
+        """Remove complete report lines and hold back a trailing line that may become one"""
+        prefix = self.report_prefix
+        text = self._partial[stream] + text
+        self._partial[stream] = ''
+        if prefix in text:
+            kept = []
+            for line in text.split('\n')[:-1]:
+                if line.startswith(prefix):
+                    self.reports.append(line + '\n')
+                else:
+                    kept.append(line + '\n')
+            kept.append(text[text.rfind('\n') + 1:])
+            text = ''.join(kept)
+        tail = text[text.rfind('\n') + 1:]
+        if tail and (prefix.startswith(tail) or tail.startswith(prefix)):
+            self._partial[stream] = tail
+            text = text[:-len(tail)]
+        return text
+
+
+def communicate(process, data, timeout, capture):
+    """
+    Popen.communicate() that reads into an OutputCapture instead of memory
+
+    Writes data to the process's stdin, reads its binary stdout/stderr
+    pipes as they fill, and kills it as soon as the capture is full or
+    timeout expires.
+
+    Returns:
+        bool: True if the process was killed for running past timeout
+    """
+    selector = _Selector()
+    view = memoryview(data or b'')
+    offset = 0
+    if process.stdin:
+        if view:
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        else:
+            process.stdin.close()
+    for name in STREAMS:
+        pipe = getattr(process, name)
+        if pipe:
+            selector.register(pipe, selectors.EVENT_READ, name)
+
+    deadline = time.monotonic() + timeout
+    timed_out = killed = False
+
+    def kill():
+        nonlocal killed, deadline
+        process.kill()
+        killed = True
+        # Whatever still holds the pipes (a grandchild) gets a moment, not the full timeout
+        deadline = min(deadline, time.monotonic() + DRAIN_SECONDS)
+
+    with selector:
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if killed:
+                    break
+                timed_out = True
+                kill()
+                continue
+            for key, _ in selector.select(remaining):
+                if key.fileobj is process.stdin:
+                    try:
+                        offset += os.write(key.fd, view[offset:offset + select.PIPE_BUF])
+                    except BrokenPipeError:
+                        offset = len(view)  # The program stopped reading; not an error
+                    if offset >= len(view):
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    continue
+                chunk = os.read(key.fd, READ_SIZE)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                elif not capture.feed(key.data, chunk) and not killed:
+                    kill()
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+
+    remaining = max(deadline - time.monotonic(), 0)
+    try:
+        process.wait(timeout=remaining)
+    except subprocess.TimeoutExpired:
+        # Closed its pipes but kept running
+        if not killed:
+            timed_out = True
+        process.kill()
+        process.wait()
+    capture.finish()
+    return timed_out
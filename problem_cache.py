@@ -0,0 +1,162 @@
+"""
+Problem Description Cache
+Bounded in-memory LRU with an optional on-disk tier and single-flight loading
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import metrics
+
+
+class _InFlight:
+    """A pending load that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ProblemCache:
+    """Caches problem descriptions keyed by problem name"""
+
+    def __init__(self, max_entries=512, disk_dir=None):
+        """
+        Args:
+            max_entries: Maximum number of descriptions kept in memory
+            disk_dir: Optional directory for a persistent tier shared by
+                every worker process on the host
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'load_errors': 0,
+            'evictions': 0,
+        }
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def _key(problem_name):
+        """Normalize a problem name so trivially different spellings share an entry"""
+        return ' '.join(problem_name.lower().split())
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.txt")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, value):
+        """Write atomically so readers in other workers never see partial files"""
+        if not self.disk_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Failed to persist cached problem: {e}")
+
+    def _store(self, key, value):
+        """Insert into the LRU; caller must hold the lock"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get_or_load(self, problem_name, loader):
+        """
+        Return the cached description, calling loader(problem_name) on a miss
+
+        Concurrent misses for the same problem share a single loader call.
+        Exceptions raised by the loader propagate to every waiter and are
+        not cached.
+        """
+        key = self._key(problem_name)
+
+        with self._lock:
+            hit = key in self._entries
+            if hit:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                value = self._entries[key]
+            else:
+                pending = self._inflight.get(key)
+                leader = pending is None
+                if leader:
+                    pending = _InFlight()
+                    self._inflight[key] = pending
+                else:
+                    self._stats['coalesced'] += 1
+
+        if hit:
+            metrics.counter('problem_cache_lookups', result='hit').inc()
+            return value
+
+        if not leader:
+            metrics.counter('problem_cache_lookups', result='coalesced').inc()
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            value = self._read_disk(key)
+            if value is not None:
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                metrics.counter('problem_cache_lookups', result='disk_hit').inc()
+            else:
+                with self._lock:
+                    self._stats['misses'] += 1
+                metrics.counter('problem_cache_lookups', result='miss').inc()
+                value = loader(problem_name)
+                self._write_disk(key, value)
+
+            with self._lock:
+                self._store(key, value)
+            pending.value = value
+            return value
+
+        except Exception as e:
+            with self._lock:
+                self._stats['load_errors'] += 1
+            pending.error = e
+            raise
+
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.event.set()
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_entries'] = self.max_entries
+            stats['persistent'] = bool(self.disk_dir)
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
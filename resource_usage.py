@@ -0,0 +1,193 @@
+"""
+Resource Accounting
+Measures compile time, CPU time, peak memory, exit signal and output size of
+executions and aggregates them into per-language metrics
+"""
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+
+import metrics
+
+RESOURCE_MARKER = '__LEINTERVIEW_RESOURCES__'
+
+# Wraps a runner script in a pod. Times the build and run steps and reports
+# the container cgroup's CPU use during the run and its peak memory on the
+# last stderr line.
+_K8S_WRAPPER = r'''
+cg_cpu() {
+  if [ -r /sys/fs/cgroup/cpu.stat ]; then sed -n 's/^usage_usec //p' /sys/fs/cgroup/cpu.stat
+  elif [ -r /sys/fs/cgroup/cpuacct/cpuacct.usage ]; then echo $(( $(cat /sys/fs/cgroup/cpuacct/cpuacct.usage) / 1000 ))
+  fi
+}
+cg_peak() {
+  cat /sys/fs/cgroup/memory.peak 2>/dev/null || cat /sys/fs/cgroup/memory/memory.max_usage_in_bytes 2>/dev/null
+}
+report() {
+  echo "MARKER phase=$1 rc=$2 compile_ns=$3 wall_ns=$4 cpu_us=$5 peak=$(cg_peak)" >&2
+}
+t0=$(date +%s%N)
+( BUILD )
+rc=$?
+t1=$(date +%s%N)
+if [ $rc -ne 0 ]; then report compile $rc $((t1 - t0)) 0 0; exit $rc; fi
+c0=$(cg_cpu)
+( RUN )
+rc=$?
+t2=$(date +%s%N)
+c1=$(cg_cpu)
+report run $rc $((t1 - t0)) $((t2 - t1)) $(( ${c1:-0} - ${c0:-0} ))
+exit $rc
+'''.replace('MARKER', RESOURCE_MARKER)
+
+_MARKER_LINE = re.compile(rf'^{RESOURCE_MARKER} (.*)$', re.MULTILINE)
+
+
+class AccountedPopen(subprocess.Popen):
+    """
+    Popen that keeps the child's CPU time when it is reaped and can sample its peak RSS
+
+    ru_maxrss is no use for peak memory here: a child inherits the parent's
+    high-water mark across fork/exec, so every run would report at least the
+    size of the web worker. VmHWM in /proc only covers the exec'd image.
+    """
+
+    rusage = None
+    _peak_kb = None
+    _samples = 0
+
+    @property
+    def peak_rss_kb(self):
+        """
+        Highest VmHWM sampled, or None if the process exited before a second sample
+
+        The first sample is taken right after exec, so on its own it shows
+        the dynamic loader rather than the program. A zombie has no VmHWM
+        left to read, so an exit cannot be caught with a last sample either.
+        """
+        return self._peak_kb if self._samples > 1 else None
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, sts, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            self.rusage = rusage
+        return pid, sts
+
+    def sample_memory(self, interval=0.01):
+        """Track VmHWM until the process exits (growth in the final interval can be missed)"""
+        if not self._sample():
+            return
+        threading.Thread(
+            target=self._sample_loop, args=(interval,), name='rss-sampler', daemon=True
+        ).start()
+
+    def _sample(self):
+        """Read VmHWM once; False once the process is gone"""
+        if self.returncode is not None:
+            return False
+        try:
+            with open(f'/proc/{self.pid}/status', 'r') as f:
+                hwm = next((line for line in f if line.startswith('VmHWM:')), None)
+        except OSError:
+            return False
+        if hwm is None:
+            return False  # Exited; a zombie has no memory left to report
+        self._peak_kb = max(self._peak_kb or 0, int(hwm.split()[1]))
+        self._samples += 1
+        return True
+
+    def _sample_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            if not self._sample():
+                return
+
+
+def signal_name(returncode):
+    """Name of the signal that ended a process (negative returncode), else None"""
+    if returncode is None or returncode >= 0:
+        return None
+    try:
+        return signal.Signals(-returncode).name
+    except ValueError:
+        return f"SIG{-returncode}"
+
+
+def process_usage(process):
+    """CPU time, peak RSS and exit signal of a finished AccountedPopen"""
+    usage = {
+        'cpu_ms': None,
+        'peak_rss_kb': getattr(process, 'peak_rss_kb', None),
+        'exit_signal': signal_name(process.returncode),
+    }
+    rusage = getattr(process, 'rusage', None)
+    if rusage is not None:
+        usage['cpu_ms'] = round((rusage.ru_utime + rusage.ru_stime) * 1000, 1)
+    return usage
+
+
+def output_bytes(stdout, stderr):
+    return len((stdout or '').encode('utf-8')) + len((stderr or '').encode('utf-8'))
+
+
+def wrap_k8s_script(build, run):
+    """Shell script running build then run steps with resource reporting"""
+    return _K8S_WRAPPER.replace('BUILD', build or 'true').replace('RUN', run)
+
+
+def parse_k8s_report(text):
+    """
+    Strip the resource report line from runner output
+
+    Returns:
+        tuple: (output without the report, usage dict or None if no report was printed)
+    """
+    matches = list(_MARKER_LINE.finditer(text))
+    if not matches:
+        return text, None
+    fields = dict(item.split('=', 1) for item in matches[-1].group(1).split() if '=' in item)
+    cleaned = _MARKER_LINE.sub('', text).rstrip('\n')
+    if text.endswith('\n') and cleaned:
+        cleaned += '\n'
+
+    def number(key):
+        try:
+            return int(fields.get(key, ''))
+        except ValueError:
+            return None
+
+    rc, compile_ns, wall_ns = number('rc'), number('compile_ns'), number('wall_ns')
+    cpu_us, peak = number('cpu_us'), number('peak')
+    ran = fields.get('phase') == 'run'
+    return cleaned, {
+        'compile_ms': round(compile_ns / 1e6, 1) if compile_ns is not None else None,
+        'run_ms': round(wall_ns / 1e6, 1) if ran and wall_ns is not None else None,
+        'cpu_ms': round(cpu_us / 1000, 1) if ran and cpu_us else None,
+        # Container peak: includes the compiler for compiled languages
+        'peak_rss_kb': peak // 1024 if peak else None,
+        # The shell reports 128 + n for a child killed by signal n
+        'exit_signal': signal_name(128 - rc) if rc is not None and rc > 128 else None,
+    }
+
+
+def record(language, result):
+    """Add an execution's measurements to the per-language histograms"""
+    label = language.replace('+', 'p')
+    if result.get('compile_ms') is not None:
+        metrics.latency('execute_compile', language=label).observe(result['compile_ms'] / 1000)
+    if result.get('run_ms') is not None:
+        metrics.latency('execute_run', language=label).observe(result['run_ms'] / 1000)
+    if result.get('cpu_ms') is not None:
+        metrics.latency('execute_cpu', language=label).observe(result['cpu_ms'] / 1000)
+    if result.get('peak_rss_kb') is not None:
+        metrics.distribution('execute_peak_rss_kb', language=label).observe(result['peak_rss_kb'])
+    if result.get('output_bytes') is not None:
+        metrics.distribution('execute_output_bytes', language=label).observe(result['output_bytes'])
+    if result.get('truncated'):
+        metrics.counter('execute_output_truncated', language=label).inc()
@@ -0,0 +1,117 @@
+"""
+Startup Report
+Wall time and resident memory added by each startup stage of a process, and
+a command that measures them for the whole app from a cold interpreter
+"""
+import argparse
+import importlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_stages = []
+_lock = threading.Lock()
+
+# Third-party packages worth knowing the import cost of; each one's cost
+# excludes packages listed before it (kubernetes uses yaml, ...)
+DEPENDENCIES = (
+    'yaml',
+    'flask',
+    'flask_cors',
+    'prometheus_client',
+    'kubernetes',
+    'google.generativeai',
+    'speech_recognition',
+)
+
+
+def rss_kb():
+    """Current resident set size of this process in KB, or None where /proc is missing"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+@contextmanager
+def stage(name):
+    """Record how long the enclosed block took and how much RSS it added"""
+    started, rss_before = time.perf_counter(), rss_kb()
+    try:
+        yield
+    finally:
+        rss_after = rss_kb()
+        entry = {
+            'stage': name,
+            'pid': os.getpid(),
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'rss_kb': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        }
+        with _lock:
+            _stages.append(entry)
+
+
+def summary():
+    """
+    Stages recorded so far
+
+    Stages run before a fork (a preloaded app) keep the parent's pid, so
+    each worker reports what it inherited separately from what it built.
+    """
+    with _lock:
+        stages = list(_stages)
+    return {
+        'pid': os.getpid(),
+        'rss_kb': rss_kb(),
+        'stages': stages,
+    }
+
+
+def _format(stages, total_rss):
+    width = max([len(s['stage']) for s in stages] + [5])
+    lines = [f"{'stage':<{width}}  {'ms':>9}  {'rss_kb':>9}"]
+    for s in stages:
+        rss = '-' if s['rss_kb'] is None else s['rss_kb']
+        lines.append(f"{s['stage']:<{width}}  {s['ms']:>9}  {rss:>9}")
+    lines.append(f"{'resident total':<{width}}  {'':>9}  {total_rss if total_rss is not None else '-':>9}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Measure what importing the app and starting a worker costs; '
+                    'run in a fresh interpreter so nothing is imported already'
+    )
+    parser.add_argument('--no-worker', action='store_true',
+                        help='Stop after importing the app (what a preloading master pays)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args(argv)
+
+    # Dependencies first, so the app's own stages exclude their import cost
+    for name in DEPENDENCIES:
+        try:
+            with stage(f'import {name}'):
+                importlib.import_module(name)
+        except ImportError:
+            with _lock:
+                _stages.pop()
+    with stage('import app (total)'):
+        import app
+    if not args.no_worker:
+        with stage('init_worker (total)'):
+            app.init_worker()
+
+    report = summary()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(_format(report['stages'], report['rss_kb']))
+
+
+if __name__ == '__main__':
+    # Record into the module app imports, not this __main__ copy of it
+    importlib.import_module('startup_report').main()
@@ -0,0 +1,231 @@
+"""
+Warm Worker Pool
+Keeps pre-started, single-use interpreter/JVM processes ready so a run only
+pays for executing the submission, not for starting the runtime
+"""
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+import time
+
+from resource_usage import AccountedPopen
+
+# Started with `python3 -c`; waits for "<workdir>\t<source bytes>\n<source>"
+# on stdin, then runs the source as __main__. Remaining stdin belongs to the
+# submission.
+PYTHON_BOOTSTRAP = (
+    "import os, sys\n"
+    "_h = sys.stdin.buffer.readline().decode().rstrip('\\n').split('\\t')\n"
+    "os.chdir(_h[0])\n"
+    "_src = sys.stdin.buffer.read(int(_h[1])).decode()\n"
+    "try:\n"
+    "    exec(compile(_src, '<string>', 'exec'), {'__name__': '__main__', '__builtins__': __builtins__})\n"
+    # Report from the submission's first frame, as a cold `python3 -c` would
+    "except Exception as _e:\n"
+    "    _e = _e.with_traceback(_e.__traceback__.tb_next)\n"
+    "    sys.excepthook(type(_e), _e, _e.__traceback__)\n"
+    "    sys.exit(1)\n"
+)
+
+# Waits for a class directory on stdin, then loads and runs its Main class
+JAVA_LAUNCHER_SOURCE = """
+import java.io.File;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+
+public class WarmLauncher {
+    public static void main(String[] args) throws Throwable {
+        // Touch commonly used classes while idle so they are loaded before a job arrives
+        Class.forName("java.util.Scanner");
+        Class.forName("java.util.HashMap");
+        Class.forName("java.util.ArrayList");
+
+        StringBuilder path = new StringBuilder();
+        int c;
+        while ((c = System.in.read()) != -1 && c != '\\n') {
+            path.append((char) c);
+        }
+        URLClassLoader loader = new URLClassLoader(new URL[] { new File(path.toString()).toURI().toURL() });
+        Method main = loader.loadClass("Main").getMethod("main", String[].class);
+        // `java Main` also runs a package-private Main; reflection from this loader needs access
+        main.setAccessible(true);
+        try {
+            main.invoke(null, (Object) new String[0]);
+        } catch (InvocationTargetException e) {
+            throw e.getCause();
+        }
+        System.out.flush();
+    }
+}
+"""
+
+
+def python_payload(workdir, code, stdin=b''):
+    """Encode a job for a warm Python worker"""
+    source = code.encode('utf-8')
+    return f"{workdir}\t{len(source)}\n".encode('utf-8') + source + stdin
+
+
+def java_payload(workdir, stdin=b''):
+    """Encode a job for a warm JVM worker"""
+    return f"{workdir}\n".encode('utf-8') + stdin
+
+
+def build_java_launcher(directory=None):
+    """
+    Compile WarmLauncher once and return the directory holding its class
+
+    Returns:
+        str or None: None when javac is unavailable
+    """
+    directory = directory or os.path.join(tempfile.gettempdir(), 'leinterview-warm-launcher')
+    class_file = os.path.join(directory, 'WarmLauncher.class')
+    if os.path.exists(class_file):
+        return directory
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'WarmLauncher.java'), 'w') as f:
+        f.write(JAVA_LAUNCHER_SOURCE)
+    try:
+        result = subprocess.run(
+            ['javac', 'WarmLauncher.java'], cwd=directory,
+            capture_output=True, text=True, timeout=60
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Could not build JVM warm launcher: {e}")
+        return None
+    if result.returncode != 0:
+        print(f"Could not build JVM warm launcher: {result.stderr}")
+        return None
+    return directory
+
+
+class WarmWorkerPool:
+    """Keeps up to `size` idle single-use processes started from `command`"""
+
+    def __init__(self, name, command, size=2):
+        """
+        Args:
+            name: Label used in stats and thread names
+            command: argv for a worker process
+            size: Number of idle workers kept ready
+        """
+        self.name = name
+        self.command = command
+        self.size = size
+        self._ready = queue.Queue()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._refiller = None
+        self._stopped = False
+        self._stats = {
+            'warm_hits': 0,
+            'cold_starts': 0,
+            'spawned': 0,
+            'discarded': 0,
+        }
+
+    def _spawn(self):
+        process = AccountedPopen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=tempfile.gettempdir()
+        )
+        with self._lock:
+            self._stats['spawned'] += 1
+        return process
+
+    def _ensure_started(self):
+        """(Re)start the refill thread, e.g. in a worker freshly forked by gunicorn"""
+        if self._pid == os.getpid() and self._refiller is not None and self._refiller.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Idle processes inherited from the parent belong to it; drop our handles
+                self._ready = queue.Queue()
+                self._pid = os.getpid()
+            if self._refiller is None or not self._refiller.is_alive():
+                self._refiller = threading.Thread(
+                    target=self._refill_loop, name=f"warm-pool-{self.name}", daemon=True
+                )
+                self._refiller.start()
+
+    def start(self):
+        self._ensure_started()
+        return self
+
+    def _refill_loop(self):
+        while not self._stopped:
+            try:
+                while self._ready.qsize() < self.size and not self._stopped:
+                    self._ready.put(self._spawn())
+            except Exception as e:
+                print(f"Error starting {self.name} warm worker: {e}")
+                time.sleep(5)
+            self._wakeup.wait(timeout=5)
+            self._wakeup.clear()
+
+    def acquire(self):
+        """
+        Take a ready worker, cold-starting one if none is idle
+
+        Returns:
+            tuple: (process, warm, startup_seconds)
+        """
+        self._ensure_started()
+        started = time.monotonic()
+        while True:
+            try:
+                process = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            if process.poll() is None:
+                self._wakeup.set()
+                with self._lock:
+                    self._stats['warm_hits'] += 1
+                return process, True, time.monotonic() - started
+            with self._lock:
+                self._stats['discarded'] += 1
+
+        self._wakeup.set()
+        process = self._spawn()
+        with self._lock:
+            self._stats['cold_starts'] += 1
+        return process, False, time.monotonic() - started
+
+    def shutdown(self):
+        self._stopped = True
+        self._wakeup.set()
+        while True:
+            try:
+                self._ready.get_nowait().kill()
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['idle'] = self._ready.qsize()
+        stats['size'] = self.size
+        return stats
+
+
+def create_pools(size):
+    """Build warm pools for the languages that benefit from them"""
+    if size <= 0:
+        return {}
+    pools = {
+        'python': WarmWorkerPool('python', ['python3', '-c', PYTHON_BOOTSTRAP], size),
+    }
+    launcher_dir = build_java_launcher()
+    if launcher_dir:
+        pools['java'] = WarmWorkerPool(
+            'java', ['java', '-cp', launcher_dir, 'WarmLauncher'], size
+        )
+    return pools